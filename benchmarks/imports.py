@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = [
+    "meteo.parser.vaisala",
+    "meteo.parser.stream",
+    "meteo.parser.aggregate",
+    "meteo.parser.bulk",
+    "meteo.acquisition",
+    "meteo.spool",
+    "meteo.models",
+    "meteo.models.bbd",
+    "meteo.db.ops",
+]
+
+# Third-party packages that are slow to import.
+HEAVY_PACKAGES = ["sqlalchemy", "pandas", "numpy", "sentry_sdk", "pytz"]
+
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [p for p in {packages!r} if p in sys.modules]]))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure import time of meteo modules in fresh interpreters."
+    )
+    parser.add_argument(
+        "module", nargs="*", default=MODULES, help="Module names to import."
+    )
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=5, help="Number of runs per module."
+    )
+    return parser.parse_args()
+
+
+def measure(module, repeat):
+    """
+    Import module in fresh interpreters. Return list of import times, list of
+    process wall times, and heavy packages imported as a side effect.
+    """
+    script = CHILD_SCRIPT.format(module=module, packages=HEAVY_PACKAGES)
+    imports = []
+    walls = []
+    packages = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.check_output([sys.executable, "-c", script])
+        walls.append(time.perf_counter() - start)
+        elapsed, packages = json.loads(output)
+        imports.append(elapsed)
+    return imports, walls, packages
+
+
+def main():
+    args = parse_args()
+    _, baseline, _ = measure("sys", args.repeat)
+    print("Interpreter startup: {:.1f}ms".format(statistics.median(baseline) * 1e3))
+
+    for module in args.module:
+        imports, walls, packages = measure(module, args.repeat)
+        print(
+            "{:<24} import {:7.1f}ms  process {:7.1f}ms  loads: {}".format(
+                module,
+                statistics.median(imports) * 1e3,
+                statistics.median(walls) * 1e3,
+                ", ".join(packages) or "-",
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
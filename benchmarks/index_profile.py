@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import argparse
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from meteo.db.ops import get_table, to_table_rows
+from meteo.db.schema import PROFILES, create_tables
+from meteo.models.stations import get_model
+from meteo.parser.fields import FIELDS_MAPPING
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare insert throughput and on-disk size of schema "
+        "profiles using temporary SQLite databases."
+    )
+    parser.add_argument(
+        "-s", "--station", default="babadan", help="Station name. Default to babadan."
+    )
+    parser.add_argument(
+        "-n", "--rows", type=int, default=20000, help="Number of rows to insert."
+    )
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Rows per transaction. Default to 1, like one row per minute.",
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        action="append",
+        default=[],
+        help="Column to keep indexed in the lean profile.",
+    )
+    return parser.parse_args()
+
+
+def generate_entries(count):
+    start = datetime.datetime(2000, 1, 1)
+    fields = [v["name"] for v in FIELDS_MAPPING.values() if v["type"] is float]
+    for i in range(count):
+        entry = dict((name, random.uniform(0, 100)) for name in fields)
+        entry["timestamp"] = start + datetime.timedelta(minutes=i)
+        entry["id"] = "BBD"
+        yield entry
+
+
+def run(path, model, profile, rows, batch_size, indexed):
+    engine = create_engine("sqlite:///" + path)
+    create_tables(engine, [model], profile=profile, indexed=indexed)
+    table = get_table(model)
+    stmt = table.insert()
+
+    random.seed(0)
+    entries = to_table_rows(model, generate_entries(rows))
+    start = time.perf_counter()
+    for i in range(0, len(entries), batch_size):
+        with engine.begin() as conn:
+            conn.execute(stmt, entries[i : i + batch_size])
+    seconds = time.perf_counter() - start
+    engine.dispose()
+    return seconds, os.path.getsize(path)
+
+
+def main():
+    args = parse_args()
+    model = get_model(args.station)
+    indexed = [key.strip() for value in args.index for key in value.split(",")]
+    directory = tempfile.mkdtemp()
+    try:
+        for profile in PROFILES:
+            path = os.path.join(directory, "{}.sqlite3".format(profile))
+            seconds, size = run(
+                path, model, profile, args.rows, args.batch_size, indexed
+            )
+            print(
+                "{:>5}: {:9.1f} rows/s, {:8.2f} MiB".format(
+                    profile, args.rows / seconds, size / 1024.0 / 1024.0
+                )
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+import argparse
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from meteo.db.ops import to_table_rows
+from meteo.models.bbd import Babadan
+from meteo.spool import Spool, SpoolDrainer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure spool append and drain throughput."
+    )
+    parser.add_argument(
+        "-u",
+        "--url",
+        default="",
+        help="SQLAlchemy engine URL. Default to temporary SQLite database.",
+    )
+    parser.add_argument(
+        "-n", "--rows", type=int, default=100000, help="Number of rows to spool."
+    )
+    parser.add_argument(
+        "-b", "--batch-size", type=int, default=5000, help="Drainer batch size."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    directory = tempfile.mkdtemp()
+    url = args.url or "sqlite:///" + os.path.join(directory, "bench.sqlite3")
+    engine = create_engine(url)
+    Babadan.__table__.create(engine, checkfirst=True)
+
+    start = datetime.datetime(2000, 1, 1)
+    entries = [
+        {
+            "timestamp": start + datetime.timedelta(minutes=i),
+            "air_temperature": 20.0,
+            "relative_humidity": 80.0,
+            "air_pressure": 870.0,
+            "rain_acc": 0.0,
+            "id": "BBD",
+        }
+        for i in range(args.rows)
+    ]
+    rows = to_table_rows(Babadan, entries)
+
+    try:
+        spool = Spool(os.path.join(directory, "spool"), fsync=False)
+        t = time.monotonic()
+        spool.append_many("babadan", rows)
+        elapsed = time.monotonic() - t
+        print(
+            "Append: {} rows in {:.3f}s ({:.0f} rows/s), {} bytes".format(
+                len(rows), elapsed, len(rows) / elapsed, spool.size()
+            )
+        )
+
+        drainer = SpoolDrainer(spool, engine, [Babadan], batch_size=args.batch_size)
+        stats = drainer.drain_once()
+        print(
+            "Drain: {} rows in {:.3f}s ({:.0f} rows/s), {} batches".format(
+                stats.rows, stats.seconds, stats.rows_per_second, stats.batches
+            )
+        )
+    finally:
+        engine.dispose()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ["declared", "cached", "reflect"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure model startup time with and without reflection."
+    )
+    parser.add_argument(
+        "-u",
+        "--url",
+        default="",
+        help="SQLAlchemy engine URL. Default to temporary SQLite database.",
+    )
+    parser.add_argument(
+        "-n", "--repeat", type=int, default=5, help="Number of runs per mode."
+    )
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--cache-path", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def import_models():
+    from meteo.models import bbd, cr6, jra, jro, kal, kla, lbh, ngep, sel  # noqa
+
+    return cr6.Base
+
+
+def run_child(args):
+    """
+    Prepare models in a fresh process and print elapsed time.
+    """
+    start = time.perf_counter()
+
+    from meteo.db.engine import get_engine, prepare
+
+    base = import_models()
+    engine = get_engine(args.url)
+    if args.mode == "declared":
+        prepare(base, engine, reflect=False)
+    elif args.mode == "cached":
+        prepare(base, engine, cache_path=args.cache_path)
+    else:
+        # No cache path, so writing the cache is not timed as reflection.
+        prepare(base, engine)
+
+    print(time.perf_counter() - start)
+
+
+def measure(args, mode, cache_path):
+    timings = []
+    for _ in range(args.repeat):
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--url",
+                args.url,
+                "--mode",
+                mode,
+                "--cache-path",
+                cache_path,
+            ]
+        )
+        timings.append(float(output))
+    return timings
+
+
+def main():
+    args = parse_args()
+    if args.mode:
+        run_child(args)
+        return
+
+    directory = tempfile.mkdtemp()
+    try:
+        if not args.url:
+            from sqlalchemy import create_engine
+
+            args.url = "sqlite:///" + os.path.join(directory, "bench.sqlite3")
+            base = import_models()
+            base.metadata.create_all(create_engine(args.url))
+
+        cache_path = os.path.join(directory, "metadata.pickle")
+        # Populate the cache once before measuring cached startup.
+        measure(argparse.Namespace(url=args.url, repeat=1), "cached", cache_path)
+
+        for mode in MODES:
+            timings = measure(args, mode, cache_path)
+            print(
+                "{:>8}: median {:.3f}s, min {:.3f}s, max {:.3f}s".format(
+                    mode, statistics.median(timings), min(timings), max(timings)
+                )
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
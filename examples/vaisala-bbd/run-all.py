@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import datetime
+import logging
+import logging.config
+import os
+
+import pytz
+
+from meteo.acquisition import AcquisitionService, Station
+from meteo.capture import CaptureWriter
+from meteo.checkpoint import CheckpointStore
+from meteo.db.ops import to_table_rows
+from meteo.db.rollup import RollupUpdater
+from meteo.db.writer import BufferedWriter
+from meteo.singleton import SingleInstance
+from meteo.spool import Spool, SpoolDrainer
+from vb import models, settings
+from vb.utils import create_log_config
+from vb.worker import get_model
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """
+    Run Vaisala acquisition of all stations in a single process.
+    """
+    logging.config.dictConfig(create_log_config("vaisala.log"))
+
+    logger.info("Initiating app...")
+    lock = SingleInstance(lockfile=os.path.join(settings.RUN_DIR, "vaisala.lock"))
+
+    stations = []
+    for name in settings.ACQUISITION_STATIONS:
+        if name not in settings.TELNET_SERVERS:
+            raise ValueError("Unsupported station name: {}".format(name))
+        host, port = settings.TELNET_SERVERS[name]
+        logger.info("Using telnet server of %s on %s port %s", name, host, port)
+        stations.append(
+            Station(
+                name,
+                host,
+                port,
+                connect_timeout=settings.TELNET_CONNECT_TIMEOUT,
+                read_timeout=settings.TELNET_TIMEOUT,
+                reconnect_delay=settings.TELNET_RECONNECT_TIMEOUT,
+            )
+        )
+
+    localtz = pytz.timezone(settings.TIMEZONE)
+
+    # The checkpoint of each station, i.e. the latest committed timestamp plus
+    # the one minute entry interval, is kept in the checkpoint file, and
+    # rollups are recomputed for the buckets touched by committed rows.
+    checkpoints = CheckpointStore(
+        settings.CHECKPOINT_FILE, step=datetime.timedelta(minutes=1), tz=localtz
+    )
+    callbacks = [checkpoints.on_insert]
+    if settings.UPDATE_ROLLUPS:
+        callbacks.append(RollupUpdater(models.engine).update)
+
+    def on_insert(table, rows):
+        for callback in callbacks:
+            callback(table, rows)
+
+    if settings.USE_SPOOL:
+        # Rows are written to the local spool first and replayed into the
+        # database by the drainer thread, so nothing is lost during outages.
+        spool = Spool(settings.SPOOL_DIR)
+        writer = SpoolDrainer(
+            spool,
+            models.engine,
+            [get_model(s.name) for s in stations],
+            on_insert=on_insert,
+        )
+        writer.start(interval=settings.SPOOL_DRAIN_INTERVAL)
+
+        def write(name, entry):
+            logger.info("Payload to spool for %s: %s", name, entry)
+            model = get_model(name)
+            spool.append_many(model.__tablename__, to_table_rows(model, [entry]))
+
+    else:
+        # Rows of all stations are inserted together once every station has
+        # delivered its entry, or at least once a minute, even if a station
+        # goes quiet.
+        writer = BufferedWriter(
+            models.engine, max_rows=len(stations), max_age=60, on_insert=on_insert
+        )
+        writer.start()
+
+        def write(name, entry):
+            logger.info("Payload to insert to %s: %s", name, entry)
+            writer.add(get_model(name), entry)
+
+    # Raw lines of each station are appended to its capture archive, so they
+    # can be replayed later.
+    captures = {}
+    on_line = None
+    if settings.CAPTURE_RAW:
+        captures = dict(
+            (s.name, CaptureWriter(os.path.join(settings.CAPTURE_DIR, s.name)))
+            for s in stations
+        )
+
+        def on_line(name, timestamp, line):
+            captures[name].append(timestamp, line)
+
+    service = AcquisitionService(
+        stations,
+        writer=write,
+        clock=lambda: datetime.datetime.now(localtz),
+        on_line=on_line,
+    )
+    try:
+        service.run_forever()
+    finally:
+        for capture in captures.values():
+            capture.close()
+        if settings.USE_SPOOL:
+            writer.stop()
+            spool.close()
+        else:
+            writer.close()
+        del lock
+
+    logger.info("App exiting.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,11 @@ import time
 
 import pytz
 
+from meteo.parser.aggregate import VaisalaAggregator
 from meteo.singleton import SingleInstance
 
-from . import settings
-from .worker import process_lines
+from . import models, settings
+from .worker import process_entry
 
 logger = logging.getLogger(__name__)
 
@@ -23,40 +24,20 @@ class App(SingleInstance):
             raise ValueError("Unsupported station name: {}".format(station))
         self.station = station
 
+        if settings.MIGRATED:
+            models.prepare()
+
     def run(self):
         """
         Run the app.
         """
-        lines = []
+        aggregator = VaisalaAggregator()
         localtz = pytz.timezone(settings.TIMEZONE)
 
         last_read = datetime.datetime.now(localtz)
         last_heartbeat = datetime.datetime.now(localtz)
 
-        if self.station == settings.Station.BABADAN.value:
-            host = settings.TELNET_HOST
-            port = settings.TELNET_PORT
-        elif self.station == settings.Station.JURANGJERO.value:
-            host = settings.TELNET_JURANGJERO_HOST
-            port = settings.TELNET_JURANGJERO_PORT
-        elif self.station == settings.Station.LABUHAN.value:
-            host = settings.TELNET_LABUHAN_HOST
-            port = settings.TELNET_LABUHAN_PORT
-        elif self.station == settings.Station.KLATAKAN.value:
-            host = settings.TELNET_KLATAKAN_HOST
-            port = settings.TELNET_KLATAKAN_PORT
-        elif self.station == settings.Station.JRAKAH.value:
-            host = settings.TELNET_JRAKAH_HOST
-            port = settings.TELNET_JRAKAH_PORT
-        elif self.station == settings.Station.NGEPOS.value:
-            host = settings.TELNET_NGEPOS_HOST
-            port = settings.TELNET_NGEPOS_PORT
-        elif self.station == settings.Station.SELO.value:
-            host = settings.TELNET_SELO_HOST
-            port = settings.TELNET_SELO_PORT
-        elif self.station == settings.Station.KALIURANG.value:
-            host = settings.TELNET_KALIURANG_HOST
-            port = settings.TELNET_KALIURANG_PORT
+        host, port = settings.TELNET_SERVERS[self.station]
 
         logger.info(
             "Using telnet server on {host} port {port}".format(host=host, port=port)
@@ -71,7 +52,7 @@ class App(SingleInstance):
                     timeout=settings.TELNET_CONNECT_TIMEOUT,
                 ) as tn:
                     line = tn.read_until(b"\n", timeout=60)
-                    lines.append(line)
+                    aggregator.add(line)
 
                     logger.debug("Data: %s", line)
 
@@ -87,9 +68,8 @@ class App(SingleInstance):
                         last_heartbeat = now
 
                     if last_read + datetime.timedelta(seconds=60) < now:
-                        process_lines(now, lines, self.station)
+                        process_entry(aggregator.flush(now), self.station)
 
-                        lines = []
                         last_read = now
                         logger.info("Last read timestamp: %s", last_read.isoformat())
             except (ConnectionError, OSError) as e:
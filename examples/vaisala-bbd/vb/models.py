@@ -1,30 +1,76 @@
+import importlib
 import logging
 import time
 
-from sqlalchemy import create_engine
-from sqlalchemy.pool import NullPool
-
-from meteo.models.base import Base  # noqa
-from meteo.models.bbd import Babadan  # noqa
-from meteo.models.jro import JurangJero  # noqa
-from meteo.models.lbh import Labuhan  # noqa
-from meteo.models.kla import Klatakan  # noqa
-from meteo.models.ngep import Ngepos  # noqa
-from meteo.models.sel import Selo  # noqa
-from meteo.models.jra import Jrakah  # noqa
-from meteo.models.kal import Kaliurang  # noqa
 from . import settings
 
 logger = logging.getLogger(__name__)
 
-engine = create_engine(settings.DATABASE_ENGINE, poolclass=NullPool)
-
 RECONNECT_TIMEOUT = 30
 
-if settings.MIGRATED:
+
+def get_db_engine():
+    """
+    Get shared engine. Connections are pooled and reused for every insert
+    instead of connecting to the database server every minute.
+    """
+    from meteo.db.engine import get_engine
+
+    return get_engine(
+        settings.DATABASE_ENGINE,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    )
+
+
+def get_model(station):
+    """
+    Get model of station name, e.g. babadan. Models and SQLAlchemy are imported
+    on first use, so processes that only parse data start fast.
+    """
+    from meteo.models.stations import get_model as get_station_model
+
+    return get_station_model(station)
+
+
+def __getattr__(name):
+    if name == "engine":
+        return get_db_engine()
+    if name == "Base":
+        return importlib.import_module("meteo.models.base").Base
+    if name[:1].isupper():
+        # Model class name, e.g. models.Babadan.
+        from meteo.models.stations import STATIONS_LOOKUP
+
+        if name in STATIONS_LOOKUP:
+            return get_model(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def prepare():
+    """
+    Prepare models for ORM operations. Core inserts used by the spool drainer
+    and buffered writer work without it.
+
+    Declared models are used as is unless REFLECT_MODELS is enabled. In that
+    case, reflected metadata is cached in METADATA_CACHE and the function
+    blocks until the database is reachable if there is no cache yet.
+    """
+    from meteo.db.engine import prepare as prepare_base
+    from meteo.models.base import Base
+    from meteo.models.stations import get_models
+
+    # All models must be declared before the base is prepared.
+    get_models()
+
     while True:
         try:
-            Base.prepare(engine, reflect=True)
+            prepare_base(
+                Base,
+                get_db_engine(),
+                reflect=settings.REFLECT_MODELS,
+                cache_path=settings.METADATA_CACHE,
+            )
             break
         except Exception:
             logger.error(
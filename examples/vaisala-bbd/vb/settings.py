@@ -1,19 +1,26 @@
 import enum
 import os
 
-import sentry_sdk
 from decouple import config
-from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 STORAGE_DIR = os.path.join(BASE_DIR, "storage")
 DATA_DIR = os.path.join(STORAGE_DIR, "data")
 RUN_DIR = os.path.join(STORAGE_DIR, "run")
+SPOOL_DIR = os.path.join(STORAGE_DIR, "spool")
+CACHE_DIR = os.path.join(STORAGE_DIR, "cache")
+CAPTURE_DIR = os.path.join(STORAGE_DIR, "capture")
 
 DEBUG = config("DEBUG", default=False, cast=bool)
 DATABASE_ENGINE = config("DATABASE_ENGINE")
+DATABASE_POOL_SIZE = config("DATABASE_POOL_SIZE", default=5, cast=int)
+DATABASE_POOL_RECYCLE = config("DATABASE_POOL_RECYCLE", default=3600, cast=int)
 MIGRATED = config("MIGRATED", default=True, cast=bool)
+REFLECT_MODELS = config("REFLECT_MODELS", default=False, cast=bool)
+METADATA_CACHE = config(
+    "METADATA_CACHE", default=os.path.join(CACHE_DIR, "metadata.pickle")
+)
 TELNET_HOST = config("TELNET_HOST", default="localhost")
 TELNET_PORT = config("TELNET_PORT", default=23, cast=int)
 TELNET_JURANGJERO_HOST = config("TELNET_JURANGJERO_HOST", default="localhost")
@@ -35,6 +42,14 @@ TELNET_CONNECT_TIMEOUT = config("TELNET_CONNECT_TIMEOUT", default=60, cast=int)
 TELNET_RECONNECT_LIMIT = config("TELNET_RECONNECT_LIMIT", default=10, cast=int)
 TELNET_RECONNECT_TIMEOUT = config("TELNET_RECONNECT_TIMEOUT", default=5, cast=int)
 
+USE_SPOOL = config("USE_SPOOL", default=True, cast=bool)
+SPOOL_DRAIN_INTERVAL = config("SPOOL_DRAIN_INTERVAL", default=60, cast=int)
+UPDATE_ROLLUPS = config("UPDATE_ROLLUPS", default=False, cast=bool)
+CAPTURE_RAW = config("CAPTURE_RAW", default=False, cast=bool)
+CHECKPOINT_FILE = config(
+    "CHECKPOINT_FILE", default=os.path.join(DATA_DIR, "checkpoints.json")
+)
+
 TIMEZONE = config("TIMEZONE", default="Asia/Jakarta")
 
 LOGGING_ROOT = config("LOGGING_ROOT", default=os.path.join(STORAGE_DIR, "logs"))
@@ -82,12 +97,19 @@ LOGGING = {
     },
 }
 
-sentry_sdk.init(
-    dsn=config("SENTRY_DSN", default=""),
-    integrations=[
-        SqlalchemyIntegration(),
-    ],
-)
+SENTRY_DSN = config("SENTRY_DSN", default="")
+
+# Sentry is disabled without DSN, so skip importing it.
+if SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        integrations=[
+            SqlalchemyIntegration(),
+        ],
+    )
 
 LOCKFILE = os.path.join(RUN_DIR, "vb.lock")
 
@@ -116,3 +138,23 @@ class Station(enum.Enum):
         JRAKAH,
         KALIURANG,
     ]
+
+
+# Telnet server host and port of each station.
+TELNET_SERVERS = {
+    Station.BABADAN.value: (TELNET_HOST, TELNET_PORT),
+    Station.JURANGJERO.value: (TELNET_JURANGJERO_HOST, TELNET_JURANGJERO_PORT),
+    Station.LABUHAN.value: (TELNET_LABUHAN_HOST, TELNET_LABUHAN_PORT),
+    Station.KLATAKAN.value: (TELNET_KLATAKAN_HOST, TELNET_KLATAKAN_PORT),
+    Station.NGEPOS.value: (TELNET_NGEPOS_HOST, TELNET_NGEPOS_PORT),
+    Station.SELO.value: (TELNET_SELO_HOST, TELNET_SELO_PORT),
+    Station.JRAKAH.value: (TELNET_JRAKAH_HOST, TELNET_JRAKAH_PORT),
+    Station.KALIURANG.value: (TELNET_KALIURANG_HOST, TELNET_KALIURANG_PORT),
+}
+
+# Stations acquired by run-all.py. Comma separated station names.
+ACQUISITION_STATIONS = config(
+    "ACQUISITION_STATIONS",
+    default=",".join(Station.CHOICES.value),
+    cast=lambda v: [s.strip() for s in v.split(",") if s.strip()],
+)
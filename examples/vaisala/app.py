@@ -1,48 +1,24 @@
 import argparse
 import datetime
-import io
 import logging
 import logging.config
 import os
 import sys
 import tempfile
-from urllib.error import URLError
-from urllib.parse import urlencode
-from urllib.request import urlopen
+from http.client import HTTPException
 
-import numpy as np
-import pandas as pd
 import pytz
-import sentry_sdk
 from decouple import config
-from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
-from sqlalchemy import create_engine
-from sqlalchemy.exc import SQLAlchemyError
-
-from meteo.db import sessions
-from meteo.models import cr6
 
 if sys.platform != "win32":
     import fcntl
 
-COLUMNS = [
-    "timestamp",
-    "record_id",
-    "wind_direction",
-    "wind_speed",
-    "air_temperature",
-    "air_humidity",
-    "air_pressure",
-    "rainfall",
-    "amount",
-    "battery_voltage",
-    "power_temperature",
-]
-
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
 CACHE_DIR = os.path.join(BASE_DIR, "cache")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
+CHECKPOINT_FILE = os.path.join(DATA_DIR, "checkpoints.json")
+# Last timestamp file of older versions. It is migrated to CHECKPOINT_FILE.
 LT_FILE = os.path.join(DATA_DIR, "last")
 LOCKFILE = os.path.join(DATA_DIR, "vaisala.lock")
 
@@ -50,18 +26,28 @@ DEBUG = config("DEBUG", cast=bool, default=False)
 SENTRY_DSN = config("SENTRY_DSN", default="")
 DATABASE_ENGINE = config("DATABASE_ENGINE", default="")
 
+BASE_URL = "http://192.168.9.47/"
+
 TIME_ZONE = "Asia/Jakarta"
 ISO_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
 
+# Key of CR6 resume point in the checkpoint file, i.e. its table name.
+CHECKPOINT_KEY = "cr6"
+
 logger = logging.getLogger(__name__)
 
-# Initialize sentry integrations.
-sentry_sdk.init(
-    dsn=SENTRY_DSN,
-    integrations=[
-        SqlalchemyIntegration(),
-    ],
-)
+# Initialize sentry integrations. Sentry is disabled without DSN, so skip
+# importing it.
+if SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        integrations=[
+            SqlalchemyIntegration(),
+        ],
+    )
 
 
 class VaisalaAppError(Exception):
@@ -178,6 +164,46 @@ def parse_args():
         action="store_true",
         help="Do not insert data to database (dry run).",
     )
+    parser.add_argument(
+        "-b",
+        "--backfill",
+        action="store_true",
+        help="Fetch the missing range in fixed windows concurrently. It is "
+        "used anyway if the missing range is longer than one window.",
+    )
+    parser.add_argument(
+        "-w",
+        "--window",
+        type=float,
+        default=6,
+        help="Length of backfill window in hours. Default to 6.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=4,
+        help="Number of backfill windows fetched concurrently. Default to 4.",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running and poll the web service every interval instead of "
+        "fetching once, e.g. from crontab.",
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=int,
+        default=60,
+        help="Poll interval in seconds in daemon mode. Default to 60.",
+    )
+    parser.add_argument(
+        "--resume-from-db",
+        action="store_true",
+        help="Resume from the latest CR6 row in the database if there is no "
+        "checkpoint.",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Run in debugging mode."
     )
@@ -196,80 +222,23 @@ def to_datetime(date_string, date_format=r"%Y-%m-%d %H:%M:%S"):
     return date_obj
 
 
-def is_valid_date(date_string, **kwargs):
-    try:
-        date_obj = to_datetime(date_string, **kwargs)
-        if date_obj:
-            return True
-        return False
-    except ValueError:
-        return False
-
-
 def get_meteo_data(start, end):
     """
     Get meteorology data from web service.
 
     Web service IP address is 192.168.9.47. We request the data with toa5 format
-    (CSV data format) and using data range mode.
+    (CSV data format) and using data range mode. The response is parsed while
+    it is received. Return data columns.
     """
-    params = {
-        "command": "DataQuery",
-        "uri": "dl:Table1",
-        "format": "toa5",
-        "mode": "date-range",
-        "p1": start,
-        "p2": end,
-    }
-    base_url = "http://192.168.9.47/"
-    url = base_url + "?" + urlencode(params)
-
-    logger.debug("Meteorology data web service URL: %s", url)
-
-    with urlopen(url, timeout=10) as url:
-        response = url.read()
-    return response
+    from meteo.datalogger import CR6Client
 
-
-def parse_data(path):
-    """
-    Parse CSV data from response.
-
-    Test the first item in the line if it contains valid date time string. If
-    not, ignore the line.
-    """
-    try:
-        path_or_buffer = path.decode("utf-8")
-        buf = io.StringIO(path_or_buffer)
-        lines = []
-        while True:
-            line = buf.readline()
-            if not line:
-                break
-            date_string = line.split(",")[0].strip('"')
-            if is_valid_date(date_string):
-                lines.append(line)
-    except (UnicodeDecodeError, AttributeError):
-        path_or_buffer = path
-        lines = []
-        with open(path_or_buffer) as buf:
-            while True:
-                line = buf.readline()
-                if not line:
-                    break
-                date_string = line.split(",")[0].strip('"')
-                if is_valid_date(date_string):
-                    lines.append(line)
-    return "".join(lines)
-
-
-def read_csv(path, **kwargs):
-    return pd.read_csv(path, **kwargs)
+    with CR6Client(BASE_URL, timeout=10) as client:
+        return client.query_range(start, end)
 
 
 def get_last_timestamp(path):
     """
-    Get last timestamp from lastfile.
+    Get last timestamp from lastfile of older versions.
 
     It reads the content of the file and return the content as string.
     """
@@ -278,48 +247,45 @@ def get_last_timestamp(path):
     return date_string.rstrip()
 
 
-def parse_last_timestamp(df):
+def parse_last_timestamp(columns):
     """
-    Parse last timestamp from dataframe.
+    Parse last timestamp from data columns. Return datetime.
 
     Add one minute forward to prevent the script from fetching the same value.
     The last timestamp already in database, so we need to fetch the weather data
     one minute forward.
     """
-    if df.empty:
+    timestamps = columns["timestamp"]
+    if not len(timestamps):
         return None
-    date_string = df["timestamp"].iloc[-1]
 
     # We add one minute forward to prevent data duplication at the edge.
-    date_obj = to_datetime(date_string) + datetime.timedelta(minutes=1)
-    return date_obj.strftime(ISO_DATE_FORMAT)
-
-
-def get_last_timestamp_from_buffer(buf):
-    df = read_csv(io.StringIO(buf), header=None, names=COLUMNS)
-    return parse_last_timestamp(df)
+    return timestamps[-1].item() + datetime.timedelta(minutes=1)
 
 
-def get_last_timestamp_from_df(df):
-    return parse_last_timestamp(df)
-
-
-def write_last_timestamp(path, date_string):
-    with open(path, "w+") as f:
-        f.write(date_string)
-
-
-def check_ltfile(path):
+def load_checkpoints(path, lastfile=None):
     """
-    Check whether lastfile is exists or not. If not exists, create the file with
-    empty content.
+    Open checkpoint store of path.
+
+    If the store has no CR6 checkpoint yet, the timestamp of the lastfile of
+    older versions is migrated to it.
     """
-    if not os.path.exists(path):
-        logger.debug("Last timestamp file (LT_FILE) is not exists. Creating LT_FILE...")
-        with open(path, "w+") as f:
-            pass
-    else:
-        logger.debug("Last timestamp file (LT_FILE) already exists.")
+    from meteo.checkpoint import CheckpointStore
+    from meteo.datalogger import RECORD_INTERVAL
+
+    checkpoints = CheckpointStore(path, step=RECORD_INTERVAL)
+    if (
+        lastfile
+        and checkpoints.get(CHECKPOINT_KEY) is None
+        and os.path.exists(lastfile)
+    ):
+        date_string = get_last_timestamp(lastfile)
+        if date_string:
+            logger.info("Migrating last timestamp %s from %s", date_string, lastfile)
+            checkpoints.set(
+                CHECKPOINT_KEY, to_datetime(date_string, date_format=ISO_DATE_FORMAT)
+            )
+    return checkpoints
 
 
 def get_csv_from_queue(path):
@@ -342,56 +308,39 @@ def insert_to_db(url, entries):
     :return: True if data successfully inserted to the database,
              otherwise False.
     """
-    engine = create_engine(url)
-    cr6.Base.prepare(engine, reflect=True)
+    from sqlalchemy.exc import SQLAlchemyError
+
+    from meteo.db.engine import get_engine
+    from meteo.db.ops import bulk_upsert
+    from meteo.models import cr6
+
+    engine = get_engine(url)
 
     try:
-        with sessions.session_scope(engine) as session:
-            session.bulk_insert_mappings(cr6.CR6, entries)
-            session.commit()
+        # Fetch windows may overlap, so existing rows are updated instead of
+        # failing the whole batch on duplicate timestamp.
+        bulk_upsert(engine, cr6.CR6, entries)
         return True
     except SQLAlchemyError as e:
         logger.error(e)
         return False
 
 
-def sanitize_nan(entries):
+def process_data(url, columns, checkpoints=None, **kwargs):
     """
-    Convert NaN to None for item in entries.
+    Insert data columns to the database, then advance the CR6 checkpoint.
     """
-    return [
-        dict(
-            [
-                (key, value) if not pd.isna(value) else (key, None)
-                for key, value in item.items()
-            ]
-        )
-        for item in entries
-    ]
-
+    from meteo.parser.toa5 import to_entries
 
-def process_csv(url, buf, **kwargs):
-    df = read_csv(io.StringIO(buf), header=None, names=COLUMNS)
-
-    # Change non-number (except timestamp) to NaN if any.
-    df = df.where(pd.notnull(df), np.nan)
-    df.replace("NAN", np.nan, inplace=True)
-
-    logger.info("Number of entries: %s", len(df))
-
-    logger.debug("First 10 records:")
-    logger.debug(df.head())
-    logger.debug("Last 10 records:")
-    logger.debug(df.tail())
+    logger.info("Number of entries: %s", len(columns["timestamp"]))
 
     dry = kwargs.get("dry")
     if not dry:
-        entries = df.to_dict(orient="records")
-        ok = insert_to_db(url, sanitize_nan(entries))
+        ok = insert_to_db(url, to_entries(columns))
         if ok:
             logger.info("Data successfully inserted to database.")
 
-            last = get_last_timestamp_from_df(df)
+            last = parse_last_timestamp(columns)
             if last is None:
                 return
 
@@ -400,29 +349,102 @@ def process_csv(url, buf, **kwargs):
                 "in database): %s",
                 last,
             )
-            logger.info("Writing request end time to LT_FILE...")
-            write_last_timestamp(LT_FILE, last)
+            if checkpoints is not None:
+                logger.info("Writing last timestamp to checkpoint file...")
+                checkpoints.set(CHECKPOINT_KEY, last)
         else:
             logger.error("Data failed to be inserted to database.")
     else:
         logger.debug("Running in dry mode. Not inserting to database.")
 
 
+def backfill(url, start, end, checkpoints, window=6, jobs=4, dry=False):
+    """
+    Fetch records from start to end in windows of window hours concurrently.
+    Each window is inserted as it arrives, and the CR6 checkpoint is advanced
+    only past windows that are safely inserted.
+    """
+    import functools
+
+    from meteo.datalogger import Backfill, data_query
+    from meteo.parser.toa5 import CR6_COLUMNS, read_toa5, to_entries
+
+    def on_chunk(columns):
+        if dry:
+            return
+        if not insert_to_db(url, to_entries(columns)):
+            raise VaisalaAppError("Data failed to be inserted to database.")
+
+    def on_checkpoint(timestamp):
+        logger.info("Writing checkpoint: %s", timestamp)
+        checkpoints.set(CHECKPOINT_KEY, timestamp)
+
+    runner = Backfill(
+        functools.partial(data_query, BASE_URL, timeout=60),
+        parse=lambda data: read_toa5(data, names=CR6_COLUMNS),
+        on_chunk=on_chunk,
+        on_checkpoint=None if dry else on_checkpoint,
+        window=datetime.timedelta(hours=window),
+        workers=jobs,
+    )
+    result = runner.run(start, end)
+    logger.info(
+        "Backfilled %s rows in %s windows, %s failed.",
+        result.rows,
+        result.windows,
+        len(result.failed),
+    )
+    for lo, hi in result.failed:
+        logger.error("Failed window: %s - %s", lo, hi)
+    return not result.failed
+
+
+def run_daemon(url, start, checkpoints, interval=60, dry=False):
+    """
+    Poll the web service every interval seconds until interrupted.
+
+    The web service client, its connection, the database engine, and the last
+    record number are kept between polls. The first poll fetches records since
+    start, and the next ones fetch only records after the last stored record.
+    """
+    from meteo.datalogger import CR6Client
+    from meteo.parser.toa5 import to_entries
+    from meteo.poller import Poller
+
+    client = CR6Client(BASE_URL, timeout=10)
+
+    def fetch():
+        return client.poll(since=start, advance=False)
+
+    def store(columns):
+        if not dry:
+            if not insert_to_db(url, to_entries(columns)):
+                raise VaisalaAppError("Data failed to be inserted to database.")
+            checkpoints.set(CHECKPOINT_KEY, parse_last_timestamp(columns))
+        client.advance(columns)
+
+    poller = Poller(fetch, store, interval=interval)
+    try:
+        poller.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        logger.info("Poller stats: %s", poller.stats())
+
+
 class VaisalaApp(SingleInstance):
     """
     Vaisala app class that allow only one instance to be run.
 
     It prevents race condition when running multiple instance of classes. So, we
     only run the instance in one process only. We can make sure that only one
-    process write a content to the lastfile.
+    process writes the checkpoint file.
     """
 
-    def __init__(self, lastfile="", **kwargs):
-        if lastfile:
-            self.lastfile = lastfile
-        else:
-            # TODO(indra): create lastfile in data directory.
-            self.lastfile = LT_FILE
+    def __init__(self, checkpoint_file="", lastfile="", **kwargs):
+        self.checkpoint_file = checkpoint_file or CHECKPOINT_FILE
+        self.lastfile = lastfile or LT_FILE
         super().__init__(**kwargs)
 
     def run(self):
@@ -492,35 +514,78 @@ class VaisalaApp(SingleInstance):
         logger.debug("App log directory: %s", LOG_DIR)
         logger.debug("Sentry DSN: %s", SENTRY_DSN)
 
-        logger.debug("Last timestamp file (LT_FILE): %s", self.lastfile)
+        logger.debug("Checkpoint file: %s", self.checkpoint_file)
 
-        check_ltfile(self.lastfile)
+        from meteo.checkpoint import CheckpointError
 
-        end = now.strftime(ISO_DATE_FORMAT)
-        start = get_last_timestamp(self.lastfile)
-        logger.info("Last time from file: %s", start)
-
-        if not start:
-            logger.info("Last timestamp will default to one hour ago.")
-            one_hour_ago = now - datetime.timedelta(hours=1)
-            start = one_hour_ago.strftime(ISO_DATE_FORMAT)
+        try:
+            checkpoints = load_checkpoints(self.checkpoint_file, self.lastfile)
+        except CheckpointError as e:
+            logger.error(e)
+            sys.exit(1)
 
-        logger.info("Request start time: %s", start)
-        logger.info("Request end time: %s", end)
+        resume = {}
+        if args.resume_from_db:
+            # The latest row in the database is used if there is no
+            # checkpoint, so a lost checkpoint file doesn't refetch everything.
+            from meteo.db.engine import get_engine
+            from meteo.models import cr6
+
+            resume = {
+                "engine": get_engine(db_engine_url),
+                "model": cr6.CR6,
+            }
+        start_time = checkpoints.resume(CHECKPOINT_KEY, **resume)
+        logger.info("Resume time from checkpoint: %s", start_time)
+
+        # Timestamps are local time without time zone.
+        end_time = to_datetime(now.strftime(ISO_DATE_FORMAT), ISO_DATE_FORMAT)
+        if start_time is None:
+            logger.warning("No checkpoint found. Start time defaults to one hour ago.")
+            start_time = end_time - datetime.timedelta(hours=1)
+
+        logger.info("Request start time: %s", start_time.strftime(ISO_DATE_FORMAT))
+        logger.info("Request end time: %s", end_time.strftime(ISO_DATE_FORMAT))
+
+        if args.daemon:
+            logger.info("Polling meteo data every %ss...", args.interval)
+            run_daemon(
+                db_engine_url,
+                start_time,
+                checkpoints,
+                interval=args.interval,
+                dry=args.dry,
+            )
+            return
+        window = datetime.timedelta(hours=args.window)
+        if args.backfill or end_time - start_time > window:
+            logger.info("Backfilling meteo data in %s windows...", window)
+            ok = backfill(
+                db_engine_url,
+                start_time,
+                end_time,
+                checkpoints,
+                window=args.window,
+                jobs=args.jobs,
+                dry=args.dry,
+            )
+            if not ok:
+                sys.exit(1)
+            return
 
         logger.info("Requesting meteo data from web service...")
+        # NumPy is slow to import, so the parser is imported only when data is
+        # requested.
+        from meteo.datalogger import DataloggerError
+        from meteo.parser.toa5 import TOA5Error
+
         try:
-            response = get_meteo_data(start, end)
-        except URLError as e:
+            columns = get_meteo_data(start_time, end_time)
+        except (OSError, HTTPException, DataloggerError, TOA5Error) as e:
             logger.error(e)
             sys.exit(1)
 
-        if not response:
-            logger.info("Response is empty. Skipping...")
-            sys.exit(1)
-
-        buf = parse_data(response)
-        process_csv(db_engine_url, buf, dry=args.dry)
+        process_data(db_engine_url, columns, checkpoints=checkpoints, dry=args.dry)
 
         logger.info(
             "Processing end at: %s", get_current_time().strftime(ISO_DATE_FORMAT)
@@ -530,7 +595,9 @@ class VaisalaApp(SingleInstance):
 
 if __name__ == "__main__":
     try:
-        app = VaisalaApp(lastfile=LT_FILE, lockfile=LOCKFILE)
+        app = VaisalaApp(
+            checkpoint_file=CHECKPOINT_FILE, lastfile=LT_FILE, lockfile=LOCKFILE
+        )
         app.run()
     except SingleInstanceException:
         sys.exit(1)
@@ -1,26 +1,29 @@
 import os
-import random
 import socket
 import time
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+from meteo.parser.stream import iter_chunks, iter_lines
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def read_data(path):
-    lines = []
-    with open(path) as fd:
-        while True:
-            line = fd.readline()
-            if not line:
-                break
-            lines.append(line)
 
-    return lines
+def read_data(path, delay=1):
+    """
+    Stream lines of data file forever without loading the whole file. If the
+    file has no lines, wait delay seconds before reading it again.
+    """
+    while True:
+        count = 0
+        with open(path, "rb") as fd:
+            for line in iter_lines(iter_chunks(fd)):
+                count += 1
+                yield line + b"\r\n"
+        if not count:
+            time.sleep(delay)
 
 
 def main():
     data = read_data(os.path.join(BASE_DIR, "data.txt"))
-    data_len = len(data)
 
     host = "127.0.0.1"
     port = 2020
@@ -37,8 +40,7 @@ def main():
 
             try:
                 while True:
-                    index = random.randrange(data_len)
-                    conn.send(bytes(data[index], "utf-8"))
+                    conn.send(next(data))
                     time.sleep(1)
             except Exception as e:
                 print(e)
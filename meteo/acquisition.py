@@ -0,0 +1,225 @@
+import asyncio
+import concurrent.futures
+import datetime
+import logging
+import random
+
+from .parser.aggregate import VaisalaAggregator
+
+logger = logging.getLogger(__name__)
+
+
+class Station(object):
+    """
+    Vaisala station connection settings.
+
+    :param name: Station name, e.g. babadan. It is passed to the writer.
+    :param host: Telnet server host.
+    :param port: Telnet server port.
+    :param interval: Number of seconds of each aggregated entry.
+    :param heartbeat: Number of seconds between heartbeat messages.
+    :param connect_timeout: Connection timeout in seconds.
+    :param read_timeout: Reconnect if no line is received within this number of
+        seconds.
+    :param reconnect_delay: Initial reconnect delay in seconds. The delay is
+        doubled on each failed attempt up to max_reconnect_delay.
+    :param max_reconnect_delay: Maximum reconnect delay in seconds.
+    """
+
+    def __init__(
+        self,
+        name,
+        host,
+        port,
+        interval=60,
+        heartbeat=30,
+        connect_timeout=60,
+        read_timeout=300,
+        reconnect_delay=5,
+        max_reconnect_delay=300,
+    ):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+    def __repr__(self):
+        return "Station(name={!r}, host={!r}, port={!r})".format(
+            self.name, self.host, self.port
+        )
+
+
+class StationConnection(object):
+    """
+    Single station connection running in the event loop.
+
+    Lines are aggregated as they arrive and every interval the finished entry
+    is handed to the service writer.
+    """
+
+    def __init__(self, station, service):
+        self.station = station
+        self.service = service
+        self.aggregator = VaisalaAggregator()
+        self.connected = False
+        self.lines = 0
+        self.reconnects = 0
+
+    async def run(self):
+        """
+        Keep the station connected and flush entries every interval. The
+        partial entry of the current interval is flushed when cancelled.
+        """
+        flusher = asyncio.ensure_future(self.flush_forever())
+        delay = self.station.reconnect_delay
+        try:
+            while True:
+                try:
+                    await self.connect_and_read()
+                except asyncio.CancelledError:
+                    raise
+                except (ConnectionError, OSError, asyncio.TimeoutError) as e:
+                    logger.error("%s: %s", self.station.name, e)
+                except Exception as e:
+                    logger.exception("%s: %s", self.station.name, e)
+
+                if self.connected:
+                    # Only failed attempts in a row back off, so a dropped
+                    # connection is retried with the initial delay.
+                    delay = self.station.reconnect_delay
+                self.connected = False
+                self.reconnects += 1
+                wait = delay * random.uniform(0.8, 1.2)
+                logger.info("%s: reconnecting in %.1fs", self.station.name, wait)
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self.station.max_reconnect_delay)
+        finally:
+            flusher.cancel()
+            if self.aggregator.count:
+                entry = self.aggregator.flush(self.service.clock())
+                await self.service.write(self.station.name, entry)
+
+    async def connect_and_read(self):
+        station = self.station
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(station.host, station.port),
+            timeout=station.connect_timeout,
+        )
+        logger.info(
+            "%s: connected to %s port %s", station.name, station.host, station.port
+        )
+        self.connected = True
+        heartbeat = asyncio.ensure_future(self.heartbeat_forever(writer))
+        try:
+            while True:
+                line = await asyncio.wait_for(
+                    reader.readline(), timeout=station.read_timeout
+                )
+                if not line:
+                    raise ConnectionError("Connection closed by server")
+
+                logger.debug("%s: data: %s", station.name, line)
+                self.aggregator.add(line)
+                self.lines += 1
+                self.service.capture(station.name, line)
+        finally:
+            heartbeat.cancel()
+            writer.close()
+
+    async def heartbeat_forever(self, writer):
+        while True:
+            await asyncio.sleep(self.station.heartbeat)
+            try:
+                writer.write(b"\r\n")
+                await writer.drain()
+                logger.debug("%s: heartbeat message sent", self.station.name)
+            except Exception as e:
+                logger.error(
+                    "%s: error when sending heartbeat message", self.station.name
+                )
+                logger.error(e)
+
+    async def flush_forever(self):
+        while True:
+            await asyncio.sleep(self.station.interval)
+            if not self.aggregator.count:
+                continue
+
+            entry = self.aggregator.flush(self.service.clock())
+            await self.service.write(self.station.name, entry)
+
+
+class AcquisitionService(object):
+    """
+    Asyncio acquisition service for multiple Vaisala stations.
+
+    All station connections run in a single event loop. Aggregated entries are
+    passed to one shared writer callable, ``writer(station_name, entry)``, which
+    runs in a single worker thread, so blocking database code can be used and
+    only one writer is active at a time.
+
+    If on_line is set, it is called with station name, timestamp, and each raw
+    line as received, e.g. to append it to :class:`meteo.capture.CaptureWriter`.
+    It runs in the event loop, so it must be fast.
+
+    Example:
+
+    .. code-block:: python
+
+        service = AcquisitionService(
+            [Station("babadan", "192.168.1.1", 2020)],
+            writer=lambda name, entry: bulk_insert(engine, MODELS[name], [entry]),
+        )
+        service.run_forever()
+    """
+
+    def __init__(self, stations, writer, clock=datetime.datetime.now, on_line=None):
+        names = [station.name for station in stations]
+        if len(set(names)) != len(names):
+            raise ValueError("Station names must be unique: {}".format(names))
+
+        self.stations = list(stations)
+        self.writer = writer
+        self.clock = clock
+        self.on_line = on_line
+        self.connections = [StationConnection(s, self) for s in self.stations]
+        self._executor = None
+
+    async def write(self, name, entry):
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(self._executor, self.writer, name, entry)
+        except Exception as e:
+            logger.error("%s: writer error", name)
+            logger.error(e)
+
+    def capture(self, name, line):
+        if self.on_line is None:
+            return
+        try:
+            self.on_line(name, self.clock(), line)
+        except Exception as e:
+            logger.error("%s: line callback error", name)
+            logger.error(e)
+
+    async def run(self):
+        """
+        Run all station connections until cancelled.
+        """
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        try:
+            await asyncio.gather(*[conn.run() for conn in self.connections])
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def run_forever(self):
+        """
+        Run the service in a new event loop.
+        """
+        asyncio.run(self.run())
@@ -0,0 +1,288 @@
+import datetime
+import logging
+import mmap
+import os
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Index file header: magic and format version.
+MAGIC = b"MCAP\x01\x00\x00\x00"
+
+# Index record: timestamp in microseconds since epoch, offset and length of the
+# line in the data file.
+RECORD = struct.Struct("<qQI")
+
+INDEX_SUFFIX = ".idx"
+DATA_SUFFIX = ".dat"
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class CaptureError(Exception):
+    pass
+
+
+def to_micros(timestamp):
+    """
+    Convert datetime to microseconds since epoch. Aware datetimes are converted
+    to UTC, naive datetimes are taken as UTC.
+    """
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (timestamp - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def from_micros(value):
+    """
+    Convert microseconds since epoch to naive UTC datetime.
+    """
+    return EPOCH + datetime.timedelta(microseconds=value)
+
+
+def capture_paths(path):
+    """
+    Get (index path, data path) of capture archive.
+    """
+    return path + INDEX_SUFFIX, path + DATA_SUFFIX
+
+
+class CaptureWriter(object):
+    """
+    Append-only archive of raw lines, e.g. Vaisala telnet lines.
+
+    Line bytes are packed one after another in the data file, and the index
+    file has one fixed-width record of timestamp, offset, and length per line.
+    Data is written before the index, so index records never point past the
+    data. On open, a torn record at the end of the index and data not
+    referenced by the index are truncated.
+
+    Timestamps must not go backwards, so the index stays ordered. A timestamp
+    older than the last one is clamped to the last one.
+
+    :param path: Archive path without suffix, e.g. storage/capture/babadan.
+    :param fsync: If True, fsync the files after each append.
+    """
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.index_path, self.data_path = capture_paths(path)
+
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._index = open(self.index_path, "a+b")
+        self._data = open(self.data_path, "a+b")
+        self._last = None
+        self._recover()
+
+    def _recover(self):
+        index_size = os.fstat(self._index.fileno()).st_size
+        data_size = os.fstat(self._data.fileno()).st_size
+        if index_size == 0:
+            self._data.truncate(0)
+            self._index.write(MAGIC)
+            self._index.flush()
+            return
+
+        self._index.seek(0)
+        if self._index.read(len(MAGIC)) != MAGIC:
+            raise CaptureError("Invalid capture index: {}".format(self.index_path))
+
+        count = (index_size - len(MAGIC)) // RECORD.size
+        end = 0
+        while count:
+            self._index.seek(len(MAGIC) + (count - 1) * RECORD.size)
+            timestamp, offset, length = RECORD.unpack(self._index.read(RECORD.size))
+            if offset + length <= data_size:
+                self._last = timestamp
+                end = offset + length
+                break
+            count -= 1
+
+        size = len(MAGIC) + count * RECORD.size
+        if size != index_size or end != data_size:
+            logger.warning(
+                "Truncated incomplete records of %s: %s index bytes, %s data bytes",
+                self.path,
+                index_size - size,
+                data_size - end,
+            )
+            self._index.truncate(size)
+            self._data.truncate(end)
+
+    def append(self, timestamp, line):
+        """
+        Append one line received at timestamp.
+        """
+        self.append_many(timestamp, [line])
+
+    def append_many(self, timestamp, lines):
+        """
+        Append lines received at timestamp. Lines are bytes or str.
+        """
+        lines = [
+            line.encode("utf-8") if isinstance(line, str) else line for line in lines
+        ]
+        value = to_micros(timestamp)
+        with self._lock:
+            if self._last is not None and value < self._last:
+                logger.warning(
+                    "Capture timestamp %s of %s is older than the last one",
+                    timestamp,
+                    self.path,
+                )
+                value = self._last
+
+            offset = self._data.seek(0, os.SEEK_END)
+            records = []
+            for line in lines:
+                records.append(RECORD.pack(value, offset, len(line)))
+                offset += len(line)
+            self._data.write(b"".join(lines))
+            self._data.flush()
+            if self.fsync:
+                os.fsync(self._data.fileno())
+            self._index.write(b"".join(records))
+            self._index.flush()
+            if self.fsync:
+                os.fsync(self._index.fileno())
+            self._last = value
+
+    def close(self):
+        with self._lock:
+            self._index.close()
+            self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CaptureReader(object):
+    """
+    Read capture archive written by :class:`CaptureWriter`.
+
+    Both files are memory-mapped, and lines of any time range are found by
+    binary search on the index, so nothing before the range is read. Lines
+    appended after the reader is opened are not visible.
+
+    Example:
+
+    .. code-block:: python
+
+        with CaptureReader("storage/capture/babadan") as reader:
+            for timestamp, lines in reader.iter_blocks(start, end):
+                entry = parse_entry(timestamp, lines)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path, self.data_path = capture_paths(path)
+        self._index = self._map(self.index_path)
+        self._data = self._map(self.data_path)
+
+        if self._index[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise CaptureError("Invalid capture index: {}".format(self.index_path))
+
+        count = (len(self._index) - len(MAGIC)) // RECORD.size
+        # A writer may be in the middle of an append.
+        while count and sum(self._record(count - 1)[1:]) > len(self._data):
+            count -= 1
+        self._count = count
+
+    @staticmethod
+    def _map(path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _record(self, i):
+        return RECORD.unpack_from(self._index, len(MAGIC) + i * RECORD.size)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("Capture record index out of range")
+        timestamp, offset, length = self._record(i)
+        return from_micros(timestamp), bytes(self._data[offset : offset + length])
+
+    def timestamp(self, i):
+        return from_micros(self._record(i)[0])
+
+    def bisect_left(self, timestamp):
+        """
+        Get index of the first line at or after timestamp.
+        """
+        value = to_micros(timestamp)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(mid)[0] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_right(self, timestamp):
+        """
+        Get index after the last line at or before timestamp.
+        """
+        value = to_micros(timestamp)
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if value < self._record(mid)[0]:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def iter_range(self, start=None, end=None):
+        """
+        Iterate (timestamp, line) of lines from start to end inclusive.
+        Timestamps are naive UTC datetimes.
+        """
+        lo = self.bisect_left(start) if start is not None else 0
+        hi = self.bisect_right(end) if end is not None else self._count
+        for i in range(lo, hi):
+            yield self[i]
+
+    def iter_blocks(self, start=None, end=None):
+        """
+        Iterate (timestamp, lines) of lines from start to end inclusive grouped
+        by timestamp, i.e. lines appended together.
+        """
+        timestamp, lines = None, []
+        for current, line in self.iter_range(start, end):
+            if lines and current != timestamp:
+                yield timestamp, lines
+                lines = []
+            timestamp = current
+            lines.append(line)
+        if lines:
+            yield timestamp, lines
+
+    def close(self):
+        for name in ("_index", "_data"):
+            value = getattr(self, name, None)
+            if isinstance(value, mmap.mmap):
+                value.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,255 @@
+import datetime
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint file format version.
+VERSION = 1
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def fsync_directory(path):
+    """
+    Fsync directory, so a file renamed into it survives a crash. Platforms that
+    can't open directories, e.g. Windows, are skipped.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data, fsync=True):
+    """
+    Write bytes data to path atomically.
+
+    Data is written to a temporary file in the same directory, which is then
+    renamed over path, so path always has either the old or the new content.
+
+    :param path: File path.
+    :param data: Bytes data.
+    :param fsync: If True, fsync the file before and the directory after the
+        rename, so the new content is on disk when this returns.
+    """
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def get_latest_timestamp(engine, model):
+    """
+    Get the latest timestamp of model rows in the database, or None if the
+    table is empty.
+    """
+    from sqlalchemy import func, select
+
+    from .db.ops import get_time_column
+
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(get_time_column(model)))).scalar()
+
+
+class CheckpointStore(object):
+    """
+    Resume points of data sources, e.g. CR6 and each Vaisala station, stored
+    in one JSON file.
+
+    Every key maps to the timestamp from which its source is fetched next, so
+    all rows of the source before it are stored, i.e. the latest stored row
+    timestamp plus one row interval, step. The file is rewritten atomically
+    on every update, so a crash never leaves it empty or half written.
+    Checkpoints only move forward unless forced, so a late or repeated update
+    never rewinds a source.
+
+    Timestamps are kept naive, like DateTime columns of the models. Aware
+    timestamps are converted to time zone tz, if it is set, and their tzinfo
+    is removed, see :meth:`normalize`.
+
+    The store is thread-safe, but a file must be written by one process only.
+
+    Example:
+
+    .. code-block:: python
+
+        store = CheckpointStore("data/checkpoints.json", step=RECORD_INTERVAL)
+        start = store.resume("cr6", engine=engine, model=CR6)
+        ...
+        store.set("cr6", last_timestamp + RECORD_INTERVAL)
+
+    :param path: Checkpoint file path.
+    :param fsync: If True, fsync every update.
+    :param step: Interval of source rows. It is added to the latest row
+        timestamp by :meth:`resume` and :meth:`on_insert`.
+    :param tz: Time zone of naive timestamps, e.g. pytz.timezone("Asia/Jakarta").
+    """
+
+    def __init__(self, path, fsync=True, step=datetime.timedelta(0), tz=None):
+        self.path = path
+        self.fsync = fsync
+        self.step = step
+        self.tz = tz
+        self._lock = threading.Lock()
+        self._checkpoints = self._load()
+
+    def normalize(self, timestamp):
+        """
+        Convert timestamp to naive datetime in time zone tz. If tz is not set,
+        the tzinfo of aware timestamp is removed.
+        """
+        if timestamp.tzinfo is not None:
+            if self.tz is not None:
+                timestamp = timestamp.astimezone(self.tz)
+            timestamp = timestamp.replace(tzinfo=None)
+        return timestamp
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+
+        try:
+            content = json.loads(data.decode("utf-8"))
+            checkpoints = {}
+            for key, value in content["checkpoints"].items():
+                timestamp = datetime.datetime.fromisoformat(value["timestamp"])
+                checkpoints[key] = self.normalize(timestamp)
+            return checkpoints
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise CheckpointError("Invalid checkpoint file {}: {}".format(self.path, e))
+
+    def _save(self):
+        content = {
+            "version": VERSION,
+            "checkpoints": dict(
+                (key, {"timestamp": value.isoformat()})
+                for key, value in sorted(self._checkpoints.items())
+            ),
+        }
+        data = json.dumps(content, indent=2).encode("utf-8")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atomic_write(self.path, data, fsync=self.fsync)
+
+    def get(self, key, default=None):
+        """
+        Get checkpoint timestamp of key.
+        """
+        with self._lock:
+            return self._checkpoints.get(key, default)
+
+    def keys(self):
+        with self._lock:
+            return sorted(self._checkpoints)
+
+    def set(self, key, timestamp, force=False):
+        """
+        Set checkpoint timestamp of key and write the file. A timestamp older
+        than the current checkpoint is ignored unless force is True. Return
+        True if the checkpoint is updated.
+        """
+        timestamp = self.normalize(timestamp)
+        with self._lock:
+            current = self._checkpoints.get(key)
+            if current is not None and not force:
+                if timestamp < current:
+                    logger.warning(
+                        "Ignored checkpoint %s of %s older than %s",
+                        timestamp,
+                        key,
+                        current,
+                    )
+                    return False
+                if timestamp == current:
+                    return True
+
+            self._checkpoints[key] = timestamp
+            try:
+                self._save()
+            except BaseException:
+                if current is None:
+                    del self._checkpoints[key]
+                else:
+                    self._checkpoints[key] = current
+                raise
+            return True
+
+    def delete(self, key):
+        """
+        Delete checkpoint of key.
+        """
+        with self._lock:
+            if self._checkpoints.pop(key, None) is not None:
+                self._save()
+
+    def resume(self, key, engine=None, model=None, step=None, default=None):
+        """
+        Get timestamp from which to resume fetching source key.
+
+        The checkpoint wins if it exists. Otherwise, if engine and model are
+        given, the latest timestamp of model rows plus step is used, so a lost
+        checkpoint file doesn't rewind the source. The latest row never
+        overrides a checkpoint, because rows after a failed range may be
+        stored already. Return default if neither is known.
+
+        :param key: Source key, e.g. cr6 or station table name.
+        :param engine: SQLAlchemy engine.
+        :param model: Model or table of the source.
+        :param step: Time added to the latest row timestamp. Default to the
+            step of the store.
+        :param default: Value returned if there is no checkpoint nor rows.
+        """
+        checkpoint = self.get(key)
+        if checkpoint is not None:
+            return checkpoint
+
+        if engine is not None and model is not None:
+            latest = get_latest_timestamp(engine, model)
+            if latest is not None:
+                latest = self.normalize(latest) + (self.step if step is None else step)
+                logger.debug("Latest %s row timestamp: %s", key, latest)
+                return latest
+        return default
+
+    def on_insert(self, table, rows):
+        """
+        Advance checkpoint of table name to the latest timestamp of inserted
+        rows plus step. It can be used as on_insert callback of
+        :class:`meteo.db.writer.BufferedWriter` or
+        :class:`meteo.spool.SpoolDrainer`.
+        """
+        from .db.ops import get_time_column
+
+        key = get_time_column(table).key
+        timestamps = [
+            self.normalize(row[key]) for row in rows if row.get(key) is not None
+        ]
+        if timestamps:
+            self.set(table.name, max(timestamps) + self.step)
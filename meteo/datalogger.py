@@ -0,0 +1,437 @@
+import collections
+import concurrent.futures
+import datetime
+import http.client
+import logging
+import threading
+import time
+from urllib.parse import urlencode, urlparse
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Interval of CR6 Table1 records.
+RECORD_INTERVAL = datetime.timedelta(minutes=1)
+
+BackfillResult = collections.namedtuple(
+    "BackfillResult", ["windows", "rows", "failed", "checkpoint"]
+)
+
+
+class DataloggerError(Exception):
+    pass
+
+
+def _format_param(value):
+    if isinstance(value, datetime.datetime):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+def data_query_params(mode, p1=None, p2=None, table="Table1", fmt="toa5"):
+    """
+    Get query parameters of Campbell Scientific DataQuery web API request, e.g.
+    date-range mode from p1 to p2, or since-record mode from record p1.
+    """
+    params = {
+        "command": "DataQuery",
+        "uri": "dl:{}".format(table),
+        "format": fmt,
+        "mode": mode,
+    }
+    if p1 is not None:
+        params["p1"] = _format_param(p1)
+    if p2 is not None:
+        params["p2"] = _format_param(p2)
+    return params
+
+
+def data_query_url(base_url, start, end, table="Table1", fmt="toa5"):
+    """
+    Get URL of DataQuery web API request of table records from start to end in
+    date-range mode.
+    """
+    params = data_query_params("date-range", start, end, table=table, fmt=fmt)
+    return base_url + "?" + urlencode(params)
+
+
+def data_query(base_url, start, end, table="Table1", timeout=10):
+    """
+    Request TOA5 table records from start to end. Return response bytes.
+    """
+    url = data_query_url(base_url, start, end, table=table)
+    logger.debug("DataQuery URL: %s", url)
+    with urlopen(url, timeout=timeout) as response:
+        return response.read()
+
+
+def iter_windows(start, end, window):
+    """
+    Split range from start to end into consecutive (start, end) windows of at
+    most window length.
+    """
+    current = start
+    while current < end:
+        following = min(current + window, end)
+        yield current, following
+        current = following
+
+
+class Backfill(object):
+    """
+    Fetch a long range of datalogger records in fixed windows.
+
+    Windows are fetched concurrently by a bounded pool of worker threads, and
+    failed requests are retried with exponential delay. Each fetched window is
+    parsed and passed to on_chunk in the calling thread as soon as it arrives,
+    so only a few windows are held in memory at once.
+
+    The checkpoint is advanced only over the leading windows that have all
+    been handled, so a failure never skips data on the next run. It is the
+    window end, except for the last window of the range, where it is the last
+    record timestamp plus one record interval, because the datalogger may not
+    have written the newest records yet. If the first window fails, the
+    checkpoint is set to the range start, so later windows already stored
+    don't make a resume from the latest row skip it.
+
+    Example:
+
+    .. code-block:: python
+
+        backfill = Backfill(
+            functools.partial(data_query, "http://192.168.9.47/"),
+            parse=lambda data: read_toa5(data, names=CR6_COLUMNS),
+            on_chunk=lambda columns: bulk_upsert(engine, CR6, to_entries(columns)),
+            on_checkpoint=lambda timestamp: store.set("cr6", timestamp),
+        )
+        backfill.run(start, end)
+
+    :param fetch: Callable that takes window start and end and returns
+        response data.
+    :param parse: Callable that parses response data into columns with
+        timestamp column.
+    :param on_chunk: Callable that takes parsed columns of one window, e.g. to
+        upsert them to the database. It must raise if the rows are not stored.
+    :param on_checkpoint: Optional callable that takes new checkpoint
+        timestamp.
+    :param window: Length of each window.
+    :param workers: Number of windows fetched concurrently.
+    :param retries: Number of retries of each window.
+    :param retry_delay: Delay before the first retry in seconds. It is doubled
+        on each retry.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        parse,
+        on_chunk,
+        on_checkpoint=None,
+        window=datetime.timedelta(hours=6),
+        workers=4,
+        retries=3,
+        retry_delay=5,
+    ):
+        self.fetch = fetch
+        self.parse = parse
+        self.on_chunk = on_chunk
+        self.on_checkpoint = on_checkpoint
+        self.window = window
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    def fetch_window(self, start, end):
+        """
+        Fetch and parse one window with retries. Return parsed columns.
+        """
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            try:
+                return self.parse(self.fetch(start, end))
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(
+                    "Failed to fetch %s - %s (%s), retrying in %ss",
+                    start,
+                    end,
+                    e,
+                    delay,
+                )
+                time.sleep(delay)
+                delay *= 2
+
+    def _checkpoint(self, start, end, columns, last):
+        if not last:
+            return end
+        timestamps = columns["timestamp"]
+        if not len(timestamps):
+            return None
+        timestamp = timestamps[-1]
+        if hasattr(timestamp, "item"):
+            timestamp = timestamp.item()
+        return max(start, timestamp + RECORD_INTERVAL)
+
+    def run(self, start, end):
+        """
+        Fetch and handle records from start to end. Return BackfillResult.
+        """
+        windows = list(iter_windows(start, end, self.window))
+        queue = iter(enumerate(windows))
+        pending = {}
+        # Checkpoint of handled windows not yet committed, keyed by index.
+        handled = {}
+        failed = []
+        rows = 0
+        checkpoint = None
+        position = 0
+
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+
+            def submit():
+                for index, (lo, hi) in queue:
+                    pending[executor.submit(self.fetch_window, lo, hi)] = index
+                    break
+
+            # Keep at most two windows per worker in flight.
+            for _ in range(self.workers * 2):
+                submit()
+
+            while pending:
+                completed, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in completed:
+                    index = pending.pop(future)
+                    lo, hi = windows[index]
+                    submit()
+                    try:
+                        columns = future.result()
+                        self.on_chunk(columns)
+                    except Exception as e:
+                        # Later windows are still stored, but the checkpoint
+                        # never moves past this one.
+                        logger.error("Failed to backfill %s - %s: %s", lo, hi, e)
+                        failed.append((lo, hi))
+                        continue
+
+                    count = len(columns["timestamp"])
+                    rows += count
+                    logger.info("Backfilled %s rows of %s - %s", count, lo, hi)
+                    handled[index] = self._checkpoint(
+                        lo, hi, columns, index == len(windows) - 1
+                    )
+
+                    while position in handled:
+                        value = handled.pop(position)
+                        position += 1
+                        if value is not None:
+                            checkpoint = value
+                            if self.on_checkpoint is not None:
+                                self.on_checkpoint(checkpoint)
+
+        if failed and checkpoint is None:
+            checkpoint = start
+            if self.on_checkpoint is not None:
+                self.on_checkpoint(checkpoint)
+
+        failed.sort()
+        return BackfillResult(len(windows), rows, failed, checkpoint)
+
+
+class CR6Client(object):
+    """
+    Campbell Scientific CR6 web API client with one keep-alive connection.
+
+    The connection is reused across queries and reopened if the datalogger
+    closes it. Response bodies are read in chunks and parsed incrementally with
+    :class:`meteo.parser.toa5.TOA5StreamParser`, so parsing overlaps with the
+    transfer.
+
+    :meth:`poll` uses since-record mode with the last seen record number, so
+    each poll only transfers new rows.
+
+    Example:
+
+    .. code-block:: python
+
+        client = CR6Client("http://192.168.9.47/")
+        while True:
+            columns = client.poll()
+            bulk_upsert(engine, CR6, to_entries(columns))
+            time.sleep(60)
+
+    :param base_url: Datalogger web server URL.
+    :param table: Datalogger table name.
+    :param names: Column names, default to CR6_COLUMNS.
+    :param record_column: Name of record number column.
+    :param timeout: Socket timeout in seconds.
+    :param chunk_size: Number of bytes read from the response at once.
+    :param initial_records: Number of most recent records fetched by the first
+        poll if no record number is known.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        table="Table1",
+        names=None,
+        record_column="record_id",
+        timeout=10,
+        chunk_size=64 * 1024,
+        initial_records=60,
+    ):
+        from .parser.toa5 import CR6_COLUMNS
+
+        url = urlparse(base_url)
+        if url.scheme not in ("http", ""):
+            raise ValueError("Unsupported URL scheme: {}".format(url.scheme))
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.path = url.path or "/"
+        self.table = table
+        self.names = names or CR6_COLUMNS
+        self.record_column = record_column
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.initial_records = initial_records
+
+        self.last_record = None
+        self.requests = 0
+        self.connections = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        self._conn = http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout
+        )
+        self.connections += 1
+
+    def _get(self, params):
+        url = self.path + "?" + urlencode(params)
+        # A kept-alive connection may have been closed by the server since the
+        # last request, so retry once on a fresh connection.
+        for attempt in range(2):
+            reused = self._conn is not None
+            if not reused:
+                self._connect()
+            try:
+                self._conn.request("GET", url, headers={"Connection": "keep-alive"})
+                response = self._conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                self.close()
+                stale = isinstance(e, (ConnectionError, http.client.BadStatusLine))
+                if not (reused and stale) or attempt:
+                    raise
+                logger.debug("Reconnecting to %s: %s", self.host, e)
+                continue
+            self.requests += 1
+            if response.status != 200:
+                response.read()
+                if response.will_close:
+                    self.close()
+                raise DataloggerError(
+                    "DataQuery failed with HTTP {} {}".format(
+                        response.status, response.reason
+                    )
+                )
+            return response
+
+    def _stream(self, mode, p1=None, p2=None):
+        from .parser.toa5 import TOA5StreamParser
+
+        params = data_query_params(mode, p1, p2, table=self.table)
+        with self._lock:
+            response = self._get(params)
+            parser = TOA5StreamParser(names=self.names)
+            try:
+                while True:
+                    data = response.read(self.chunk_size)
+                    if not data:
+                        break
+                    columns = parser.feed(data)
+                    if columns is not None:
+                        yield columns
+                yield parser.close()
+            finally:
+                # The connection can't be reused if the body is not read to
+                # the end.
+                if not response.isclosed() or response.will_close:
+                    self.close()
+
+    def iter_query(self, mode, p1=None, p2=None):
+        """
+        Send DataQuery request and yield columns of rows as they are received.
+        """
+        for columns in self._stream(mode, p1, p2):
+            if len(columns[self.names[0]]):
+                yield columns
+
+    def query(self, mode, p1=None, p2=None):
+        """
+        Send DataQuery request. Return columns of all received rows.
+        """
+        from .parser.toa5 import concat_columns
+
+        return concat_columns(list(self._stream(mode, p1, p2)))
+
+    def query_range(self, start, end):
+        """
+        Get records from start to end.
+        """
+        return self.query("date-range", start, end)
+
+    def since_record(self, record):
+        """
+        Get records after record number.
+        """
+        columns = self.query("since-record", record + 1)
+        records = columns[self.record_column]
+        if len(records) and records[0] <= record:
+            keep = records > record
+            columns = type(columns)((k, v[keep]) for k, v in columns.items())
+        return columns
+
+    def poll(self, since=None, advance=True):
+        """
+        Get records after the last seen record. If no record is seen yet, get
+        records since time since, or the most recent records.
+
+        :param since: Start datetime of the first poll.
+        :param advance: If True, the last seen record is updated. Otherwise,
+            call :meth:`advance` after the records are stored, so they are
+            fetched again if storing fails.
+        """
+        if self.last_record is not None:
+            columns = self.since_record(self.last_record)
+        elif since is not None:
+            columns = self.query("since-time", since)
+        else:
+            columns = self.query("most-recent", self.initial_records)
+        if advance:
+            self.advance(columns)
+        return columns
+
+    def advance(self, columns):
+        """
+        Update the last seen record from polled columns.
+        """
+        records = columns[self.record_column]
+        if len(records):
+            self.last_record = max(int(records.max()), self.last_record or 0)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,363 @@
+import datetime
+import json
+import logging
+import os
+
+from sqlalchemy import JSON, DateTime, Float, Integer, func, select
+
+from .ops import get_table, get_time_column, iter_chunks, upsert_statement
+from .partitions import MONTH, iter_periods
+from .query import DEFAULT_CHUNK_SIZE, _range_query, get_columns
+
+logger = logging.getLogger(__name__)
+
+PARQUET = "parquet"
+FEATHER = "feather"
+FORMATS = [PARQUET, FEATHER]
+
+SUFFIXES = {PARQUET: ".parquet", FEATHER: ".feather"}
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ArchiveError(
+            "Columnar archives require pyarrow to be installed, "
+            "e.g. pip install bpptkg-meteo[archive]."
+        )
+    return pyarrow
+
+
+def get_format(path):
+    """
+    Get archive format from file name suffix.
+    """
+    for name, suffix in SUFFIXES.items():
+        if path.endswith(suffix):
+            return name
+    raise ArchiveError("Unknown archive format: {}".format(path))
+
+
+def archive_path(directory, model, start, fmt=PARQUET, period=MONTH):
+    """
+    Get archive file path of period starting at start, e.g. babadan_p202601.parquet.
+    """
+    partition = next(iter_periods(start, start, period))
+    name = "{}_{}{}".format(get_table(model).name, partition.name, SUFFIXES[fmt])
+    return os.path.join(directory, name)
+
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    # JSON values are stored as JSON encoded string.
+    return pa.string()
+
+
+def arrow_schema(model, columns=None):
+    """
+    Get Arrow schema of model rows. Field names are model attribute names.
+    """
+    pa = _import_pyarrow()
+    names, selected = get_columns(model, columns)
+    return pa.schema(
+        [
+            pa.field(name, _arrow_type(pa, column), nullable=not column.primary_key)
+            for name, column in zip(names, selected)
+        ]
+    )
+
+
+def _record_batch(pa, schema, selected, rows):
+    arrays = []
+    for i, (field, column) in enumerate(zip(schema, selected)):
+        values = [row[i] for row in rows]
+        if isinstance(column.type, JSON):
+            values = [json.dumps(v) if v is not None else None for v in values]
+        elif isinstance(column.type, DateTime):
+            values = [v.replace(tzinfo=None) if v is not None else None for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _Writer(object):
+    """
+    Write record batches to Parquet or Feather file. The file is written to a
+    temporary path and renamed when closed, so incomplete archives are never
+    left behind.
+    """
+
+    def __init__(self, path, schema, fmt, compression):
+        self.path = path
+        self.tmp = "{}.{}.tmp".format(path, os.getpid())
+        if fmt == PARQUET:
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.tmp, schema, compression=compression)
+        else:
+            import pyarrow as pa
+
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self._writer = pa.ipc.new_file(self.tmp, schema, options=options)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def close(self, commit=True):
+        self._writer.close()
+        if commit:
+            os.replace(self.tmp, self.path)
+        else:
+            os.unlink(self.tmp)
+
+
+def _iter_kept(pa, path, schema, start, end, before, chunk_size):
+    """
+    Iterate record batches of existing archive file with timestamp before
+    start, or from end if before is False.
+    """
+    import pyarrow.compute as pc
+
+    name = schema.names[0]
+    for batch in iter_archive(path, chunk_size=chunk_size):
+        if not batch.schema.equals(schema):
+            raise ArchiveError(
+                "Columns of {} differ from exported columns, can't merge".format(path)
+            )
+        timestamps = batch.column(name)
+        if before:
+            mask = pc.less(timestamps, pa.scalar(start, type=timestamps.type))
+        else:
+            mask = pc.greater_equal(timestamps, pa.scalar(end, type=timestamps.type))
+        kept = batch.filter(mask)
+        if len(kept):
+            yield kept
+
+
+def export_period(
+    engine,
+    model,
+    path,
+    start,
+    end,
+    fmt=PARQUET,
+    columns=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    compression="zstd",
+    merge=False,
+):
+    """
+    Export rows of model with timestamp from start to end exclusive to one
+    archive file. Rows are streamed with a server-side cursor and written in
+    batches of chunk_size rows. Nothing is written if there are no rows.
+    Return number of exported rows.
+
+    If merge is True and the file exists, its rows outside start and end are
+    kept, so exporting part of a period doesn't drop the rest of it.
+    """
+    pa = _import_pyarrow()
+    last = end - datetime.timedelta(microseconds=1)
+    stmt, names, selected = _range_query(model, start, last, columns, None, None)
+    schema = arrow_schema(model, columns)
+    merge = merge and os.path.exists(path)
+
+    writer = None
+    count = 0
+    try:
+        with engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=chunk_size
+            ).execute(stmt)
+            for rows in result.partitions(chunk_size):
+                if writer is None:
+                    writer = _Writer(path, schema, fmt, compression)
+                    if merge:
+                        for batch in _iter_kept(
+                            pa, path, schema, start, end, True, chunk_size
+                        ):
+                            writer.write(batch)
+                writer.write(_record_batch(pa, schema, selected, rows))
+                count += len(rows)
+        if writer is not None and merge:
+            for batch in _iter_kept(pa, path, schema, start, end, False, chunk_size):
+                writer.write(batch)
+    except BaseException:
+        if writer is not None:
+            writer.close(commit=False)
+        raise
+    if writer is not None:
+        writer.close()
+    return count
+
+
+def export_archive(
+    engine,
+    model,
+    directory,
+    start=None,
+    end=None,
+    fmt=PARQUET,
+    columns=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    compression="zstd",
+    period=MONTH,
+):
+    """
+    Export rows of model to directory, one archive file per period, e.g.
+    babadan_p202601.parquet. Default to all rows. Return list of (path, number
+    of rows) of written files.
+
+    If start or end falls inside a period whose file exists, the exported rows
+    are merged into the file, see :func:`export_period`.
+
+    :param engine: SQLAlchemy engine.
+    :param model: Station or CR6 model, or table.
+    :param directory: Output directory.
+    :param start: Start datetime.
+    :param end: End datetime, inclusive.
+    :param fmt: Archive format, parquet or feather.
+    :param columns: Column names to export, default to all.
+    :param chunk_size: Number of rows fetched and written at once.
+    :param compression: Compression codec, e.g. zstd, lz4, or None.
+    :param period: Period of each file, month or year.
+    """
+    if fmt not in FORMATS:
+        raise ArchiveError("Unknown archive format: {}".format(fmt))
+
+    if start is None or end is None:
+        time_column = get_time_column(model)
+        with engine.connect() as conn:
+            first, last = conn.execute(
+                select(func.min(time_column), func.max(time_column))
+            ).one()
+        if first is None:
+            return []
+        start = start or first
+        end = end or last
+
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for partition in iter_periods(start.date(), end.date(), period):
+        period_start = datetime.datetime.combine(partition.start, datetime.time())
+        period_end = datetime.datetime.combine(partition.end, datetime.time())
+        lo = max(start, period_start)
+        hi = min(end + datetime.timedelta(microseconds=1), period_end)
+        path = archive_path(directory, model, partition.start, fmt, period)
+        count = export_period(
+            engine,
+            model,
+            path,
+            lo,
+            hi,
+            fmt=fmt,
+            columns=columns,
+            chunk_size=chunk_size,
+            compression=compression,
+            merge=lo > period_start or hi < period_end,
+        )
+        if count:
+            logger.info("Exported %s rows to %s", count, path)
+            written.append((path, count))
+    return written
+
+
+def iter_archive(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate Arrow record batches of archive file. Parquet files are read in
+    batches of at most chunk_size rows, and Feather files batch by batch as
+    written, so the whole file is never loaded at once.
+    """
+    _import_pyarrow()
+    if get_format(path) == PARQUET:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch
+    else:
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+
+def _iter_columns(model, path, chunk_size):
+    """
+    Iterate (names, columns, values) of archive file record batches, where
+    values is list of Python values of each column.
+    """
+    table = get_table(model)
+    names, selected = get_columns(model)
+    columns = dict(zip(names, selected))
+
+    for batch in iter_archive(path, chunk_size=chunk_size):
+        unknown = [name for name in batch.schema.names if name not in columns]
+        if unknown:
+            raise ArchiveError(
+                "Unknown columns of {} in {}: {}".format(
+                    table.name, path, ", ".join(unknown)
+                )
+            )
+        batch_columns = [columns[name] for name in batch.schema.names]
+        values = []
+        for column, array in zip(batch_columns, batch.columns):
+            items = array.to_pylist()
+            if isinstance(column.type, JSON):
+                items = [json.loads(v) if v is not None else None for v in items]
+            values.append(items)
+        yield batch.schema.names, batch_columns, values
+
+
+def iter_entries(model, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate entries keyed by model attribute names from archive file.
+    """
+    for names, _, values in _iter_columns(model, path, chunk_size):
+        for row in zip(*values):
+            yield dict(zip(names, row))
+
+
+def import_archive(
+    engine, model, path, chunk_size=DEFAULT_CHUNK_SIZE, on_duplicate="error"
+):
+    """
+    Load archive file to model. Rows are built from the column arrays of each
+    record batch and inserted in chunks of chunk_size rows, each committed in
+    its own transaction. If on_duplicate is update or ignore, rows whose
+    primary key already exists are updated or skipped. Return number of loaded
+    rows.
+    """
+    table = get_table(model)
+    statements = {}
+    count = 0
+    for _, columns, values in _iter_columns(model, path, chunk_size):
+        keys = [column.key for column in columns]
+        if on_duplicate == "error":
+            stmt = table.insert()
+        else:
+            key = frozenset(keys)
+            if key not in statements:
+                statements[key] = upsert_statement(
+                    table,
+                    engine.dialect.name,
+                    columns=keys,
+                    update=on_duplicate == "update",
+                )
+            stmt = statements[key]
+
+        rows = (dict(zip(keys, row)) for row in zip(*values))
+        for chunk in iter_chunks(rows, chunk_size):
+            with engine.begin() as conn:
+                conn.execute(stmt, chunk)
+            count += len(chunk)
+    return count
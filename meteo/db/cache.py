@@ -0,0 +1,271 @@
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+from sqlalchemy import func, select
+
+from .ops import get_table, get_time_column
+from .partitions import MONTH, next_period, period_start
+from .query import AUTO, read_range
+from .rollup import choose_resolution, floor_time
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".npz"
+
+
+class RangeCache(object):
+    """
+    Read-through local cache of time-range queries.
+
+    Requested range is split into calendar windows, e.g. months. Closed windows
+    that ended at least settle before now are immutable, so they are read from
+    the database once and stored as .npz file in the cache directory. The open
+    window that contains now, and any window that may still receive late rows,
+    is always read from the database.
+
+    Rows can still be backfilled into a closed window, so each cache file keeps
+    the count and latest timestamp of raw rows of its window. They are checked
+    with one aggregate query on every read, and the window is read again if
+    they changed.
+
+    Cache files are plain .npz arrays loaded without pickle. Timestamps are
+    stored as datetime64 and other object columns, e.g. JSON, as JSON strings.
+
+    Cache files are evicted in least recently used order when the cache size
+    exceeds max_bytes.
+
+    Example:
+
+    .. code-block:: python
+
+        cache = RangeCache(engine, "/var/cache/meteo")
+        data = cache.read(CR6, start, end, columns=["rainfall"])
+    """
+
+    def __init__(
+        self,
+        engine,
+        directory,
+        max_bytes=1024 * 1024 * 1024,
+        period=MONTH,
+        settle=datetime.timedelta(hours=1),
+        clock=datetime.datetime.now,
+    ):
+        self.engine = engine
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.period = period
+        self.settle = settle
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._files())
+
+    def _files(self):
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(CACHE_SUFFIX)
+        ]
+
+    def size(self):
+        """
+        Return total size of cache files in bytes.
+        """
+        return self._size
+
+    def cache_path(self, model, window, columns, resolution):
+        """
+        Get cache file path of window of (table, columns, resolution).
+        """
+        key = json.dumps(
+            [
+                self.engine.url.render_as_string(hide_password=True),
+                get_table(model).name,
+                resolution,
+                list(columns) if columns is not None else None,
+                self.period,
+                window.isoformat(),
+            ]
+        )
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + CACHE_SUFFIX)
+
+    def is_closed(self, window_end):
+        """
+        Return True if window ending at window_end can't receive new rows.
+        """
+        now = self.clock().replace(tzinfo=None)
+        return window_end + self.settle <= now
+
+    def _validator(self, model, window, window_end):
+        """
+        Get row count and latest timestamp in microseconds of raw rows of
+        window as array.
+        """
+        time_column = get_time_column(model)
+        with self.engine.connect() as conn:
+            count, latest = conn.execute(
+                select(func.count(), func.max(time_column)).where(
+                    time_column >= window, time_column < window_end
+                )
+            ).one()
+        if latest is None:
+            latest = -1
+        else:
+            latest = np.datetime64(latest.replace(tzinfo=None), "us").astype(np.int64)
+        return np.array([count, latest], dtype=np.int64)
+
+    def _load(self, path, validator):
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                if not np.array_equal(f["__validator__"], validator):
+                    logger.debug("Stale cache file %s", path)
+                    return None
+                names = f["__names__"].tolist()
+                encoded = set(f["__json__"].tolist())
+                data = collections.OrderedDict()
+                for name in names:
+                    values = f[name]
+                    if name in encoded:
+                        decoded = np.empty(len(values), dtype=object)
+                        for i, value in enumerate(values.tolist()):
+                            decoded[i] = json.loads(value)
+                        values = decoded
+                    data[name] = values
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Invalid cache file %s: %s", path, e)
+            return None
+        # Mark as recently used.
+        os.utime(path)
+        return data
+
+    def _save(self, path, data, validator):
+        arrays = {}
+        encoded = []
+        for name, values in data.items():
+            if values.dtype == object:
+                values = np.array([json.dumps(value) for value in values], dtype=str)
+                encoded.append(name)
+            arrays[name] = values
+
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                __names__=np.array(list(data), dtype=str),
+                __json__=np.array(encoded, dtype=str),
+                __validator__=validator,
+                **arrays
+            )
+        size = os.path.getsize(tmp)
+        with self._lock:
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.replace(tmp, path)
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        files = sorted(self._files(), key=os.path.getmtime)
+        for path in files:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            logger.debug("Evicted cache file %s", path)
+
+    def _read_window(self, model, window, window_end, columns, resolution):
+        fetch_end = window_end - datetime.timedelta(microseconds=1)
+        if not self.is_closed(window_end):
+            return read_range(
+                self.engine, model, window, fetch_end, columns, resolution=resolution
+            )
+
+        path = self.cache_path(model, window, columns, resolution)
+        # Rows inserted after this are caught by the next read.
+        validator = self._validator(model, window, window_end)
+        data = self._load(path, validator) if os.path.exists(path) else None
+        if data is not None:
+            self.hits += 1
+            return data
+
+        self.misses += 1
+        data = read_range(
+            self.engine, model, window, fetch_end, columns, resolution=resolution
+        )
+        self._save(path, data, validator)
+        return data
+
+    def read(self, model, start, end, columns=None, resolution=None, as_frame=False):
+        """
+        Read rows of model with timestamp from start to end inclusive. It takes
+        the same arguments as :func:`meteo.db.query.read_range`.
+        """
+        start = start.replace(tzinfo=None)
+        end = end.replace(tzinfo=None)
+        if end < start:
+            raise ValueError("End {} is before start {}".format(end, start))
+        if resolution == AUTO:
+            # Resolve it once, so all windows use the same resolution.
+            resolution = choose_resolution(start, end)
+
+        chunks = []
+        window = datetime.datetime.combine(
+            period_start(start, self.period), datetime.time()
+        )
+        while window <= end:
+            window_end = datetime.datetime.combine(
+                next_period(window.date(), self.period), datetime.time()
+            )
+            chunks.append(
+                self._read_window(model, window, window_end, columns, resolution)
+            )
+            window = window_end
+
+        names = list(chunks[0])
+        time_name = names[0]
+        data = collections.OrderedDict(
+            (name, np.concatenate([chunk[name] for chunk in chunks])) for name in names
+        )
+        # Trim windows to the requested range.
+        timestamps = data[time_name]
+        if resolution is not None:
+            # Rollup bucket that contains start is included.
+            start = floor_time(start, resolution)
+        lo = np.searchsorted(timestamps, np.datetime64(start, "us"), side="left")
+        hi = np.searchsorted(timestamps, np.datetime64(end, "us"), side="right")
+        data = collections.OrderedDict(
+            (name, values[lo:hi]) for name, values in data.items()
+        )
+
+        if as_frame:
+            import pandas as pd
+
+            return pd.DataFrame(data)
+        return data
+
+    def clear(self):
+        """
+        Remove all cache files.
+        """
+        with self._lock:
+            for path in self._files():
+                os.unlink(path)
+            self._size = 0
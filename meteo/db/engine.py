@@ -1,5 +1,138 @@
-def prepare(base_class, engine):
+import logging
+import os
+import pickle
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+# Default connection pool options of engines created by get_engine().
+POOL_OPTIONS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    # MySQL closes idle connections after wait_timeout (8 hours by default).
+    "pool_recycle": 3600,
+    "pool_pre_ping": True,
+}
+
+logger = logging.getLogger(__name__)
+
+_engines = {}
+_engines_lock = threading.Lock()
+_engines_pid = os.getpid()
+
+
+def _engine_options(url, options):
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite uses its own pool that does not accept pool size options.
+        defaults = {}
+        options = dict(
+            (k, v)
+            for k, v in options.items()
+            if k not in ("pool_size", "max_overflow", "pool_timeout")
+        )
+    else:
+        defaults = POOL_OPTIONS
+    return dict(defaults, **options)
+
+
+def get_engine(url, **options):
     """
-    Reflect base class to current database engine.
+    Get shared SQLAlchemy engine of database URL.
+
+    Engines are cached by URL and options, so the connection pool is created
+    once per process and connections are reused across callers. Options are
+    passed to :func:`sqlalchemy.create_engine` and override
+    :data:`POOL_OPTIONS`, e.g. pool_size, max_overflow, pool_recycle, and
+    pool_pre_ping.
+
+    Engines cached before a fork are not shared with the child process,
+    because pooled connections must not be used by more than one process.
     """
-    base_class.prepare(engine, reflect=True)
+    global _engines_pid
+
+    url = str(url)
+    options = _engine_options(url, options)
+    key = (url, tuple(sorted(options.items())))
+    with _engines_lock:
+        if _engines_pid != os.getpid():
+            for engine in _engines.values():
+                engine.dispose(close=False)
+            _engines.clear()
+            _engines_pid = os.getpid()
+
+        engine = _engines.get(key)
+        if engine is None:
+            engine = create_engine(url, **options)
+            _engines[key] = engine
+        return engine
+
+
+def dispose_engines():
+    """
+    Dispose and forget all engines created by get_engine().
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def load_metadata_cache(path):
+    """
+    Load pickled SQLAlchemy metadata from cache file. Return None if the cache
+    file does not exist or can't be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Failed to load metadata cache %s: %s", path, e)
+        return None
+
+
+def save_metadata_cache(metadata, path):
+    """
+    Pickle SQLAlchemy metadata to cache file atomically.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        pickle.dump(metadata, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def prepare(base_class, engine=None, reflect=True, cache_path=None):
+    """
+    Prepare automap base class so its models can be used.
+
+    If reflect is False or engine is None, only models declared in the code are
+    mapped and the database is not queried at all.
+
+    Otherwise the database is reflected. If cache_path is set, reflected tables
+    are pickled to the cache file and loaded from it on the next call instead
+    of querying the database. Remove the cache file to reflect again after the
+    database schema changes. Declared models always take precedence over cached
+    tables.
+    """
+    if engine is None or not reflect:
+        base_class.prepare()
+        return
+
+    if cache_path:
+        metadata = load_metadata_cache(cache_path)
+        if metadata is not None:
+            for table in metadata.sorted_tables:
+                if table.key not in base_class.metadata.tables:
+                    table.to_metadata(base_class.metadata)
+            base_class.prepare()
+            logger.debug("Loaded metadata from cache %s", cache_path)
+            return
+
+    base_class.prepare(autoload_with=engine)
+    if cache_path:
+        save_metadata_cache(base_class.metadata, cache_path)
+        logger.debug("Saved metadata to cache %s", cache_path)
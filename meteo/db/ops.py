@@ -1,3 +1,6 @@
+from sqlalchemy import Column, DateTime, inspect
+from sqlalchemy.exc import InvalidRequestError
+
 from .sessions import session_scope
 
 
@@ -11,3 +14,212 @@ def bulk_insert(engine, model, entries):
     with session_scope(engine) as session:
         session.bulk_insert_mappings(model, entries)
         session.commit()
+
+
+def get_table(model):
+    """
+    Get SQLAlchemy table of model class. Return model itself if it is already a
+    table.
+    """
+    return getattr(model, "__table__", model)
+
+
+def get_time_column(model):
+    """
+    Get DateTime primary key column of model, e.g. timestamp.
+    """
+    table = get_table(model)
+    for column in table.primary_key.columns:
+        if isinstance(column.type, DateTime):
+            return column
+    raise ValueError("Table {} has no DateTime primary key".format(table.name))
+
+
+def get_column_keys(model):
+    """
+    Get mapping of model attribute name to table column key.
+
+    Some models use attribute names that differ from column names, e.g.
+    CR6.timestamp is stored in record_timestamp column.
+    """
+    table = get_table(model)
+    keys = dict((column.key, column.key) for column in table.columns)
+    if table is model:
+        return keys
+
+    try:
+        mapper = inspect(model)
+        for attr in mapper.column_attrs:
+            keys[attr.key] = attr.columns[0].key
+    except InvalidRequestError:
+        # Automap classes are not mapped until the base is prepared. Read
+        # declared columns from the class instead.
+        for cls in reversed(model.__mro__):
+            for name, value in vars(cls).items():
+                if isinstance(value, Column):
+                    keys[name] = value.key
+    return keys
+
+
+def to_table_rows(model, entries):
+    """
+    Convert entries keyed by model attribute names into rows keyed by table
+    column keys, so they can be used in Core insert statements. Unknown keys
+    are ignored like in session bulk insert mappings.
+    """
+    keys = get_column_keys(model)
+    return [
+        dict((keys[k], v) for k, v in entry.items() if k in keys) for entry in entries
+    ]
+
+
+def iter_chunks(entries, chunk_size):
+    """
+    Split iterable of entries into lists of at most chunk_size items.
+    """
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def uniform_rows(rows):
+    """
+    Make all rows have the same keys, because all rows of one executemany
+    statement must have the same keys. Missing values are set to None. Return
+    rows and set of keys.
+
+    Only use it for inserts that never update existing rows, because missing
+    values would overwrite stored ones with NULL. See :func:`group_rows`.
+    """
+    columns = set()
+    for row in rows:
+        columns.update(row)
+    if any(len(row) != len(columns) for row in rows):
+        rows = [dict((key, row.get(key)) for key in columns) for row in rows]
+    return rows, columns
+
+
+def group_rows(rows):
+    """
+    Split rows into runs of consecutive rows with the same keys, so each run
+    can be one executemany statement without adding missing values. Rows keep
+    their order, so a later row with the same primary key still wins. Return
+    list of (set of keys, rows) tuples.
+    """
+    groups = []
+    for row in rows:
+        columns = frozenset(row)
+        if groups and groups[-1][0] == columns:
+            groups[-1][1].append(row)
+        else:
+            groups.append((columns, [row]))
+    return groups
+
+
+def chunked_insert(engine, model, entries, chunk_size=1000):
+    """
+    Insert entries to database model in chunks of chunk_size rows.
+
+    Entries are keyed by model attribute names. Each chunk is one executemany
+    statement committed in its own transaction, so the table is never locked
+    for the whole load. Return number of inserted entries.
+    """
+    table = get_table(model)
+    stmt = table.insert()
+    count = 0
+    for chunk in iter_chunks(entries, chunk_size):
+        rows, _ = uniform_rows(to_table_rows(model, chunk))
+        with engine.begin() as conn:
+            conn.execute(stmt, rows)
+        count += len(chunk)
+    return count
+
+
+def upsert_statement(table, dialect, columns=None, update=True):
+    """
+    Create dialect-native insert statement that updates or ignores rows whose
+    primary key already exists.
+
+    MySQL uses ON DUPLICATE KEY UPDATE or INSERT IGNORE, and SQLite and
+    PostgreSQL use ON CONFLICT DO UPDATE or DO NOTHING.
+
+    :param table: SQLAlchemy table.
+    :param dialect: SQLAlchemy dialect name, e.g. mysql.
+    :param columns: Column keys to update on conflict. Default to all non
+        primary key columns.
+    :param update: If False, existing rows are left untouched (insert-ignore).
+    """
+    primary_keys = [column.key for column in table.primary_key.columns]
+    updates = [
+        column.key
+        for column in table.columns
+        if column.key not in primary_keys and (columns is None or column.key in columns)
+    ]
+    if not updates:
+        update = False
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table)
+        if update:
+            return stmt.on_duplicate_key_update(
+                dict((key, stmt.inserted[key]) for key in updates)
+            )
+        return stmt.prefix_with("IGNORE")
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(table)
+        if update:
+            return stmt.on_conflict_do_update(
+                index_elements=primary_keys,
+                set_=dict((key, stmt.excluded[key]) for key in updates),
+            )
+        return stmt.on_conflict_do_nothing(index_elements=primary_keys)
+
+    raise NotImplementedError("Upsert is not supported for {} dialect".format(dialect))
+
+
+def bulk_upsert(engine, model, entries, chunk_size=1000, update=True):
+    """
+    Insert entries to database model, updating rows whose primary key already
+    exists. If update is False, existing rows are left untouched instead
+    (insert-ignore).
+
+    Entries are keyed by model attribute names and inserted in chunks of
+    chunk_size rows, each committed in its own transaction. Only the columns
+    of an entry are updated, so entries with different keys are executed as
+    separate statements, see :func:`group_rows`. Return number of processed
+    entries.
+    """
+    table = get_table(model)
+    dialect = engine.dialect.name
+    statements = {}
+    count = 0
+    for chunk in iter_chunks(entries, chunk_size):
+        rows = to_table_rows(model, chunk)
+        if update:
+            groups = group_rows(rows)
+        else:
+            rows, columns = uniform_rows(rows)
+            groups = [(frozenset(columns), rows)]
+
+        with engine.begin() as conn:
+            for columns, rows in groups:
+                if columns not in statements:
+                    statements[columns] = upsert_statement(
+                        table, dialect, columns=columns, update=update
+                    )
+                conn.execute(statements[columns], rows)
+        count += len(chunk)
+    return count
@@ -0,0 +1,230 @@
+import collections
+import datetime
+import logging
+import re
+
+from sqlalchemy import text
+
+from .ops import get_table, get_time_column
+
+logger = logging.getLogger(__name__)
+
+MONTH = "month"
+YEAR = "year"
+PERIODS = [MONTH, YEAR]
+
+# Name of MySQL partition that catches rows beyond the last partition.
+MAX_PARTITION = "pmax"
+
+Partition = collections.namedtuple("Partition", ["name", "start", "end"])
+
+
+class PartitionError(Exception):
+    pass
+
+
+def period_start(date, period=MONTH):
+    """
+    Get start date of period that contains date.
+    """
+    if period == MONTH:
+        return datetime.date(date.year, date.month, 1)
+    if period == YEAR:
+        return datetime.date(date.year, 1, 1)
+    raise PartitionError("Unknown partition period: {}".format(period))
+
+
+def next_period(start, period=MONTH):
+    """
+    Get start date of the period after the period starting at start.
+    """
+    if period == MONTH:
+        if start.month == 12:
+            return datetime.date(start.year + 1, 1, 1)
+        return datetime.date(start.year, start.month + 1, 1)
+    if period == YEAR:
+        return datetime.date(start.year + 1, 1, 1)
+    raise PartitionError("Unknown partition period: {}".format(period))
+
+
+def partition_name(start, period=MONTH):
+    """
+    Get partition name of period, e.g. p202601 or p2026.
+    """
+    if period == MONTH:
+        return "p{:04d}{:02d}".format(start.year, start.month)
+    return "p{:04d}".format(start.year)
+
+
+def parse_partition_name(name):
+    """
+    Parse partition name into Partition. Return None if it is not a period
+    partition, e.g. pmax.
+    """
+    match = re.match(r"^p(\d{4})(\d{2})?$", name)
+    if match is None:
+        return None
+    year, month = match.groups()
+    if month is None:
+        start = datetime.date(int(year), 1, 1)
+        return Partition(name, start, next_period(start, YEAR))
+    start = datetime.date(int(year), int(month), 1)
+    return Partition(name, start, next_period(start, MONTH))
+
+
+def iter_periods(start, end, period=MONTH):
+    """
+    Iterate Partition of each period from the period containing start up to
+    and including the period containing end.
+    """
+    current = period_start(start, period)
+    while current <= end:
+        following = next_period(current, period)
+        yield Partition(partition_name(current, period), current, following)
+        current = following
+
+
+def partition_column(model):
+    """
+    Get partitioning column of model, that is its DateTime primary key.
+    MySQL requires partitioning column to be part of every unique key.
+    """
+    try:
+        return get_time_column(model)
+    except ValueError as e:
+        raise PartitionError(str(e))
+
+
+def _check_dialect(engine):
+    if engine.dialect.name != "mysql":
+        raise NotImplementedError(
+            "Partitioning is only supported for mysql dialect, not {}".format(
+                engine.dialect.name
+            )
+        )
+
+
+def list_partitions(engine, model):
+    """
+    Get list of period partitions of model ordered by start date.
+    """
+    _check_dialect(engine)
+    table = get_table(model)
+    query = text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+        "AND PARTITION_NAME IS NOT NULL"
+    )
+    with engine.connect() as conn:
+        names = [row[0] for row in conn.execute(query, {"table": table.name})]
+
+    partitions = [parse_partition_name(name) for name in names]
+    return sorted((p for p in partitions if p is not None), key=lambda p: p.start)
+
+
+def _mysql_partition_definitions(partitions):
+    definitions = [
+        "PARTITION {} VALUES LESS THAN (TO_DAYS('{}'))".format(
+            p.name, p.end.isoformat()
+        )
+        for p in partitions
+    ]
+    definitions.append("PARTITION {} VALUES LESS THAN MAXVALUE".format(MAX_PARTITION))
+    return ", ".join(definitions)
+
+
+def _missing_partitions(existing, partitions):
+    if not existing:
+        return list(partitions)
+    # New partitions can only be split from the catch-all partition.
+    last = existing[-1].end
+    return [p for p in partitions if p.start >= last]
+
+
+def create_partitions(engine, model, start, end, period=MONTH, dry_run=False):
+    """
+    Create partitions of model for periods from start to end. Existing
+    partitions are skipped. Return list of created Partition.
+
+    The table is partitioned by RANGE on TO_DAYS of its timestamp primary key,
+    with a catch-all partition for rows beyond the last period. Queries with
+    timestamp range only scan the matching partitions, and inserts are routed
+    to partitions by MySQL, so readers and writers use the table as usual.
+    Only MySQL is supported.
+
+    If dry_run is True, nothing is changed.
+    """
+    table = get_table(model)
+    column = partition_column(table)
+    existing = list_partitions(engine, table)
+    partitions = _missing_partitions(existing, iter_periods(start, end, period))
+    if not partitions or dry_run:
+        return partitions
+
+    if not existing:
+        # Partitioning existing table rebuilds it. Rows older than the first
+        # partition are kept in the first partition.
+        statement = "ALTER TABLE {} PARTITION BY RANGE (TO_DAYS({})) ({})".format(
+            table.name, column.name, _mysql_partition_definitions(partitions)
+        )
+    else:
+        statement = "ALTER TABLE {} REORGANIZE PARTITION {} INTO ({})".format(
+            table.name,
+            MAX_PARTITION,
+            _mysql_partition_definitions(partitions),
+        )
+    with engine.begin() as conn:
+        conn.execute(text(statement))
+
+    for partition in partitions:
+        logger.info("Created partition %s of %s", partition.name, table.name)
+    return partitions
+
+
+def rotate_partitions(
+    engine, model, period=MONTH, ahead=3, keep=None, today=None, dry_run=False
+):
+    """
+    Create partitions for the current and the next ahead periods, and drop
+    partitions older than keep periods if keep is set. It is meant to be run
+    periodically, e.g. daily from cron. Return (created, dropped). If dry_run
+    is True, nothing is changed.
+    """
+    today = today or datetime.date.today()
+    end = period_start(today, period)
+    for _ in range(ahead):
+        end = next_period(end, period)
+    created = create_partitions(engine, model, today, end, period, dry_run=dry_run)
+
+    dropped = []
+    if keep is not None:
+        before = period_start(today, period)
+        for _ in range(keep):
+            before = period_start(before - datetime.timedelta(days=1), period)
+        dropped = drop_partitions(engine, model, before, dry_run=dry_run)
+    return created, dropped
+
+
+def drop_partitions(engine, model, before, dry_run=False):
+    """
+    Drop partitions whose whole period is before date. Rows in them are
+    removed instantly without row by row deletes. Return list of dropped
+    Partition. If dry_run is True, nothing is changed.
+    """
+    table = get_table(model)
+    partitions = [p for p in list_partitions(engine, table) if p.end <= before]
+    if not partitions or dry_run:
+        return partitions
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "ALTER TABLE {} DROP PARTITION {}".format(
+                    table.name, ", ".join(p.name for p in partitions)
+                )
+            )
+        )
+
+    for partition in partitions:
+        logger.info("Dropped partition %s of %s", partition.name, table.name)
+    return partitions
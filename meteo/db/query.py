@@ -0,0 +1,191 @@
+import collections
+
+import numpy as np
+from sqlalchemy import DateTime, Float, Integer, select
+
+from .ops import get_column_keys, get_table, get_time_column
+from .rollup import choose_resolution, floor_time, get_rollup_table
+
+DEFAULT_CHUNK_SIZE = 10000
+
+AUTO = "auto"
+
+
+class QueryError(Exception):
+    pass
+
+
+def _resolve_source(model, start, end, resolution, max_points):
+    """
+    Get (table, time column, mapping of output name to column) to read from.
+    """
+    if resolution == AUTO:
+        resolution = choose_resolution(start, end, max_points)
+
+    if resolution is None:
+        table = get_table(model)
+        keys = get_column_keys(model)
+        columns = collections.OrderedDict()
+        # Keep table column order and prefer model attribute names.
+        names = dict((v, k) for k, v in keys.items() if k != v)
+        for column in table.columns:
+            columns[names.get(column.key, column.key)] = column
+        return table, get_time_column(table), columns, start
+
+    table = get_rollup_table(model, resolution)
+    columns = collections.OrderedDict((c.key, c) for c in table.columns)
+    # Include the bucket that contains start.
+    return table, table.c.timestamp, columns, floor_time(start, resolution)
+
+
+def _column_array(column, values):
+    if isinstance(column.type, DateTime):
+        return np.array(
+            [v.replace(tzinfo=None) if v is not None else None for v in values],
+            dtype="datetime64[us]",
+        )
+    if isinstance(column.type, Float):
+        return np.array(values, dtype=np.float64)
+    if isinstance(column.type, Integer):
+        if any(v is None for v in values):
+            return np.array(values, dtype=np.float64)
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=object)
+
+
+def _to_columns(names, columns, rows):
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    return collections.OrderedDict(
+        (name, _column_array(column, value))
+        for name, column, value in zip(names, columns, values)
+    )
+
+
+def _select_columns(table, time_column, available, columns):
+    time_name = next(
+        name for name, column in available.items() if column is time_column
+    )
+    if columns is None:
+        names = list(available)
+    else:
+        unknown = [name for name in columns if name not in available]
+        if unknown:
+            raise QueryError(
+                "Unknown columns of {}: {}".format(table.name, ", ".join(unknown))
+            )
+        names = [time_name] + [name for name in columns if name != time_name]
+    return names, [available[name] for name in names]
+
+
+def get_columns(model, columns=None):
+    """
+    Get (names, columns) of raw table columns read from model. Names are model
+    attribute names, and the timestamp is always the first one.
+    """
+    table, time_column, available, _ = _resolve_source(model, None, None, None, None)
+    return _select_columns(table, time_column, available, columns)
+
+
+def _range_query(model, start, end, columns, resolution, max_points):
+    """
+    Create select statement of time range. Return (statement, names, columns).
+    """
+    table, time_column, available, start = _resolve_source(
+        model, start, end, resolution, max_points
+    )
+    names, selected = _select_columns(table, time_column, available, columns)
+    stmt = (
+        select(*selected)
+        .where(time_column >= start, time_column <= end)
+        .order_by(time_column)
+    )
+    return stmt, names, selected
+
+
+def iter_range(
+    engine,
+    model,
+    start,
+    end,
+    columns=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    as_frame=False,
+    resolution=None,
+    max_points=2000,
+):
+    """
+    Stream rows of model with timestamp from start to end inclusive, ordered by
+    timestamp, in chunks of at most chunk_size rows.
+
+    Rows are fetched with a server-side cursor, so memory use does not depend
+    on the range length. Each chunk is a dictionary of column name and NumPy
+    array, or pandas DataFrame if as_frame is True. Timestamps are
+    datetime64[us], float columns are float64 with NaN for missing values.
+
+    :param engine: SQLAlchemy engine.
+    :param model: Station or CR6 model, or table.
+    :param start: Start datetime.
+    :param end: End datetime.
+    :param columns: Column names to read, default to all. Model attribute names
+        are used, e.g. timestamp of CR6. The timestamp is always included.
+    :param chunk_size: Number of rows per chunk.
+    :param as_frame: If True, yield pandas DataFrame.
+    :param resolution: Rollup resolution to read from, e.g. 1h, or auto to
+        choose it from the range length and max_points. Default to raw data.
+    :param max_points: Maximum number of points of auto resolution.
+    """
+    stmt, names, selected = _range_query(
+        model, start, end, columns, resolution, max_points
+    )
+    if as_frame:
+        import pandas as pd
+
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=chunk_size
+        ).execute(stmt)
+        for rows in result.partitions(chunk_size):
+            chunk = _to_columns(names, selected, rows)
+            yield pd.DataFrame(chunk) if as_frame else chunk
+
+
+def read_range(
+    engine,
+    model,
+    start,
+    end,
+    columns=None,
+    as_frame=False,
+    resolution=None,
+    max_points=2000,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """
+    Read rows of model with timestamp from start to end inclusive. It takes the
+    same arguments as :func:`iter_range`, but returns all rows at once.
+    """
+    _, names, selected = _range_query(
+        model, start, end, columns, resolution, max_points
+    )
+    chunks = list(
+        iter_range(
+            engine,
+            model,
+            start,
+            end,
+            columns=columns,
+            chunk_size=chunk_size,
+            resolution=resolution,
+            max_points=max_points,
+        )
+    )
+    if not chunks:
+        chunks = [_to_columns(names, selected, [])]
+    data = collections.OrderedDict(
+        (name, np.concatenate([chunk[name] for chunk in chunks])) for name in names
+    )
+    if as_frame:
+        import pandas as pd
+
+        return pd.DataFrame(data)
+    return data
@@ -0,0 +1,413 @@
+import collections
+import datetime
+import logging
+import math
+import threading
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    Table,
+    func,
+    inspect,
+    select,
+)
+
+from .ops import get_table, get_time_column
+
+logger = logging.getLogger(__name__)
+
+# Rollup resolutions from the finest to the coarsest. Every resolution divides
+# the next one, and the coarsest divides a day.
+RESOLUTIONS = collections.OrderedDict(
+    [
+        ("10min", datetime.timedelta(minutes=10)),
+        ("1h", datetime.timedelta(hours=1)),
+        ("1d", datetime.timedelta(days=1)),
+    ]
+)
+
+# Interval of raw data rows.
+RAW_INTERVAL = datetime.timedelta(minutes=1)
+
+# Fields that are summed in rollups, e.g. rain amount per interval.
+TOTAL_FIELDS = ("rain_acc",)
+
+# Directions in degrees that are vector-averaged in rollups.
+DIRECTION_FIELDS = ("wind_direction_avg", "wind_direction")
+
+# Fields that have no meaningful rollup.
+IGNORED_FIELDS = ("wind_direction_min", "wind_direction_max")
+
+# Buckets are aligned to midnight.
+EPOCH = datetime.datetime(2000, 1, 1)
+
+RollupSpec = collections.namedtuple(
+    "RollupSpec", ["time_key", "scalars", "totals", "directions"]
+)
+
+metadata = MetaData()
+
+_tables_lock = threading.Lock()
+
+
+class RollupError(Exception):
+    pass
+
+
+def get_resolution(resolution):
+    try:
+        return RESOLUTIONS[resolution]
+    except KeyError:
+        raise RollupError("Unknown rollup resolution: {}".format(resolution))
+
+
+def floor_time(timestamp, resolution):
+    """
+    Get start of resolution bucket that contains timestamp.
+    """
+    delta = get_resolution(resolution)
+    timestamp = timestamp.replace(tzinfo=None)
+    return timestamp - (timestamp - EPOCH) % delta
+
+
+def rollup_spec(model):
+    """
+    Get RollupSpec of model, i.e. which columns are min/avg/max-aggregated,
+    summed, and vector-averaged.
+    """
+    table = get_table(model)
+    time_key = get_time_column(table).key
+    scalars, totals, directions = [], [], []
+    for column in table.columns:
+        if column.key == time_key or not isinstance(column.type, Float):
+            continue
+        if column.key in TOTAL_FIELDS:
+            totals.append(column.key)
+        elif column.key in DIRECTION_FIELDS:
+            directions.append(column.key)
+        elif column.key not in IGNORED_FIELDS:
+            scalars.append(column.key)
+    return RollupSpec(time_key, scalars, totals, directions)
+
+
+def rollup_table_name(table_name, resolution):
+    return "{}_{}".format(table_name, resolution)
+
+
+def get_rollup_table(model, resolution):
+    """
+    Get rollup table of model at resolution, e.g. babadan_1h.
+
+    It has bucket start timestamp, number of raw rows, min/avg/max of each
+    scalar field, total of each total field, and vector average of each
+    direction field. Each field also has its count of non-null values, and
+    scalar and direction fields their sum and sums of sine and cosine, so
+    coarser buckets are merged exactly from finer ones, see :func:`merge`.
+    """
+    get_resolution(resolution)
+    table = get_table(model)
+    name = rollup_table_name(table.name, resolution)
+    with _tables_lock:
+        if name in metadata.tables:
+            return metadata.tables[name]
+
+        spec = rollup_spec(table)
+        columns = [
+            Column("timestamp", DateTime, primary_key=True, autoincrement=False),
+            Column("count", Integer, nullable=False),
+        ]
+        for key in spec.scalars + spec.totals + spec.directions:
+            columns.append(
+                Column("{}_count".format(key), Integer, nullable=False, default=0)
+            )
+        for key in spec.scalars:
+            for suffix in ("min", "avg", "max", "sum"):
+                columns.append(
+                    Column("{}_{}".format(key, suffix), Float, nullable=True)
+                )
+        for key in spec.totals:
+            columns.append(Column("{}_total".format(key), Float, nullable=True))
+        for key in spec.directions:
+            columns.append(Column(key, Float, nullable=True))
+            for suffix in ("sin", "cos"):
+                columns.append(
+                    Column("{}_{}".format(key, suffix), Float, nullable=True)
+                )
+        return Table(name, metadata, *columns)
+
+
+def create_rollup_tables(engine, model, resolutions=None, dry_run=False):
+    """
+    Create rollup tables of model. Existing tables are skipped. Return list of
+    created tables. If dry_run is True, nothing is changed.
+    """
+    tables = [
+        get_rollup_table(model, resolution)
+        for resolution in (resolutions or RESOLUTIONS)
+    ]
+    existing = set(inspect(engine).get_table_names())
+    missing = [table for table in tables if table.name not in existing]
+    if missing and not dry_run:
+        metadata.create_all(engine, tables=missing)
+    return missing
+
+
+def _present(values):
+    return [value for value in values if value is not None]
+
+
+def _fsum(values):
+    values = _present(values)
+    return math.fsum(values) if values else None
+
+
+def _finish(spec, result):
+    for key in spec.scalars:
+        count = result[key + "_count"]
+        result[key + "_avg"] = result[key + "_sum"] / count if count else None
+    for key in spec.directions:
+        if result[key + "_count"]:
+            # Average of unit vectors, so 350 and 10 degrees average to 0.
+            angle = math.atan2(result[key + "_sin"], result[key + "_cos"])
+            result[key] = math.degrees(angle) % 360.0
+        else:
+            result[key] = None
+    return result
+
+
+def summarize(spec, timestamp, rows):
+    """
+    Aggregate raw rows of one bucket into rollup row.
+    """
+    result = {"timestamp": timestamp, "count": len(rows)}
+    for key in spec.scalars:
+        values = _present(row[key] for row in rows)
+        result[key + "_count"] = len(values)
+        result[key + "_sum"] = _fsum(values)
+        result[key + "_min"] = min(values) if values else None
+        result[key + "_max"] = max(values) if values else None
+    for key in spec.totals:
+        values = _present(row[key] for row in rows)
+        result[key + "_count"] = len(values)
+        result[key + "_total"] = _fsum(values)
+    for key in spec.directions:
+        values = [math.radians(value) for value in _present(row[key] for row in rows)]
+        result[key + "_count"] = len(values)
+        result[key + "_sin"] = _fsum(math.sin(value) for value in values)
+        result[key + "_cos"] = _fsum(math.cos(value) for value in values)
+    return _finish(spec, result)
+
+
+def merge(spec, timestamp, rows):
+    """
+    Merge rollup rows of finer buckets into rollup row of one coarser bucket.
+    """
+    result = {"timestamp": timestamp, "count": sum(row["count"] for row in rows)}
+    for key in spec.scalars + spec.totals + spec.directions:
+        result[key + "_count"] = sum(row[key + "_count"] for row in rows)
+    for key in spec.scalars:
+        values = _present(row[key + "_min"] for row in rows)
+        result[key + "_min"] = min(values) if values else None
+        values = _present(row[key + "_max"] for row in rows)
+        result[key + "_max"] = max(values) if values else None
+        result[key + "_sum"] = _fsum(row[key + "_sum"] for row in rows)
+    for key in spec.totals:
+        result[key + "_total"] = _fsum(row[key + "_total"] for row in rows)
+    for key in spec.directions:
+        for suffix in ("_sin", "_cos"):
+            result[key + suffix] = _fsum(row[key + suffix] for row in rows)
+    return _finish(spec, result)
+
+
+def _fetch_raw(conn, table, spec, start, end):
+    time_column = table.c[spec.time_key]
+    keys = [spec.time_key] + spec.scalars + spec.totals + spec.directions
+    stmt = (
+        select(*[table.c[key] for key in keys])
+        .where(time_column >= start, time_column < end)
+        .order_by(time_column)
+    )
+    return [row._mapping for row in conn.execute(stmt)]
+
+
+def _fetch_rollup(conn, rollup, start, end):
+    stmt = (
+        select(rollup)
+        .where(rollup.c.timestamp >= start, rollup.c.timestamp < end)
+        .order_by(rollup.c.timestamp)
+    )
+    return [row._mapping for row in conn.execute(stmt)]
+
+
+def update_rollups(engine, model, start, end, resolutions=None):
+    """
+    Recompute rollup buckets of model that overlap timestamps from start to
+    end inclusive. Return number of written rollup rows.
+
+    Only buckets of the finest resolution are computed from raw rows, i.e.
+    raw rows from the start of the bucket that contains start to the end of
+    the bucket that contains end. Each coarser bucket is merged from the
+    finer rollup rows it contains. Buckets replace the existing ones in one
+    transaction, so it is idempotent and picks up late or corrected rows.
+    """
+    resolutions = sorted(resolutions or RESOLUTIONS, key=get_resolution)
+    table = get_table(model)
+    spec = rollup_spec(table)
+
+    written = 0
+    with engine.begin() as conn:
+        finer = None
+        for resolution in resolutions:
+            rollup = get_rollup_table(table, resolution)
+            first = floor_time(start, resolution)
+            last = floor_time(end, resolution) + get_resolution(resolution)
+
+            if finer is None:
+                rows = _fetch_raw(conn, table, spec, first, last)
+                time_key, aggregate = spec.time_key, summarize
+            else:
+                rows = _fetch_rollup(conn, finer, first, last)
+                time_key, aggregate = "timestamp", merge
+
+            buckets = collections.OrderedDict()
+            for row in rows:
+                bucket = floor_time(row[time_key], resolution)
+                buckets.setdefault(bucket, []).append(row)
+
+            conn.execute(
+                rollup.delete().where(
+                    rollup.c.timestamp >= first, rollup.c.timestamp < last
+                )
+            )
+            if buckets:
+                conn.execute(
+                    rollup.insert(),
+                    [aggregate(spec, ts, items) for ts, items in buckets.items()],
+                )
+            written += len(buckets)
+            finer = rollup
+    return written
+
+
+def rebuild_rollups(
+    engine, model, start=None, end=None, resolutions=None, window_days=30
+):
+    """
+    Rebuild rollups of model from all raw rows, or raw rows from start to end.
+    Raw rows are processed in windows of window_days days, so memory use stays
+    bounded. Return number of written rollup rows.
+    """
+    table = get_table(model)
+    time_column = get_time_column(table)
+    create_rollup_tables(engine, table, resolutions)
+
+    if start is None or end is None:
+        with engine.connect() as conn:
+            first, last = conn.execute(
+                select(func.min(time_column), func.max(time_column))
+            ).one()
+        if first is None:
+            return 0
+        start = start or first
+        end = end or last
+
+    window = datetime.timedelta(days=window_days)
+    written = 0
+    current = floor_time(start, "1d")
+    while current <= end:
+        # Window end is inclusive, so stop just before the next window.
+        window_end = min(current + window - RAW_INTERVAL, end)
+        written += update_rollups(engine, table, current, window_end, resolutions)
+        logger.info("Rebuilt rollups of %s up to %s", table.name, window_end)
+        current += window
+    return written
+
+
+def choose_resolution(start, end, max_points=2000, resolutions=None):
+    """
+    Choose the finest resolution whose number of points from start to end does
+    not exceed max_points. Return None if raw data is fine enough, or the
+    coarsest resolution if none is.
+    """
+    span = end - start
+    if span / RAW_INTERVAL <= max_points:
+        return None
+    resolutions = sorted(resolutions or RESOLUTIONS, key=get_resolution)
+    for resolution in resolutions:
+        if span / get_resolution(resolution) <= max_points:
+            return resolution
+    return resolutions[-1]
+
+
+def select_range(model, start, end, max_points=2000, resolutions=None):
+    """
+    Create select statement of rows from start to end reading from the rollup
+    table with suitable resolution, or from the raw table for short ranges.
+    Return (statement, resolution).
+    """
+    resolution = choose_resolution(start, end, max_points, resolutions)
+    if resolution is None:
+        table = get_table(model)
+        time_column = get_time_column(table)
+    else:
+        table = get_rollup_table(model, resolution)
+        time_column = table.c.timestamp
+        start = floor_time(start, resolution)
+    stmt = (
+        select(table)
+        .where(time_column >= start, time_column <= end)
+        .order_by(time_column)
+    )
+    return stmt, resolution
+
+
+class RollupUpdater(object):
+    """
+    Keep rollups up to date as raw rows are inserted.
+
+    Use :meth:`update` as insert callback of
+    :class:`meteo.db.writer.BufferedWriter` or :class:`meteo.spool.SpoolDrainer`.
+    Buckets touched by inserted rows are recomputed. If it fails, the range is
+    kept and retried on the next update.
+    """
+
+    def __init__(self, engine, resolutions=None):
+        self.engine = engine
+        self.resolutions = list(resolutions or RESOLUTIONS)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._created = set()
+
+    def update(self, model, rows):
+        """
+        Recompute rollup buckets of model touched by inserted rows. Rows are
+        keyed by table column keys.
+        """
+        table = get_table(model)
+        key = get_time_column(table).key
+        timestamps = [row[key].replace(tzinfo=None) for row in rows if row.get(key)]
+
+        with self._lock:
+            if timestamps:
+                start, end = min(timestamps), max(timestamps)
+                if table in self._pending:
+                    pending_start, pending_end = self._pending[table]
+                    start = min(start, pending_start)
+                    end = max(end, pending_end)
+                self._pending[table] = (start, end)
+
+            if table not in self._pending:
+                return
+            start, end = self._pending[table]
+            try:
+                if table not in self._created:
+                    create_rollup_tables(self.engine, table, self.resolutions)
+                    self._created.add(table)
+                update_rollups(self.engine, table, start, end, self.resolutions)
+                del self._pending[table]
+            except Exception as e:
+                logger.error("Failed to update rollups of %s: %s", table.name, e)
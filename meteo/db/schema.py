@@ -0,0 +1,121 @@
+import collections
+import logging
+
+from sqlalchemy import MetaData, Table, inspect
+from sqlalchemy.schema import CreateIndex, DropIndex, Index
+
+from .ops import get_table
+
+logger = logging.getLogger(__name__)
+
+# Schema profiles. The full profile indexes every column as declared in the
+# models. The lean profile only keeps the primary key and indexes of opted-in
+# columns, so each insert updates far fewer B-trees.
+FULL = "full"
+LEAN = "lean"
+PROFILES = [FULL, LEAN]
+
+IndexChanges = collections.namedtuple("IndexChanges", ["dropped", "created"])
+
+
+class SchemaError(Exception):
+    pass
+
+
+def _column_keys(index):
+    return tuple(column.key for column in index.columns)
+
+
+def profile_indexes(model, profile=FULL, indexed=()):
+    """
+    Get declared indexes of model that are kept in schema profile.
+
+    :param model: SQLAlchemy model or table.
+    :param profile: Schema profile name, full or lean.
+    :param indexed: Column keys to keep indexed in the lean profile.
+    """
+    table = get_table(model)
+    if profile == FULL:
+        return list(table.indexes)
+    if profile != LEAN:
+        raise SchemaError("Unknown schema profile: {}".format(profile))
+
+    unknown = set(indexed) - set(table.columns.keys())
+    if unknown:
+        raise SchemaError(
+            "Unknown columns of {}: {}".format(table.name, ", ".join(sorted(unknown)))
+        )
+
+    primary_key = tuple(column.key for column in table.primary_key.columns)
+    return [
+        index
+        for index in table.indexes
+        # Index that duplicates the primary key is never needed.
+        if _column_keys(index) != primary_key
+        and all(key in indexed for key in _column_keys(index))
+    ]
+
+
+def profile_table(model, profile=FULL, indexed=(), metadata=None):
+    """
+    Copy table of model into metadata with indexes of schema profile only. The
+    copy is used to create the table.
+    """
+    table = get_table(model)
+    keep = set(index.name for index in profile_indexes(table, profile, indexed))
+    copy = table.to_metadata(metadata if metadata is not None else MetaData())
+    for index in list(copy.indexes):
+        if index.name not in keep:
+            copy.indexes.discard(index)
+    return copy
+
+
+def create_tables(engine, models, profile=FULL, indexed=(), dry_run=False):
+    """
+    Create tables of models with schema profile. Existing tables are skipped.
+    Return list of created tables. If dry_run is True, nothing is changed.
+    """
+    metadata = MetaData()
+    tables = [
+        profile_table(model, profile, indexed, metadata=metadata) for model in models
+    ]
+    existing = set(inspect(engine).get_table_names())
+    missing = [table for table in tables if table.name not in existing]
+    if missing and not dry_run:
+        metadata.create_all(engine, tables=missing)
+    return missing
+
+
+def apply_profile(engine, model, profile=FULL, indexed=(), dry_run=False):
+    """
+    Migrate indexes of existing table to schema profile.
+
+    Secondary indexes that are not part of the profile are dropped and missing
+    ones are created, so it can migrate tables both from the full to the lean
+    profile and back. Return IndexChanges with names of dropped and created
+    indexes. If dry_run is True, nothing is changed.
+    """
+    table = get_table(model)
+    wanted = dict(
+        (_column_keys(index), index)
+        for index in profile_indexes(table, profile, indexed)
+    )
+    existing = dict(
+        (tuple(index["column_names"]), index["name"])
+        for index in inspect(engine).get_indexes(table.name)
+    )
+
+    drop = [name for keys, name in existing.items() if keys not in wanted]
+    create = [index for keys, index in wanted.items() if keys not in existing]
+    if not dry_run:
+        # Reflected indexes are dropped through a detached table, so the
+        # declared table is left untouched.
+        detached = Table(table.name, MetaData(), schema=table.schema)
+        with engine.begin() as conn:
+            for name in drop:
+                logger.info("Dropping index %s of %s", name, table.name)
+                conn.execute(DropIndex(Index(name, _table=detached)))
+            for index in create:
+                logger.info("Creating index %s of %s", index.name, table.name)
+                conn.execute(CreateIndex(index))
+    return IndexChanges(drop, [index.name for index in create])
@@ -0,0 +1,327 @@
+import collections
+import logging
+import threading
+import time
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .ops import (
+    get_table,
+    iter_chunks,
+    to_table_rows,
+    uniform_rows,
+    upsert_statement,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter(object):
+    """
+    Buffered database writer for rows of multiple tables.
+
+    Rows are kept in memory and flushed when the number of buffered rows
+    reaches max_rows or the oldest row is older than max_age seconds. Each flush
+    uses one executemany insert per table in its own transaction.
+
+    Size and age are checked when rows are added. Call :meth:`start` to also
+    check them in a background thread, so rows of a source that went quiet are
+    still written after max_age seconds. Otherwise, the caller must call
+    :meth:`flush` periodically.
+
+    Rows of a table that failed to be inserted, e.g. during a short database
+    outage, are kept in a bounded retry queue and retried every max_age
+    seconds. If the retry queue is full, the oldest rows are dropped. If a
+    batch has rows whose primary key already exists, it is inserted again with
+    insert-ignore and the duplicate rows are dropped.
+
+    If on_insert is set, it is called with table and list of rows after the
+    rows are committed, e.g. to update rollups. Dropped duplicate rows are not
+    passed to it.
+
+    Example:
+
+    .. code-block:: python
+
+        writer = BufferedWriter(engine, max_rows=100, max_age=60)
+        writer.start()
+        writer.add(Babadan, entry)
+        ...
+        writer.close()
+    """
+
+    def __init__(
+        self, engine, max_rows=500, max_age=60, max_retry_rows=100000, on_insert=None
+    ):
+        self.engine = engine
+        self.on_insert = on_insert
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.max_retry_rows = max_retry_rows
+
+        self._lock = threading.RLock()
+        self._buffers = collections.OrderedDict()
+        self._retries = collections.OrderedDict()
+        self._size = 0
+        self._retry_size = 0
+        self._oldest = None
+        self._flushed = time.monotonic()
+        self._statements = {}
+
+        self.inserted = 0
+        self.dropped = 0
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def retry_size(self):
+        return self._retry_size
+
+    def add(self, model, row):
+        """
+        Add one row of model to the buffer. Row is keyed by model attribute
+        names. The buffer is flushed if needed.
+        """
+        self.add_many(model, [row])
+
+    def add_many(self, model, rows):
+        """
+        Add rows of model to the buffer. The buffer is flushed if needed.
+        """
+        table = get_table(model)
+        rows = to_table_rows(model, rows)
+        with self._lock:
+            self._buffers.setdefault(table, []).extend(rows)
+            self._size += len(rows)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if self.should_flush():
+                self.flush()
+
+    def should_flush(self):
+        """
+        Return True if the buffer is full, the oldest row is too old, or rows
+        are waiting for retry since the last flush max_age seconds ago.
+        """
+        if self._size >= self.max_rows:
+            return True
+        now = time.monotonic()
+        if self._oldest is not None and now - self._oldest >= self.max_age:
+            return True
+        return bool(self._retry_size) and now - self._flushed >= self.max_age
+
+    def flush_due(self):
+        """
+        Flush if needed. Return number of inserted rows.
+        """
+        with self._lock:
+            if self.should_flush():
+                return self.flush()
+            return 0
+
+    def flush(self):
+        """
+        Insert buffered and retried rows to the database. Return number of
+        inserted rows.
+        """
+        with self._lock:
+            batches = collections.OrderedDict()
+            for buffers in (self._retries, self._buffers):
+                for table, rows in buffers.items():
+                    batches.setdefault(table, []).extend(rows)
+
+            self._buffers = collections.OrderedDict()
+            self._retries = collections.OrderedDict()
+            self._size = 0
+            self._retry_size = 0
+            self._oldest = None
+            self._flushed = time.monotonic()
+
+            inserted = 0
+            for table, rows in batches.items():
+                inserted += self._insert(table, rows)
+            self.inserted += inserted
+            return inserted
+
+    def _insert(self, table, rows):
+        if not rows:
+            return 0
+        # All rows of one executemany statement must have the same keys.
+        rows, columns = uniform_rows(rows)
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(table.insert(), rows)
+            logger.debug("Inserted %s rows to %s", len(rows), table.name)
+            self._inserted(table, rows)
+            return len(rows)
+        except IntegrityError as e:
+            logger.warning(
+                "Integrity error when inserting %s rows to %s. "
+                "Skipping existing rows.",
+                len(rows),
+                table.name,
+            )
+            logger.warning(e)
+            return self._insert_ignore(table, rows, columns)
+        except SQLAlchemyError as e:
+            logger.error("Failed to insert %s rows to %s", len(rows), table.name)
+            logger.error(e)
+            self._retry(table, rows)
+            return 0
+
+    def _inserted(self, table, rows):
+        if self.on_insert is not None:
+            try:
+                self.on_insert(table, rows)
+            except Exception as e:
+                logger.error("Insert callback of %s failed: %s", table.name, e)
+
+    def _insert_ignore(self, table, rows, columns):
+        key = (table, frozenset(columns))
+        if key not in self._statements:
+            try:
+                self._statements[key] = upsert_statement(
+                    table, self.engine.dialect.name, columns=columns, update=False
+                )
+            except NotImplementedError:
+                self._statements[key] = None
+        stmt = self._statements[key]
+        if stmt is None:
+            return self._insert_one_by_one(table, rows)
+
+        try:
+            with self.engine.begin() as conn:
+                new_rows = self._new_rows(conn, table, rows)
+                if new_rows:
+                    result = conn.execute(stmt, new_rows)
+        except IntegrityError as e:
+            # Other constraint than the primary key is violated.
+            logger.warning(e)
+            return self._insert_one_by_one(table, rows)
+        except SQLAlchemyError as e:
+            logger.error("Failed to insert %s rows to %s", len(rows), table.name)
+            logger.error(e)
+            self._retry(table, rows)
+            return 0
+
+        inserted = len(new_rows)
+        if new_rows and 0 <= result.rowcount < inserted:
+            # Another writer inserted some of the rows in the meantime.
+            logger.warning(
+                "%s of %s new rows of %s already existed",
+                inserted - result.rowcount,
+                inserted,
+                table.name,
+            )
+            inserted = result.rowcount
+        if inserted < len(rows):
+            logger.error(
+                "Dropped %s existing rows of %s", len(rows) - inserted, table.name
+            )
+            self.dropped += len(rows) - inserted
+        if new_rows:
+            self._inserted(table, new_rows)
+        return inserted
+
+    def _new_rows(self, conn, table, rows, chunk_size=500):
+        """
+        Return rows whose primary key is neither in the table nor in a previous
+        row, i.e. rows that insert-ignore inserts.
+        """
+        columns = list(table.primary_key.columns)
+        keys = [column.key for column in columns]
+        seen = set()
+        candidates = set(tuple(row.get(key) for key in keys) for row in rows)
+        for chunk in iter_chunks(candidates, chunk_size):
+            if len(columns) == 1:
+                condition = columns[0].in_([values[0] for values in chunk])
+            else:
+                condition = tuple_(*columns).in_(chunk)
+            for values in conn.execute(select(*columns).where(condition)):
+                seen.add(tuple(values))
+
+        new_rows = []
+        for row in rows:
+            values = tuple(row.get(key) for key in keys)
+            if values not in seen:
+                seen.add(values)
+                new_rows.append(row)
+        return new_rows
+
+    def _insert_one_by_one(self, table, rows):
+        inserted = []
+        for row in rows:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(table.insert(), [row])
+                inserted.append(row)
+            except IntegrityError as e:
+                logger.error("Dropping row of %s: %s", table.name, e)
+                self.dropped += 1
+            except SQLAlchemyError as e:
+                logger.error(e)
+                self._retry(table, [row])
+        if inserted:
+            self._inserted(table, inserted)
+        return len(inserted)
+
+    def _retry(self, table, rows):
+        self._retries.setdefault(table, []).extend(rows)
+        self._retry_size += len(rows)
+
+        # Drop the oldest rows if retry queue is full.
+        while self._retry_size > self.max_retry_rows:
+            table, queue = next(iter(self._retries.items()))
+            excess = min(len(queue), self._retry_size - self.max_retry_rows)
+            del queue[:excess]
+            if not queue:
+                del self._retries[table]
+            self._retry_size -= excess
+            self.dropped += excess
+            logger.error(
+                "Retry queue is full. Dropped %s oldest rows of %s",
+                excess,
+                table.name,
+            )
+
+    def run(self, interval=1):
+        """
+        Flush the buffer when needed, checking every interval seconds, until
+        stopped.
+        """
+        while not self._stop.wait(interval):
+            try:
+                self.flush_due()
+            except Exception as e:
+                logger.error("Failed to flush buffered rows: %s", e)
+
+    def start(self, interval=1):
+        """
+        Run the flusher in a background thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, args=(interval,), name="buffered-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """
+        Stop the background thread and flush remaining rows.
+        """
+        self.stop()
+        self.flush()
@@ -1,8 +1,36 @@
-from . import cr6
+import importlib
 
-SCHEMAS = {
-    "cr6": {
-        "base": cr6.Base,
-        "CR6": cr6.CR6,
-    }
+# Schema name to model module and model class names. Model modules import
+# SQLAlchemy, so they are only imported when SCHEMAS is first accessed.
+SCHEMA_MODELS = {
+    "cr6": ("cr6", ["CR6"]),
 }
+
+
+def load_schemas():
+    """
+    Import model modules and return mapping of schema name to its base class and
+    model classes. Vaisala station schemas are named by station code, e.g. bbd.
+    """
+    from .base import Base
+    from .stations import STATIONS, get_model
+
+    schemas = {}
+    for name, (module_name, class_names) in SCHEMA_MODELS.items():
+        module = importlib.import_module("." + module_name, __name__)
+        schema = {"base": module.Base}
+        for class_name in class_names:
+            schema[class_name] = getattr(module, class_name)
+        schemas[name] = schema
+
+    for info in STATIONS:
+        schemas[info.code] = {"base": Base, info.class_name: get_model(info.code)}
+    return schemas
+
+
+def __getattr__(name):
+    if name == "SCHEMAS":
+        global SCHEMAS
+        SCHEMAS = load_schemas()
+        return SCHEMAS
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
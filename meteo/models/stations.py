@@ -0,0 +1,109 @@
+import collections
+import threading
+
+from sqlalchemy import JSON, Column, DateTime, Float, String
+
+from ..parser.fields import FIELDS_MAPPING
+from .base import Base
+
+StationInfo = collections.namedtuple(
+    "StationInfo", ["code", "name", "class_name", "label", "raw"]
+)
+
+# Vaisala weather stations. Station name is also the table name. If raw is True,
+# the table has extra JSON column to store raw data.
+STATIONS = [
+    StationInfo("bbd", "babadan", "Babadan", "Babadan", False),
+    StationInfo("jro", "jurangjero", "JurangJero", "Jurang Jero", True),
+    StationInfo("lbh", "labuhan", "Labuhan", "Labuhan", False),
+    StationInfo("kla", "klatakan", "Klatakan", "Klatakan", False),
+    StationInfo("ngep", "ngepos", "Ngepos", "Pos Ngepos", False),
+    StationInfo("sel", "selo", "Selo", "Pos Selo", False),
+    StationInfo("jra", "jrakah", "Jrakah", "Pos Jrakah", False),
+    StationInfo("kal", "kaliurang", "Kaliurang", "Pos Kaliurang", False),
+]
+
+# Station info keyed by station code, name, and model class name.
+STATIONS_LOOKUP = {}
+for _info in STATIONS:
+    for _key in (_info.code, _info.name, _info.class_name):
+        STATIONS_LOOKUP[_key] = _info
+
+COLUMN_TYPES = {
+    float: Float,
+    str: lambda: String(64),
+}
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+class StationError(ValueError):
+    pass
+
+
+def get_station(station):
+    """
+    Get StationInfo by station code, name, or model class name.
+    """
+    try:
+        return STATIONS_LOOKUP[station]
+    except KeyError:
+        raise StationError("Unsupported station name: {}".format(station))
+
+
+def station_columns(raw=False):
+    """
+    Create columns of Vaisala station table from FIELDS_MAPPING.
+    """
+    columns = collections.OrderedDict()
+    columns["timestamp"] = Column(
+        "timestamp", DateTime, primary_key=True, index=True, autoincrement=False
+    )
+    for field in FIELDS_MAPPING.values():
+        name = field["name"]
+        columns[name] = Column(
+            name, COLUMN_TYPES[field["type"]](), index=True, nullable=True
+        )
+    if raw:
+        columns["raw"] = Column("raw", JSON, nullable=True)
+    return columns
+
+
+def create_model(info):
+    """
+    Create model class of Vaisala station from StationInfo.
+    """
+    attrs = station_columns(raw=info.raw)
+    attrs["__tablename__"] = info.name
+    attrs["__module__"] = "{}.{}".format(__package__, info.code)
+    attrs["__doc__"] = "Model to store Vaisala weather data from {} station.".format(
+        info.label
+    )
+    return type(info.class_name, (Base,), dict(attrs))
+
+
+def get_model(station):
+    """
+    Get model class of Vaisala station by station code, name, or model class
+    name, e.g. bbd, babadan, or Babadan.
+
+    Models are created on first use, so only tables of used stations are
+    added to the metadata.
+    """
+    info = get_station(station)
+    model = _models.get(info.code)
+    if model is None:
+        with _models_lock:
+            model = _models.get(info.code)
+            if model is None:
+                model = create_model(info)
+                _models[info.code] = model
+    return model
+
+
+def get_models():
+    """
+    Get model classes of all Vaisala stations.
+    """
+    return [get_model(info.code) for info in STATIONS]
@@ -0,0 +1,89 @@
+from .fields import FIELD_NAMES
+from .vaisala import VaisalaParser
+
+# Fields that are accumulated over an interval instead of keeping the latest
+# value.
+ACCUMULATED_FIELDS = ("rain_acc",)
+
+
+class VaisalaAggregator(object):
+    """
+    Incremental aggregator of Vaisala lines into one entry per interval.
+
+    Lines are parsed as they arrive. The latest value of each field in the
+    lines is kept, even if it is None, i.e. the field has no valid value.
+    Accumulated fields (rain_acc) are summed instead, because all stations use
+    precipitation mode, and a field without valid value counts as 0.0. Fields
+    that are not in any line are None. Calling :meth:`flush` returns the
+    finished entry and starts a new interval without re-parsing any line.
+
+    Example:
+
+    .. code-block:: python
+
+        aggregator = VaisalaAggregator()
+        for line in lines:
+            aggregator.add(line)
+        entry = aggregator.flush(timestamp)
+    """
+
+    def __init__(self, parser=None):
+        self.parser = parser or VaisalaParser(errors="ignore")
+        self._accumulated = frozenset(
+            FIELD_NAMES.index(name) for name in ACCUMULATED_FIELDS
+        )
+        self.reset()
+
+    def reset(self):
+        """
+        Discard current interval values.
+        """
+        self._values = [None] * len(FIELD_NAMES)
+        self.count = 0
+
+    def add(self, line):
+        """
+        Parse one line of data string and add it to current interval.
+        """
+        self._add_values(
+            (index - 1, value) for index, value in self.parser.iter_values(line)
+        )
+
+    def add_record(self, record):
+        """
+        Add parsed VaisalaRecord to current interval. A record can't tell a
+        field without valid value from a field that is not in the line, so
+        None values are skipped.
+        """
+        self._add_values(
+            (index, value)
+            for index, value in enumerate(record[1:])
+            if value is not None
+        )
+
+    def _add_values(self, items):
+        values = self._values
+        accumulated = self._accumulated
+        for index, value in items:
+            if index in accumulated:
+                previous = values[index]
+                values[index] = (previous or 0.0) + (value or 0.0)
+            else:
+                values[index] = value
+        self.count += 1
+
+    def peek(self, timestamp=None):
+        """
+        Return current interval entry without resetting the aggregator.
+        """
+        entry = dict(zip(FIELD_NAMES, self._values))
+        entry["timestamp"] = timestamp
+        return entry
+
+    def flush(self, timestamp=None):
+        """
+        Return current interval entry and start a new interval.
+        """
+        entry = self.peek(timestamp)
+        self.reset()
+        return entry
@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+
+from ..utils.encoding import force_bytes
+from .fields import FIELD_NAMES, FIELDS_MAPPING
+
+# Maximum number of bytes of a field value or unit after the equal sign.
+VALUE_WIDTH = 16
+
+_DOT = ord(".")
+_NEWLINE = ord("\n")
+_EQUAL = ord("=")
+
+
+def read_buffer(path_or_buffer):
+    """
+    Read bytes from file path, bytes buffer, or file-like object.
+    """
+    if hasattr(path_or_buffer, "read"):
+        return path_or_buffer.read()
+    if isinstance(path_or_buffer, (bytes, bytearray, memoryview)):
+        return bytes(path_or_buffer)
+    with open(os.fspath(path_or_buffer), "rb") as f:
+        return f.read()
+
+
+def _is_digit(a):
+    return (a >= ord("0")) & (a <= ord("9"))
+
+
+def _is_word(a):
+    # Same as regex \w for ASCII. Non-ASCII bytes are treated as word
+    # characters, so UTF-8 encoded letters are not split.
+    return (
+        _is_digit(a)
+        | ((a >= ord("A")) & (a <= ord("Z")))
+        | ((a >= ord("a")) & (a <= ord("z")))
+        | (a == ord("_"))
+        | (a >= 0x80)
+    )
+
+
+def _first_false(mask):
+    """
+    Return index of the first False value of each row of 2-D mask, or the row
+    width if all values are True.
+    """
+    return np.where(mask.all(axis=1), mask.shape[1], mask.argmin(axis=1))
+
+
+def _last_per_row(rows):
+    """
+    Return mask of the last item of each run of equal sorted row indexes.
+    """
+    keep = np.ones(len(rows), dtype=bool)
+    keep[:-1] = rows[1:] != rows[:-1]
+    return keep
+
+
+def _to_bytes(window, length):
+    """
+    Convert each row of 2-D window into bytes string truncated at length.
+    """
+    width = window.shape[1]
+    window = np.where(np.arange(width) < length[:, None], window, 0)
+    return np.ascontiguousarray(window, dtype=np.uint8).view("S%d" % width).ravel()
+
+
+def parse_columns(data, delimiter=",", encoding="utf-8", errors="strict"):
+    """
+    Parse Vaisala bytes data into a dictionary of column name and NumPy array.
+
+    Every line of the data becomes one row. Numeric columns are float64 arrays
+    with NaN for missing or invalid values, and the ``id`` column is an object
+    array with None for missing values. If a field occurs more than once in a
+    line, the last value is used. Values are the same as the ones returned by
+    :meth:`meteo.parser.vaisala.VaisalaParser.parse`.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    # Pad the buffer, so value and unit windows never go beyond the end.
+    padded = np.concatenate([buf, np.zeros(2 * VALUE_WIDTH, dtype=np.uint8)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, VALUE_WIDTH)
+    sep = ord(delimiter)
+
+    newlines = np.flatnonzero(buf == _NEWLINE)
+    nrows = len(newlines)
+    if len(buf) and buf[-1] != _NEWLINE:
+        nrows += 1
+
+    equals = np.flatnonzero(buf == _EQUAL)
+    offsets = np.arange(VALUE_WIDTH)
+
+    # Field components start right after the delimiter. Field code bytes before
+    # each equal sign are packed into one integer key per code length.
+    keys = {}
+    for n in set(len(code) for code in FIELDS_MAPPING):
+        pos = equals[equals > n]
+        pos = pos[padded[pos - n - 1] == sep]
+        key = np.zeros(len(pos), dtype=np.uint64)
+        for i in range(n):
+            key = (key << np.uint64(8)) | padded[pos - n + i]
+        keys[n] = (pos, key)
+
+    columns = {}
+    for code, spec in FIELDS_MAPPING.items():
+        pos, key = keys[len(code)]
+        pos = pos[key == int.from_bytes(code.encode("ascii"), "big")]
+
+        # Value is matched by \d*[.]?\d* and must be followed by at least one
+        # word character as unit. Like the regex, the value backtracks to its
+        # last digit if the unit cannot be matched.
+        window = windows[pos + 1]
+        digit = _is_digit(window)
+        dot = window == _DOT
+        first_dot = np.where(dot.any(axis=1), dot.argmax(axis=1), VALUE_WIDTH)
+        run = _first_false(digit | (offsets == first_dot[:, None]))
+        follow = window[np.arange(len(pos)), np.minimum(run, VALUE_WIDTH - 1)]
+        followed = (run < VALUE_WIDTH) & _is_word(follow)
+
+        digit &= offsets < run[:, None]
+        last_digit = np.where(
+            digit.any(axis=1), VALUE_WIDTH - 1 - np.argmax(digit[:, ::-1], axis=1), -1
+        )
+        length = np.where(followed, run, last_digit)
+
+        matched = length >= 0
+        pos, window, length = pos[matched], window[matched], length[matched]
+        rows = np.searchsorted(newlines, pos)
+        keep = _last_per_row(rows)
+        pos, window, length, rows = pos[keep], window[keep], length[keep], rows[keep]
+
+        if spec["type"] is str:
+            # String field value is its unit, e.g. Id=BBD.
+            unit = windows[pos + 1 + length]
+            values = np.char.decode(
+                _to_bytes(unit, _first_false(_is_word(unit))),
+                encoding=encoding,
+                errors=errors,
+            )
+            column = np.full(nrows, None, dtype=object)
+            column[rows] = values
+        else:
+            text = _to_bytes(window, length)
+            valid = (_is_digit(window) & (offsets < length[:, None])).any(axis=1)
+            values = np.full(len(text), np.nan, dtype=np.float64)
+            values[valid] = text[valid].astype(np.float64)
+            column = np.full(nrows, np.nan, dtype=np.float64)
+            column[rows] = values
+        columns[spec["name"]] = column
+    return columns
+
+
+def read_vaisala(
+    path_or_buffer, as_frame=False, delimiter=",", encoding="utf-8", errors="strict"
+):
+    """
+    Parse whole Vaisala capture file or buffer into columns.
+
+    The data is scanned as a NumPy byte array, so there is no Python call per
+    line or per field. It is intended for backfilling large raw captures.
+
+    :param path_or_buffer: File path, bytes buffer, or file-like object.
+    :param as_frame: If True, return pandas DataFrame instead of dictionary of
+        NumPy arrays.
+    :return: Dictionary of column name and NumPy array, or pandas DataFrame.
+        Columns follow the names of FIELDS_MAPPING.
+    """
+    data = force_bytes(read_buffer(path_or_buffer), encoding, errors)
+    columns = parse_columns(data, delimiter=delimiter, encoding=encoding, errors=errors)
+    if as_frame:
+        import pandas as pd
+
+        return pd.DataFrame(columns, columns=FIELD_NAMES)
+    return columns
@@ -89,3 +89,7 @@ FIELDS_MAPPING = {
         "type": str,
     },
 }
+
+# Field names in the order of FIELDS_MAPPING. It is used as the layout of
+# compact parsed records.
+FIELD_NAMES = tuple(v["name"] for v in FIELDS_MAPPING.values())
@@ -0,0 +1,88 @@
+import logging
+
+from .vaisala import VaisalaParser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 4096
+
+# Maximum length of a line in bytes. Longer lines are discarded, so garbage data
+# without line breaks cannot grow the buffer without bound.
+MAX_LINE_LENGTH = 4096
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Iterate bytes chunks from socket or file-like object until end of stream.
+    """
+    read = getattr(source, "recv", None) or source.read
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _discard(line, max_line_length):
+    logger.warning(
+        "Discarding line longer than %s bytes: %r...", max_line_length, line[:32]
+    )
+
+
+def iter_lines(chunks, max_line_length=MAX_LINE_LENGTH):
+    """
+    Split iterable of bytes chunks into lines.
+
+    Lines are terminated by ``\\n`` or ``\\r\\n`` and are yielded without the
+    line terminator. Empty lines are skipped, and lines longer than
+    max_line_length bytes are discarded. The last line is yielded even if it
+    has no line terminator. Only one partial line is kept in memory at a time.
+    """
+    pending = b""
+    overflow = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+
+        for line in lines:
+            if overflow:
+                # Tail of a discarded long line.
+                overflow = False
+                continue
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            if len(line) > max_line_length:
+                _discard(line, max_line_length)
+            elif line:
+                yield line
+
+        if len(pending) > max_line_length:
+            _discard(pending, max_line_length)
+            pending = b""
+            overflow = True
+
+    if pending and not overflow:
+        if pending.endswith(b"\r"):
+            pending = pending[:-1]
+        if pending:
+            yield pending
+
+
+def iter_records(chunks, parser=None, max_line_length=MAX_LINE_LENGTH):
+    """
+    Parse iterable of bytes chunks and yield VaisalaRecord for each line.
+
+    Example:
+
+    .. code-block:: python
+
+        with open("capture.txt", "rb") as f:
+            for record in iter_records(iter_chunks(f)):
+                print(record.air_temperature)
+    """
+    if parser is None:
+        parser = VaisalaParser(errors="ignore")
+    for line in iter_lines(chunks, max_line_length=max_line_length):
+        yield parser.parse_record(line)
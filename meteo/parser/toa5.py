@@ -0,0 +1,247 @@
+import collections
+
+import numpy as np
+
+from ..utils.encoding import force_bytes
+from .bulk import read_buffer
+
+# TOA5 file starts with environment, field names, units, and processing lines.
+HEADER_LINES = 4
+
+# Column names of CR6 Table1 in TOA5 field order. Names follow CR6 model
+# attributes, except record_id, battery_voltage, and power_temperature.
+CR6_COLUMNS = [
+    "timestamp",
+    "record_id",
+    "wind_direction",
+    "wind_speed",
+    "air_temperature",
+    "air_humidity",
+    "air_pressure",
+    "rainfall",
+    "amount",
+    "battery_voltage",
+    "power_temperature",
+]
+
+# TOA5 field names of timestamp and record number columns.
+TIMESTAMP_FIELD = "TIMESTAMP"
+RECORD_FIELD = "RECORD"
+
+
+class TOA5Error(ValueError):
+    pass
+
+
+def _split_header(data):
+    """
+    Split TOA5 data into list of header lines and data rows bytes.
+    """
+    if not data.startswith(b'"TOA5"'):
+        raise TOA5Error("Data is not in TOA5 format")
+    lines = data.split(b"\n", HEADER_LINES)
+    if len(lines) < HEADER_LINES:
+        raise TOA5Error("TOA5 header is incomplete")
+    body = lines[HEADER_LINES] if len(lines) > HEADER_LINES else b""
+    return lines[:HEADER_LINES], body
+
+
+def _header_fields(line, encoding):
+    return [field.strip().strip(b'"').decode(encoding) for field in line.split(b",")]
+
+
+def _find_bad_row(rows, ncols):
+    for i, row in enumerate(rows):
+        if row.count(b",") + 1 != ncols:
+            return i
+    return None
+
+
+def _check_names(names, fields):
+    if names is None:
+        return fields
+    if len(names) != len(fields):
+        raise TOA5Error(
+            "TOA5 data has {} fields, but {} names are given".format(
+                len(fields), len(names)
+            )
+        )
+    return names
+
+
+def _parse_body(body, names, fields):
+    """
+    Parse data rows bytes into columns.
+    """
+    body = body.replace(b"\r", b"").replace(b'"', b"").strip(b"\n")
+    ncols = len(fields)
+    if body:
+        rows = body.count(b"\n") + 1
+        values = body.replace(b"\n", b",").split(b",")
+    else:
+        rows = 0
+        values = []
+    if len(values) != rows * ncols:
+        bad = _find_bad_row(body.split(b"\n"), ncols)
+        raise TOA5Error(
+            "TOA5 data row {} does not have {} fields".format(bad + 1, ncols)
+        )
+
+    table = np.array(values, dtype=bytes).reshape(rows, ncols)
+    columns = collections.OrderedDict()
+    for i, (name, field) in enumerate(zip(names, fields)):
+        column = table[:, i]
+        try:
+            if field == TIMESTAMP_FIELD:
+                columns[name] = column.astype("datetime64[us]")
+            elif field == RECORD_FIELD:
+                columns[name] = column.astype(np.int64)
+            else:
+                # Empty value means missing, NAN is parsed as NaN.
+                column = np.where(column == b"", b"nan", column)
+                columns[name] = column.astype(np.float64)
+        except ValueError as e:
+            raise TOA5Error("Invalid value in TOA5 field {}: {}".format(field, e))
+    return columns
+
+
+def parse_toa5(data, names=None, encoding="utf-8"):
+    """
+    Parse TOA5 bytes data into a dictionary of column name and NumPy array.
+
+    The four header lines are skipped. All fields of the data rows are split
+    in one pass and converted column by column, so there is no Python call per
+    row. Timestamps are datetime64[us], the record number is int64, and other
+    columns are float64 with NaN for NAN values.
+
+    :param data: TOA5 bytes data.
+    :param names: Column names. Default to the TOA5 field names of the header.
+    :param encoding: Encoding of the header.
+    """
+    header, body = _split_header(data)
+    fields = _header_fields(header[1], encoding)
+    return _parse_body(body, _check_names(names, fields), fields)
+
+
+class TOA5StreamParser(object):
+    """
+    Incremental TOA5 parser.
+
+    Data is fed in chunks of any size, e.g. as it is received from the network.
+    Complete rows of each chunk are parsed at once and the incomplete last row
+    is kept for the next chunk.
+
+    Example:
+
+    .. code-block:: python
+
+        parser = TOA5StreamParser(names=CR6_COLUMNS)
+        for data in chunks:
+            columns = parser.feed(data)
+        columns = parser.close()
+    """
+
+    def __init__(self, names=None, encoding="utf-8"):
+        self.names = names
+        self.encoding = encoding
+        self.fields = None
+        self._buffer = b""
+
+    def _parse_header(self):
+        if self._buffer.count(b"\n") < HEADER_LINES:
+            if len(self._buffer) >= 6 and not self._buffer.startswith(b'"TOA5"'):
+                raise TOA5Error("Data is not in TOA5 format")
+            return False
+        header, self._buffer = _split_header(self._buffer)
+        self.fields = _header_fields(header[1], self.encoding)
+        self.names = _check_names(self.names, self.fields)
+        return True
+
+    def feed(self, data):
+        """
+        Feed bytes data. Return columns of complete rows, or None if the header
+        is not complete yet.
+        """
+        self._buffer += data
+        if self.fields is None and not self._parse_header():
+            return None
+        end = self._buffer.rfind(b"\n") + 1
+        body, self._buffer = self._buffer[:end], self._buffer[end:]
+        return _parse_body(body, self.names, self.fields)
+
+    def close(self):
+        """
+        Parse the remaining row. Return its columns.
+        """
+        if self.fields is None:
+            if self._buffer.count(b"\n") < HEADER_LINES - 1:
+                raise TOA5Error("TOA5 header is incomplete")
+            self._buffer += b"\n"
+            self._parse_header()
+        body, self._buffer = self._buffer, b""
+        return _parse_body(body, self.names, self.fields)
+
+
+def concat_columns(chunks):
+    """
+    Concatenate list of columns into one.
+    """
+    return collections.OrderedDict(
+        (name, np.concatenate([chunk[name] for chunk in chunks])) for name in chunks[0]
+    )
+
+
+def iter_toa5(fp, names=None, encoding="utf-8", chunk_size=64 * 1024):
+    """
+    Read TOA5 data from file-like object in chunks of chunk_size bytes and
+    yield columns of rows as they are parsed.
+    """
+    parser = TOA5StreamParser(names=names, encoding=encoding)
+    while True:
+        data = fp.read(chunk_size)
+        if not data:
+            break
+        columns = parser.feed(data)
+        if columns is not None and len(columns[parser.names[0]]):
+            yield columns
+    columns = parser.close()
+    if len(columns[parser.names[0]]):
+        yield columns
+
+
+def read_toa5(path_or_buffer, names=None, as_frame=False, encoding="utf-8"):
+    """
+    Read TOA5 file or buffer, e.g. CR6 DataQuery response, into columns.
+
+    :param path_or_buffer: File path, bytes buffer, or file-like object.
+    :param names: Column names, e.g. CR6_COLUMNS. Default to the TOA5 field
+        names of the header.
+    :param as_frame: If True, return pandas DataFrame instead of dictionary of
+        NumPy arrays.
+    :return: Dictionary of column name and NumPy array, or pandas DataFrame.
+    """
+    data = force_bytes(read_buffer(path_or_buffer), encoding)
+    columns = parse_toa5(data, names=names, encoding=encoding)
+    if as_frame:
+        import pandas as pd
+
+        return pd.DataFrame(columns)
+    return columns
+
+
+def to_entries(columns):
+    """
+    Convert columns into list of insert-ready entries. Timestamps become
+    datetime objects and NaN becomes None.
+    """
+    names = list(columns)
+    values = []
+    for name in names:
+        column = columns[name]
+        if column.dtype.kind == "f":
+            missing = np.isnan(column)
+            if missing.any():
+                column = column.astype(object)
+                column[missing] = None
+        values.append(column.tolist())
+    return [dict(zip(names, row)) for row in zip(*values)]
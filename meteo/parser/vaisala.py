@@ -1,11 +1,25 @@
+import collections
 import logging
 import re
 
 from ..utils.encoding import force_text
-from .fields import FIELDS_MAPPING
+from .fields import FIELD_NAMES, FIELDS_MAPPING
 
 logger = logging.getLogger(__name__)
 
+VALUE_PATTERN = re.compile(
+    r"""
+        (?P<field>\w+)
+        =
+        (?P<value>\d*[.,]?\d*)
+        (?P<unit>\w+)
+    """,
+    re.X,
+)
+
+# Compact parsed line. Missing or invalid field values are None.
+VaisalaRecord = collections.namedtuple("VaisalaRecord", ("ident",) + FIELD_NAMES)
+
 
 class ParserError(Exception):
     pass
@@ -21,21 +35,18 @@ class VaisalaParser(object):
         self.encoding = encoding
         self.errors = errors
 
+        # Field code to (record index, converter) lookup table for the fast
+        # path. Index 0 of the record is reserved for the ident.
+        self._lookup = dict(
+            (code, (FIELD_NAMES.index(spec["name"]) + 1, spec["type"]))
+            for code, spec in FIELDS_MAPPING.items()
+        )
+
     def parse_value(self, s):
         """
         Parse field value.
         """
-        pattern = re.compile(
-            r"""
-                (?P<field>\w+)
-                =
-                (?P<value>\d*[.,]?\d*)
-                (?P<unit>\w+)
-            """,
-            re.X,
-        )
-
-        m = pattern.match(s)
+        m = VALUE_PATTERN.match(s)
         if m is not None:
             components = m.groupdict()
             field = components["field"]
@@ -80,3 +91,52 @@ class VaisalaParser(object):
                 parsed_value.append(value)
 
         return {"ident": ident, "components": parsed_value}
+
+    def parse_record(self, s):
+        """
+        Parse one line of data string into a compact VaisalaRecord.
+
+        This is the fast path of :meth:`parse`. Values are the same as the ones
+        returned by :meth:`parse`, but units and raw texts are not kept and
+        unknown field codes are skipped. If a field occurs more than once in a
+        line, the last value is used.
+        """
+        text = force_text(s, self.encoding, self.errors)
+        components = text.split(self.delimiter)
+        values = [None] * len(VaisalaRecord._fields)
+        values[0] = components[0]
+        for index, value in self._iter_values(components):
+            values[index] = value
+        return VaisalaRecord._make(values)
+
+    def iter_values(self, s):
+        """
+        Parse one line of data string and yield (record index, value) of each
+        known field in the line. Value is None if the field has no valid value,
+        so it can be told apart from a field that is not in the line.
+        """
+        text = force_text(s, self.encoding, self.errors)
+        return self._iter_values(text.split(self.delimiter))
+
+    def _iter_values(self, components):
+        match = VALUE_PATTERN.match
+        lookup = self._lookup
+        for component in components[1:]:
+            m = match(component)
+            if m is None:
+                continue
+            field, value, unit = m.groups()
+            try:
+                index, converter = lookup[field]
+            except KeyError:
+                continue
+
+            if field == "Id":
+                yield index, unit
+            elif value:
+                try:
+                    yield index, converter(value)
+                except Exception:
+                    yield index, None
+            else:
+                yield index, None
@@ -0,0 +1,190 @@
+import collections
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CycleMetrics = collections.namedtuple(
+    "CycleMetrics",
+    ["scheduled", "started", "lag", "fetch", "store", "total", "rows", "error"],
+)
+
+
+def next_tick(now, interval, delay=0.0):
+    """
+    Get the first time after now that is delay seconds past a multiple of
+    interval since epoch, e.g. 5 seconds past every minute.
+    """
+    return (now - delay) // interval * interval + interval + delay
+
+
+def percentile(values, q):
+    """
+    Get q-th percentile of values using nearest rank.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, int(round(q / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+class Poller(object):
+    """
+    Resident scheduler that polls a data source on an aligned interval.
+
+    Each cycle calls fetch, and store with its result if it is not empty. Cycles
+    start delay seconds after each interval boundary, plus a random jitter of
+    up to jitter seconds, so pollers of many sources don't hit the network at
+    the same instant. Anything created once, e.g. engine, HTTP client, or
+    checkpoint state, is kept in memory by the callables between cycles.
+
+    Every cycle is recorded as CycleMetrics of schedule lag, fetch, store, and
+    total time in seconds, and :meth:`stats` summarizes the recent cycles.
+
+    Example:
+
+    .. code-block:: python
+
+        client = CR6Client("http://192.168.9.47/")
+
+        def store(columns):
+            bulk_upsert(engine, CR6, to_entries(columns))
+            client.advance(columns)
+
+        poller = Poller(lambda: client.poll(advance=False), store, interval=60)
+        poller.run()
+
+    :param fetch: Callable that returns new data, e.g. columns.
+    :param store: Callable that takes data returned by fetch.
+    :param interval: Poll interval in seconds.
+    :param delay: Offset of cycles from interval boundaries in seconds.
+    :param jitter: Maximum random delay added to each cycle in seconds.
+    :param history: Number of recent cycles kept for metrics.
+    :param clock: Callable that returns current time in seconds since epoch.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        store,
+        interval=60,
+        delay=5,
+        jitter=2,
+        history=1440,
+        clock=time.time,
+    ):
+        self.fetch = fetch
+        self.store = store
+        self.interval = interval
+        self.delay = delay
+        self.jitter = jitter
+        self.clock = clock
+
+        self.metrics = collections.deque(maxlen=history)
+        self.cycles = 0
+        self.errors = 0
+        self.rows = 0
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def count_rows(data):
+        if data is None:
+            return 0
+        if isinstance(data, dict):
+            return len(next(iter(data.values()))) if data else 0
+        return len(data)
+
+    def run_once(self, scheduled=None):
+        """
+        Run one poll cycle. Return its CycleMetrics.
+        """
+        started = self.clock()
+        scheduled = started if scheduled is None else scheduled
+        fetch = store = 0.0
+        rows = 0
+        error = None
+        try:
+            data = self.fetch()
+            fetched = self.clock()
+            fetch = fetched - started
+            rows = self.count_rows(data)
+            if rows:
+                self.store(data)
+                store = self.clock() - fetched
+        except Exception as e:
+            logger.error("Poll cycle failed: %s", e)
+            error = str(e)
+            rows = 0
+
+        total = self.clock() - started
+        metrics = CycleMetrics(
+            scheduled, started, started - scheduled, fetch, store, total, rows, error
+        )
+        self.metrics.append(metrics)
+        self.cycles += 1
+        self.rows += rows
+        if error is not None:
+            self.errors += 1
+        logger.info(
+            "Poll cycle: %s rows, lag %.3fs, fetch %.3fs, store %.3fs, total %.3fs",
+            rows,
+            metrics.lag,
+            fetch,
+            store,
+            total,
+        )
+        return metrics
+
+    def stats(self):
+        """
+        Return dictionary of cycle counters and latency percentiles of recent
+        cycles in seconds.
+        """
+        totals = [m.total for m in self.metrics]
+        lags = [m.lag for m in self.metrics]
+        return {
+            "cycles": self.cycles,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_p50": percentile(totals, 50),
+            "total_p95": percentile(totals, 95),
+            "total_max": max(totals) if totals else None,
+            "lag_p50": percentile(lags, 50),
+            "lag_max": max(lags) if lags else None,
+            "fetch_p95": percentile([m.fetch for m in self.metrics], 95),
+            "store_p95": percentile([m.store for m in self.metrics], 95),
+        }
+
+    def run(self):
+        """
+        Run poll cycles until stopped.
+        """
+        while not self._stop.is_set():
+            scheduled = next_tick(self.clock(), self.interval, self.delay)
+            if self.jitter:
+                scheduled += random.uniform(0, self.jitter)
+            if self._stop.wait(max(0.0, scheduled - self.clock())):
+                break
+            self.run_once(scheduled)
+
+    def start(self):
+        """
+        Run the poller in a background thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the poller after the current cycle.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,457 @@
+import collections
+import datetime
+import glob
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length and CRC32 checksum of the payload.
+HEADER = struct.Struct("<II")
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+# Suffix of segments with a corrupted record, kept for inspection.
+QUARANTINE_SUFFIX = ".corrupt"
+# Suffix of segments that failed to be replayed too many times.
+FAILED_SUFFIX = ".failed"
+
+DrainStats = collections.namedtuple(
+    "DrainStats",
+    [
+        "segments",
+        "rows",
+        "batches",
+        "seconds",
+        "rows_per_second",
+        "failed",
+        "quarantined",
+    ],
+)
+
+
+class SpoolError(Exception):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$d": value.isoformat()}
+    raise TypeError("Object of type {} is not serializable".format(type(value)))
+
+
+def _decode_value(obj):
+    if "$dt" in obj:
+        return datetime.datetime.fromisoformat(obj["$dt"])
+    if "$d" in obj:
+        return datetime.date.fromisoformat(obj["$d"])
+    return obj
+
+
+def encode_record(table, row):
+    """
+    Encode table name and row into spool record bytes.
+    """
+    payload = json.dumps(
+        {"t": table, "r": row}, default=_encode_value, separators=(",", ":")
+    ).encode("utf-8")
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def iter_segment(path, errors=None):
+    """
+    Iterate (table, row) records of segment file.
+
+    Reading stops at the first truncated or corrupted record, e.g. a torn write
+    at the end of the segment after a crash. If errors is a list, the offset of
+    that record is appended to it.
+    """
+    with open(path, "rb") as f:
+        while True:
+            offset = f.tell()
+            header = f.read(HEADER.size)
+            if not header:
+                break
+            if len(header) < HEADER.size:
+                logger.warning("Truncated record header in %s at %s", path, offset)
+                if errors is not None:
+                    errors.append(offset)
+                break
+            length, checksum = HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                logger.warning("Corrupted record in %s at %s", path, offset)
+                if errors is not None:
+                    errors.append(offset)
+                break
+            record = json.loads(payload.decode("utf-8"), object_hook=_decode_value)
+            yield record["t"], record["r"]
+
+
+class Spool(object):
+    """
+    Append-only on-disk spool of rows to be inserted to the database.
+
+    Rows are appended to the active segment file. Each record is framed with its
+    length and CRC32 checksum. When the active segment exceeds
+    max_segment_bytes, or on :meth:`rotate`, it is sealed and a new segment is
+    started. Only sealed segments are replayed by :class:`SpoolDrainer`.
+
+    Existing segments are never appended to, so rows written after a restart
+    never follow a torn record of a crash. A new segment is started if the last
+    one is not empty.
+
+    :param directory: Spool directory.
+    :param max_segment_bytes: Maximum size of a segment file in bytes.
+    :param fsync: If True, fsync the segment after each append, so appended rows
+        survive power loss.
+    """
+
+    def __init__(self, directory, max_segment_bytes=16 * 1024 * 1024, fsync=True):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._file = None
+
+        os.makedirs(directory, exist_ok=True)
+        segments = self.segments()
+        self._sequence = 0
+        if segments:
+            self._sequence = self.segment_sequence(segments[-1])
+            if os.path.getsize(segments[-1]) > 0:
+                self._sequence += 1
+
+    def segment_path(self, sequence):
+        return os.path.join(
+            self.directory,
+            "{}{:012d}{}".format(SEGMENT_PREFIX, sequence, SEGMENT_SUFFIX),
+        )
+
+    @staticmethod
+    def segment_sequence(path):
+        name = os.path.basename(path)
+        return int(name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+
+    def segments(self):
+        """
+        Return list of all segment paths ordered by sequence.
+        """
+        pattern = os.path.join(
+            self.directory, "{}*{}".format(SEGMENT_PREFIX, SEGMENT_SUFFIX)
+        )
+        return sorted(glob.glob(pattern), key=self.segment_sequence)
+
+    def sealed_segments(self):
+        """
+        Return list of sealed segment paths ordered by sequence.
+        """
+        with self._lock:
+            active = self.segment_path(self._sequence)
+        return [path for path in self.segments() if path != active]
+
+    def append(self, table, row):
+        """
+        Append one row of table name to the spool.
+        """
+        self.append_many(table, [row])
+
+    def append_many(self, table, rows):
+        """
+        Append rows of table name to the spool.
+
+        If the write fails, e.g. the disk is full, the segment is truncated
+        back to its size before the write, so no partial record is left for
+        later rows to follow. If that fails as well, the segment is sealed.
+        """
+        data = b"".join(encode_record(table, row) for row in rows)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.segment_path(self._sequence), "ab")
+            offset = self._file.tell()
+            try:
+                self._file.write(data)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except BaseException:
+                self._discard(offset)
+                raise
+            if self._file.tell() >= self.max_segment_bytes:
+                self._rotate()
+
+    def _discard(self, offset):
+        # Close first, so buffered bytes are not flushed after the truncate.
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        path = self.segment_path(self._sequence)
+        try:
+            os.truncate(path, offset)
+        except OSError as e:
+            logger.error("Failed to truncate %s to %s: %s", path, offset, e)
+            self._sequence += 1
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._sequence += 1
+
+    def rotate(self):
+        """
+        Seal the active segment if it is not empty.
+        """
+        with self._lock:
+            path = self.segment_path(self._sequence)
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                self._rotate()
+
+    def size(self):
+        """
+        Return total size of spool segments in bytes.
+        """
+        return sum(os.path.getsize(path) for path in self.segments())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SpoolDrainer(object):
+    """
+    Replay sealed spool segments into the database in large batches.
+
+    Replay is idempotent, rows whose primary key already exists are skipped. A
+    segment is deleted only after all of its rows have been committed, so a
+    failure in the middle of a segment causes the segment to be replayed again.
+    A segment with a corrupted record is not deleted after its readable rows
+    are committed, but renamed with .corrupt suffix for inspection.
+
+    A failed segment doesn't block the segments after it. It is retried on the
+    next run, and after max_attempts failed runs it is renamed with .failed
+    suffix. Failures while the database is unreachable are not counted.
+
+    :param spool: Spool instance.
+    :param engine: SQLAlchemy engine.
+    :param tables: List of SQLAlchemy tables or models that rows belong to.
+    :param batch_size: Maximum number of rows per insert statement.
+    :param on_insert: Optional callable called with table and list of rows after
+        rows of a segment are committed, e.g. to update rollups.
+    :param max_attempts: Number of failed replays before a segment is moved
+        aside.
+    """
+
+    def __init__(
+        self, spool, engine, tables, batch_size=5000, on_insert=None, max_attempts=5
+    ):
+        # Imported here, so appending to the spool does not import SQLAlchemy.
+        from .db.ops import get_table
+
+        self.spool = spool
+        self.engine = engine
+        self.batch_size = batch_size
+        self.on_insert = on_insert
+        self.max_attempts = max_attempts
+        self.tables = dict(
+            (get_table(table).name, get_table(table)) for table in tables
+        )
+
+        self._statements = {}
+        self._attempts = {}
+
+        self.rows = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _insert(self, conn, name, rows):
+        # Insert-ignore, so replaying the same segment more than once is safe.
+        if name not in self._statements:
+            from .db.ops import upsert_statement
+
+            self._statements[name] = upsert_statement(
+                self.tables[name], conn.dialect.name, update=False
+            )
+        conn.execute(self._statements[name], rows)
+
+    def _database_available(self):
+        from sqlalchemy import text
+
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception:
+            return False
+        return True
+
+    def _failed(self, path):
+        """
+        Count failed replay of segment and move it aside after max_attempts.
+        Return True if the segment is moved.
+        """
+        attempts = self._attempts.get(path, 0) + 1
+        if attempts < self.max_attempts:
+            self._attempts[path] = attempts
+            return False
+
+        self._attempts.pop(path, None)
+        failed = path + FAILED_SUFFIX
+        logger.error(
+            "Spool segment %s failed %s times. Moved it to %s", path, attempts, failed
+        )
+        os.replace(path, failed)
+        return True
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def drain_segment(self, path):
+        """
+        Replay one segment and remove it. Return (rows, batches).
+        """
+        batches = collections.OrderedDict()
+        inserted = collections.OrderedDict()
+        errors = []
+        rows = 0
+        count = 0
+        with self.engine.begin() as conn:
+            for name, row in iter_segment(path, errors=errors):
+                if name not in self.tables:
+                    raise SpoolError("Unknown table {} in {}".format(name, path))
+                batch = batches.setdefault(name, [])
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._insert(conn, name, batch)
+                    rows += len(batch)
+                    count += 1
+                    if self.on_insert is not None:
+                        inserted.setdefault(name, []).extend(batch)
+                    batches[name] = []
+            for name, batch in batches.items():
+                if batch:
+                    self._insert(conn, name, batch)
+                    rows += len(batch)
+                    count += 1
+                    if self.on_insert is not None:
+                        inserted.setdefault(name, []).extend(batch)
+
+        if errors:
+            quarantine = path + QUARANTINE_SUFFIX
+            logger.error(
+                "Spool segment %s is corrupted at %s, %s rows before it are "
+                "replayed. Moved it to %s",
+                path,
+                errors[0],
+                rows,
+                quarantine,
+            )
+            os.replace(path, quarantine)
+        else:
+            os.unlink(path)
+
+        for name, batch in inserted.items():
+            try:
+                self.on_insert(self.tables[name], batch)
+            except Exception as e:
+                logger.error("Insert callback of %s failed: %s", name, e)
+        return rows, count
+
+    def drain_once(self, rotate=True):
+        """
+        Replay all sealed segments. Return DrainStats of this run.
+
+        If rotate is True, the active segment is sealed first, so all spooled
+        rows are replayed. A failed segment is skipped and retried on the next
+        run. Draining stops if the database is unreachable.
+        """
+        if rotate:
+            self.spool.rotate()
+
+        start = time.monotonic()
+        segments = rows = batches = failed = quarantined = 0
+        for path in self.spool.sealed_segments():
+            try:
+                segment_rows, segment_batches = self.drain_segment(path)
+            except Exception as e:
+                logger.error("Failed to drain spool segment %s: %s", path, e)
+                failed += 1
+                if not self._database_available():
+                    break
+                if self._failed(path):
+                    quarantined += 1
+                continue
+            self._attempts.pop(path, None)
+            segments += 1
+            rows += segment_rows
+            batches += segment_batches
+
+        seconds = time.monotonic() - start
+        self.rows += rows
+        self.batches += batches
+        self.seconds += seconds
+        stats = DrainStats(
+            segments,
+            rows,
+            batches,
+            seconds,
+            rows / seconds if seconds else 0.0,
+            failed,
+            quarantined,
+        )
+        if rows:
+            logger.info(
+                "Drained %s rows from %s segments in %.3fs (%.1f rows/s)",
+                rows,
+                segments,
+                seconds,
+                stats.rows_per_second,
+            )
+        return stats
+
+    def run(self, interval=60):
+        """
+        Drain the spool every interval seconds until stopped.
+        """
+        while not self._stop.is_set():
+            try:
+                self.drain_once()
+            except Exception as e:
+                logger.error("Failed to drain spool: %s", e)
+            self._stop.wait(interval)
+
+    def start(self, interval=60):
+        """
+        Run the drainer in a background thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, args=(interval,), name="spool-drainer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, drain=True):
+        """
+        Stop the background thread and optionally drain the remaining rows.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if drain:
+            self.drain_once()
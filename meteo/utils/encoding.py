@@ -24,6 +24,17 @@ def force_text(s, encoding="utf-8", errors="strict"):
     return s
 
 
+def force_bytes(s, encoding="utf-8", errors="strict"):
+    """
+    Force string or bytes s to bytes.
+    """
+    if isinstance(s, bytes):
+        return s
+    if isinstance(s, (bytearray, memoryview)):
+        return bytes(s)
+    return str(s).encode(encoding, errors)
+
+
 def get_value_or_none(data, index):
     """
     Get value at certain index from list. Return None if index outside data
@@ -0,0 +1,149 @@
+import json
+
+DEFAULT_READ_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+class _Reader(object):
+    """
+    Buffered reader over text file-like object.
+    """
+
+    def __init__(self, fp, read_size):
+        self.fp = fp
+        self.read_size = read_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Read more data into the buffer. Return False at end of file.
+        """
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Return next non-whitespace character without consuming it, or empty
+        string at end of file.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+
+def iter_json_array(fp, read_size=DEFAULT_READ_SIZE):
+    """
+    Incrementally parse JSON array from text file-like object and yield its
+    items.
+
+    Only one item and one read buffer are kept in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    reader = _Reader(fp, read_size)
+
+    if reader.peek() != "[":
+        raise JSONStreamError("Expecting JSON array")
+    reader.pos += 1
+
+    if reader.peek() == "]":
+        return
+
+    while True:
+        reader.peek()
+        while True:
+            try:
+                item, end = decoder.raw_decode(reader.buf, reader.pos)
+                # Item that ends at the end of buffer may be incomplete, e.g.
+                # number split across reads.
+                if end < len(reader.buf) or reader.eof:
+                    break
+            except json.JSONDecodeError:
+                if reader.eof:
+                    raise
+            if not reader.fill():
+                item, end = decoder.raw_decode(reader.buf, reader.pos)
+                break
+        reader.pos = end
+        yield item
+
+        c = reader.peek()
+        if c == ",":
+            reader.pos += 1
+        elif c == "]":
+            return
+        else:
+            raise JSONStreamError("Expecting ',' or ']' but got {!r}".format(c))
+
+
+def iter_json_lines(fp):
+    """
+    Parse newline-delimited JSON from text file-like object and yield each
+    item. Empty lines are skipped.
+    """
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_json(fp, read_size=DEFAULT_READ_SIZE):
+    """
+    Incrementally parse JSON array or newline-delimited JSON from text
+    file-like object and yield each item. The format is detected from the first
+    non-whitespace character.
+    """
+    reader = _Reader(fp, read_size)
+    first = reader.peek()
+    if first == "[":
+        # Hand buffered data back to the array parser.
+        items = iter_json_array(_Prefixed(reader.buf[reader.pos :], fp), read_size)
+    else:
+        items = iter_json_lines(_Prefixed(reader.buf[reader.pos :], fp))
+    for item in items:
+        yield item
+
+
+class _Prefixed(object):
+    """
+    File-like object that returns prefix data before reading from fp.
+    """
+
+    def __init__(self, prefix, fp):
+        self.prefix = prefix
+        self.fp = fp
+
+    def read(self, size=-1):
+        if self.prefix:
+            data, self.prefix = self.prefix, ""
+            return data
+        return self.fp.read(size)
+
+    def __iter__(self):
+        if self.prefix:
+            prefix, self.prefix = self.prefix, ""
+            lines = prefix.splitlines(True)
+            # Last prefix line may continue in the file.
+            if lines and not lines[-1].endswith("\n"):
+                lines[-1] += self.fp.readline()
+            for line in lines:
+                yield line
+        for line in self.fp:
+            yield line
@@ -18,8 +18,12 @@ setup(
     long_description_content_type="text/markdown",
     license="MIT",
     install_requires=[
-        "sqlalchemy",
+        "numpy>=1.16.0",
+        "sqlalchemy>=1.4.33",
     ],
+    extras_require={
+        "archive": ["pyarrow>=4.0.0"],
+    },
     author="BPPTKG",
     author_email="bpptkg@esdm.go.id",
     zip_safe=False,
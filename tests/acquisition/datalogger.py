@@ -0,0 +1,227 @@
+import datetime
+import http.server
+import os
+import socket
+import threading
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+from meteo.datalogger import (
+    Backfill,
+    CR6Client,
+    DataloggerError,
+    data_query_url,
+    iter_windows,
+)
+
+START = datetime.datetime(2026, 1, 1)
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "fixtures",
+)
+
+
+def minutes(n):
+    return datetime.timedelta(minutes=n)
+
+
+class FakeDatalogger(object):
+    """
+    Fake datalogger with one record per minute from START up to end.
+    """
+
+    def __init__(self, end, failures=None):
+        self.end = end
+        self.failures = failures or {}
+        self.lock = threading.Lock()
+
+    def fetch(self, start, end):
+        with self.lock:
+            if self.failures.get(start, 0) > 0:
+                self.failures[start] -= 1
+                raise ConnectionError("Connection reset")
+        timestamps = []
+        current = start
+        while current < min(end, self.end):
+            timestamps.append(current)
+            current += minutes(1)
+        return timestamps
+
+
+class BackfillTest(unittest.TestCase):
+    def run_backfill(self, datalogger, end, **kwargs):
+        chunks = []
+        checkpoints = []
+        backfill = Backfill(
+            datalogger.fetch,
+            parse=lambda timestamps: {"timestamp": timestamps},
+            on_chunk=chunks.append,
+            on_checkpoint=checkpoints.append,
+            window=minutes(10),
+            workers=3,
+            retry_delay=0,
+            **kwargs
+        )
+        return backfill.run(START, end), chunks, checkpoints
+
+    def test_data_query_url(self):
+        url = data_query_url("http://localhost/", START, START + minutes(10))
+        params = parse_qs(urlparse(url).query)
+        self.assertEqual(params["mode"], ["date-range"])
+        self.assertEqual(params["p1"], ["2026-01-01T00:00:00"])
+        self.assertEqual(params["p2"], ["2026-01-01T00:10:00"])
+
+    def test_iter_windows(self):
+        windows = list(iter_windows(START, START + minutes(25), minutes(10)))
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[-1], (START + minutes(20), START + minutes(25)))
+
+    def test_backfill(self):
+        datalogger = FakeDatalogger(START + minutes(95))
+        result, chunks, checkpoints = self.run_backfill(
+            datalogger, START + minutes(100), retries=2
+        )
+        self.assertEqual(result.windows, 10)
+        self.assertEqual(result.rows, 95)
+        self.assertEqual(result.failed, [])
+        self.assertEqual(sum(len(chunk["timestamp"]) for chunk in chunks), 95)
+        # The last window is checkpointed after its last record.
+        self.assertEqual(result.checkpoint, START + minutes(95))
+        self.assertEqual(checkpoints, sorted(checkpoints))
+
+    def test_retry(self):
+        datalogger = FakeDatalogger(
+            START + minutes(30), failures={START + minutes(10): 2}
+        )
+        result, _, _ = self.run_backfill(datalogger, START + minutes(30), retries=2)
+        self.assertEqual(result.rows, 30)
+        self.assertEqual(result.failed, [])
+
+    def test_failed_window_holds_checkpoint(self):
+        datalogger = FakeDatalogger(
+            START + minutes(50), failures={START + minutes(20): 10}
+        )
+        result, chunks, checkpoints = self.run_backfill(
+            datalogger, START + minutes(50), retries=1
+        )
+        self.assertEqual(result.failed, [(START + minutes(20), START + minutes(30))])
+        # Windows after the failed one are stored anyway.
+        self.assertEqual(result.rows, 40)
+        self.assertEqual(result.checkpoint, START + minutes(20))
+        self.assertEqual(max(checkpoints), START + minutes(20))
+
+    def test_failed_first_window(self):
+        datalogger = FakeDatalogger(START + minutes(30), failures={START: 10})
+        result, _, checkpoints = self.run_backfill(
+            datalogger, START + minutes(30), retries=1
+        )
+        self.assertEqual(result.rows, 20)
+        self.assertEqual(result.checkpoint, START)
+        self.assertEqual(checkpoints, [START])
+
+
+class DataQueryHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        params = dict((k, v[0]) for k, v in parse_qs(urlparse(self.path).query).items())
+        self.server.queries.append(params)
+        header, rows = self.server.header, self.server.rows
+        if params["mode"] == "since-record":
+            rows = [row for row in rows if int(row.split(b",")[1]) >= int(params["p1"])]
+        elif params["mode"] == "most-recent":
+            rows = rows[-int(params["p1"]) :]
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = header + b"".join(rows)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CR6ClientTest(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(FIXTURES_DIR, "Table1.csv"), "rb") as f:
+            lines = f.read().splitlines(True)
+        self.server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), DataQueryHandler
+        )
+        self.server.header = b"".join(lines[:4])
+        self.server.rows = lines[4:50]
+        self.server.connections = 0
+        self.server.queries = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.client = CR6Client(
+            "http://127.0.0.1:{}/".format(self.server.server_address[1]),
+            initial_records=10,
+            chunk_size=100,
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_poll(self):
+        columns = self.client.poll()
+        self.assertEqual(len(columns["timestamp"]), 10)
+        self.assertEqual(self.client.last_record, 1095795)
+
+        # Nothing new.
+        columns = self.client.poll()
+        self.assertEqual(len(columns["timestamp"]), 0)
+
+        self.server.rows.extend(self.fixture_rows()[46:51])
+        columns = self.client.poll()
+        self.assertEqual(columns["record_id"].tolist(), list(range(1095796, 1095801)))
+        self.assertEqual(self.server.queries[-1]["mode"], "since-record")
+        self.assertEqual(self.server.queries[-1]["p1"], "1095796")
+
+        # All polls share one connection.
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.client.requests, 3)
+
+    def test_poll_without_advance(self):
+        columns = self.client.poll(advance=False)
+        self.assertIsNone(self.client.last_record)
+        self.client.advance(columns)
+        self.assertEqual(self.client.last_record, 1095795)
+
+    def test_iter_query(self):
+        chunks = list(self.client.iter_query("since-record", 0))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sum(len(c["timestamp"]) for c in chunks), 46)
+
+    def test_reconnect(self):
+        self.client.poll()
+        # Connection can't be used anymore, e.g. closed by the server while
+        # idle.
+        self.client._conn.sock.shutdown(socket.SHUT_RDWR)
+        self.assertEqual(len(self.client.since_record(1095790)["timestamp"]), 5)
+        self.assertEqual(self.client.connections, 2)
+
+    def test_error_status(self):
+        with self.assertRaises(DataloggerError):
+            self.client.query("unknown-mode")
+
+    def fixture_rows(self):
+        with open(os.path.join(FIXTURES_DIR, "Table1.csv"), "rb") as f:
+            return f.read().splitlines(True)[4:]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from meteo.poller import Poller, next_tick, percentile
+
+
+class FakeClock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class PollerTest(unittest.TestCase):
+    def test_next_tick(self):
+        self.assertEqual(next_tick(125.0, 60, 5), 125.0 + 60)
+        self.assertEqual(next_tick(124.0, 60, 5), 125.0)
+        self.assertEqual(next_tick(0.5, 60), 60.0)
+
+    def test_percentile(self):
+        self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(percentile([3.0], 50), 3.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_once(self):
+        clock = FakeClock()
+        stored = []
+
+        def fetch():
+            clock.now += 0.5
+            return {"timestamp": [1, 2, 3]}
+
+        def store(data):
+            clock.now += 0.25
+            stored.append(data)
+
+        poller = Poller(fetch, store, clock=clock)
+        metrics = poller.run_once(scheduled=999.0)
+        self.assertEqual(metrics.rows, 3)
+        self.assertEqual(metrics.lag, 1.0)
+        self.assertEqual(metrics.fetch, 0.5)
+        self.assertEqual(metrics.store, 0.25)
+        self.assertEqual(metrics.total, 0.75)
+        self.assertEqual(len(stored), 1)
+
+        stats = poller.stats()
+        self.assertEqual(stats["cycles"], 1)
+        self.assertEqual(stats["rows"], 3)
+        self.assertEqual(stats["total_max"], 0.75)
+
+    def test_empty_and_failed_cycles(self):
+        results = [{"timestamp": []}, ConnectionError("timed out")]
+        stored = []
+
+        def fetch():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        poller = Poller(fetch, stored.append)
+        self.assertEqual(poller.run_once().rows, 0)
+        self.assertEqual(poller.run_once().error, "timed out")
+        self.assertEqual(stored, [])
+        self.assertEqual(poller.stats()["errors"], 1)
+
+    def test_start_and_stop(self):
+        poller = Poller(
+            lambda: [1], lambda data: None, interval=0.02, delay=0, jitter=0
+        )
+        poller.start()
+        for _ in range(500):
+            if poller.cycles >= 3:
+                break
+            poller._stop.wait(0.01)
+        poller.stop()
+        self.assertGreaterEqual(poller.rows, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
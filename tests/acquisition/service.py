@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+
+from meteo.acquisition import AcquisitionService, Station
+
+
+class AcquisitionServiceTest(unittest.TestCase):
+    def test_multiple_stations(self):
+        entries = []
+        lines = []
+
+        async def handle(reader, writer):
+            writer.write(b"1R2,Ta=21.0C,Ua=94.2P\r\n1R3,Rc=0.01M\r\n")
+            writer.write(b"1R3,Rc=0.02M\r\n")
+            await writer.drain()
+            await asyncio.sleep(1)
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            service = AcquisitionService(
+                [
+                    Station("a", "127.0.0.1", port, interval=0.2),
+                    Station("b", "127.0.0.1", port, interval=0.2),
+                ],
+                writer=lambda name, entry: entries.append((name, entry)),
+                on_line=lambda name, timestamp, line: lines.append((name, line)),
+            )
+            task = asyncio.ensure_future(service.run())
+            await asyncio.sleep(0.5)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
+
+        self.assertEqual(sorted(name for name, _ in entries), ["a", "b"])
+        for name, entry in entries:
+            self.assertEqual(entry["air_temperature"], 21.0)
+            self.assertAlmostEqual(entry["rain_acc"], 0.03, places=4)
+        self.assertEqual(len(lines), 6)
+        self.assertIn(("a", b"1R3,Rc=0.02M\r\n"), lines)
+
+    def test_flush_on_shutdown_and_reset_delay(self):
+        entries = []
+        connections = []
+
+        async def handle(reader, writer):
+            connections.append(writer)
+            writer.write(b"1R2,Ta=21.0C,Ua=94.2P\r\n")
+            await writer.drain()
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            station = Station(
+                "a",
+                "127.0.0.1",
+                port,
+                interval=60,
+                reconnect_delay=0.02,
+                max_reconnect_delay=10,
+            )
+            service = AcquisitionService(
+                [station], writer=lambda name, entry: entries.append((name, entry))
+            )
+            task = asyncio.ensure_future(service.run())
+            await asyncio.sleep(0.6)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(main())
+
+        # Delay is not doubled after each successful connection.
+        self.assertGreater(len(connections), 10)
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0][1]["air_temperature"], 21.0)
+
+    def test_unique_station_names(self):
+        with self.assertRaises(ValueError):
+            AcquisitionService(
+                [Station("a", "localhost", 1), Station("a", "localhost", 2)],
+                writer=None,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, func, select
+
+from meteo.db.archive import (
+    FEATHER,
+    ArchiveError,
+    arrow_schema,
+    export_archive,
+    import_archive,
+    iter_archive,
+    iter_entries,
+)
+from meteo.db.ops import chunked_insert
+from meteo.models import cr6
+from meteo.models.stations import get_model
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine("sqlite://")
+        cr6.CR6.__table__.create(self.engine)
+        self.start = datetime.datetime(2026, 1, 31, 20)
+        entries = [
+            {
+                "timestamp": self.start + datetime.timedelta(hours=i),
+                "rainfall": float(i) if i % 2 else None,
+            }
+            for i in range(10)
+        ]
+        chunked_insert(self.engine, cr6.CR6, entries)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def count(self, engine, model):
+        with engine.connect() as conn:
+            return conn.execute(
+                select(func.count()).select_from(model.__table__)
+            ).scalar()
+
+    def test_schema(self):
+        schema = arrow_schema(cr6.CR6)
+        self.assertEqual(schema.names[0], "timestamp")
+        self.assertEqual(str(schema.field("timestamp").type), "timestamp[us]")
+        self.assertEqual(str(schema.field("rainfall").type), "double")
+
+    def test_round_trip(self):
+        for fmt in ("parquet", FEATHER):
+            written = export_archive(
+                self.engine, cr6.CR6, self.directory, fmt=fmt, chunk_size=3
+            )
+            names = [os.path.basename(path) for path, _ in written]
+            suffix = "." + fmt
+            self.assertEqual(names, ["cr6_p202601" + suffix, "cr6_p202602" + suffix])
+            self.assertEqual([count for _, count in written], [4, 6])
+            self.assertEqual(
+                [len(batch) for batch in iter_archive(written[1][0], chunk_size=4)],
+                [3, 3] if fmt == FEATHER else [4, 2],
+            )
+
+            engine = create_engine("sqlite://")
+            cr6.CR6.__table__.create(engine)
+            for path, _ in written:
+                import_archive(engine, cr6.CR6, path, chunk_size=4)
+            self.assertEqual(self.count(engine, cr6.CR6), 10)
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(cr6.CR6.__table__.c.rainfall).order_by(
+                        cr6.CR6.__table__.c.record_timestamp
+                    )
+                ).all()
+            self.assertEqual(rows[0][0], None)
+            self.assertEqual(rows[1][0], 1.0)
+
+            # Existing rows are skipped.
+            import_archive(engine, cr6.CR6, written[0][0], on_duplicate="ignore")
+            self.assertEqual(self.count(engine, cr6.CR6), 10)
+            engine.dispose()
+
+    def test_export_range(self):
+        written = export_archive(
+            self.engine,
+            cr6.CR6,
+            self.directory,
+            start=datetime.datetime(2026, 2, 1),
+            end=datetime.datetime(2026, 2, 1, 2),
+        )
+        self.assertEqual([count for _, count in written], [3])
+
+    def test_merge_partial_period(self):
+        export_archive(self.engine, cr6.CR6, self.directory)
+        table = cr6.CR6.__table__
+        with self.engine.begin() as conn:
+            conn.execute(table.update().values(rainfall=-1.0))
+
+        written = export_archive(
+            self.engine,
+            cr6.CR6,
+            self.directory,
+            start=datetime.datetime(2026, 2, 1, 1),
+            end=datetime.datetime(2026, 2, 1, 2),
+        )
+        self.assertEqual([count for _, count in written], [2])
+
+        entries = list(iter_entries(cr6.CR6, written[0][0]))
+        self.assertEqual(len(entries), 6)
+        self.assertEqual(
+            [entry["timestamp"].hour for entry in entries], [0, 1, 2, 3, 4, 5]
+        )
+        self.assertEqual(
+            [entry["rainfall"] for entry in entries],
+            [None, -1.0, -1.0, 7.0, None, 9.0],
+        )
+
+    def test_json_column(self):
+        model = get_model("jro")
+        engine = create_engine("sqlite://")
+        model.__table__.create(engine)
+        chunked_insert(
+            engine,
+            model,
+            [{"timestamp": self.start, "raw": {"Ta": 20.5}, "air_temperature": 20.5}],
+        )
+        written = export_archive(engine, model, self.directory)
+        model.__table__.drop(engine)
+        model.__table__.create(engine)
+        import_archive(engine, model, written[0][0])
+        with engine.connect() as conn:
+            row = conn.execute(select(model.__table__)).one()
+        self.assertEqual(row.raw, {"Ta": 20.5})
+        self.assertEqual(row.air_temperature, 20.5)
+        engine.dispose()
+
+    def test_unknown_columns(self):
+        written = export_archive(self.engine, cr6.CR6, self.directory)
+        model = get_model("bbd")
+        with self.assertRaises(ArchiveError):
+            import_archive(self.engine, model, written[0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import datetime
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from meteo.db.cache import RangeCache
+from meteo.db.ops import chunked_insert
+from meteo.models import cr6
+from meteo.models.stations import get_model
+
+
+class RangeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine("sqlite://")
+        cr6.CR6.__table__.create(self.engine)
+        self.now = datetime.datetime(2026, 3, 10, 12, 0)
+        self.cache = RangeCache(self.engine, self.directory, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def insert(self, start, hours, rainfall):
+        entries = [
+            {"timestamp": start + datetime.timedelta(hours=i), "rainfall": rainfall}
+            for i in range(hours)
+        ]
+        chunked_insert(self.engine, cr6.CR6, entries)
+
+    def test_closed_windows_are_cached(self):
+        self.insert(datetime.datetime(2026, 1, 31), 48, 1.0)
+        start = datetime.datetime(2026, 1, 31, 12)
+        end = datetime.datetime(2026, 2, 1, 11)
+
+        data = self.cache.read(cr6.CR6, start, end, columns=["rainfall"])
+        self.assertEqual(len(data["timestamp"]), 24)
+        self.assertEqual(self.cache.misses, 2)
+        self.assertGreater(self.cache.size(), 0)
+
+        # Cached windows don't see updated values.
+        with self.engine.begin() as conn:
+            conn.execute(cr6.CR6.__table__.update().values(rainfall=2.0))
+        data = self.cache.read(cr6.CR6, start, end, columns=["rainfall"], as_frame=True)
+        self.assertEqual(len(data), 24)
+        self.assertEqual(list(data.columns), ["timestamp", "rainfall"])
+        self.assertEqual(list(data["rainfall"].unique()), [1.0])
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_backfilled_window_is_refetched(self):
+        self.insert(datetime.datetime(2026, 1, 1), 2, 1.0)
+        start = datetime.datetime(2026, 1, 1)
+        end = datetime.datetime(2026, 1, 31)
+        self.assertEqual(len(self.cache.read(cr6.CR6, start, end)["timestamp"]), 2)
+
+        self.insert(datetime.datetime(2026, 1, 1, 0, 30), 1, 1.0)
+        self.assertEqual(len(self.cache.read(cr6.CR6, start, end)["timestamp"]), 3)
+        self.assertEqual(self.cache.misses, 2)
+
+        self.assertEqual(len(self.cache.read(cr6.CR6, start, end)["timestamp"]), 3)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_json_column(self):
+        model = get_model("jro")
+        model.__table__.create(self.engine)
+        timestamp = datetime.datetime(2026, 1, 1)
+        chunked_insert(
+            self.engine, model, [{"timestamp": timestamp, "raw": {"Ta": [20.5]}}]
+        )
+        for _ in range(2):
+            data = self.cache.read(model, timestamp, timestamp, columns=["raw"])
+            self.assertEqual(data["raw"][0], {"Ta": [20.5]})
+            self.assertEqual(data["timestamp"].dtype, np.dtype("datetime64[us]"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_open_window_is_refetched(self):
+        self.insert(datetime.datetime(2026, 3, 1), 2, 1.0)
+        start = datetime.datetime(2026, 3, 1)
+        end = datetime.datetime(2026, 3, 10)
+        self.assertEqual(len(self.cache.read(cr6.CR6, start, end)["timestamp"]), 2)
+
+        self.insert(datetime.datetime(2026, 3, 2), 1, 1.0)
+        self.assertEqual(len(self.cache.read(cr6.CR6, start, end)["timestamp"]), 3)
+        self.assertEqual(self.cache.hits + self.cache.misses, 0)
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_eviction(self):
+        self.insert(datetime.datetime(2025, 1, 1), 24 * 90, 1.0)
+        self.cache.max_bytes = 1
+        self.cache.read(
+            cr6.CR6, datetime.datetime(2025, 1, 1), datetime.datetime(2025, 3, 31)
+        )
+        self.assertEqual(self.cache.misses, 3)
+        self.assertEqual(self.cache.size(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, Table
+from sqlalchemy.ext.automap import automap_base
+
+from meteo.db.engine import dispose_engines, get_engine, prepare
+
+
+class GetEngineTest(unittest.TestCase):
+    def tearDown(self):
+        dispose_engines()
+
+    def test_engine_is_shared(self):
+        engine = get_engine("sqlite://")
+        self.assertIs(get_engine("sqlite://"), engine)
+        self.assertIsNot(get_engine("sqlite://", echo=True), engine)
+
+    def test_sqlite_ignores_pool_size(self):
+        engine = get_engine("sqlite://", pool_size=1, max_overflow=0)
+        with engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("SELECT 1").scalar(), 1)
+
+    def test_dispose_engines(self):
+        engine = get_engine("sqlite://")
+        dispose_engines()
+        self.assertIsNot(get_engine("sqlite://"), engine)
+
+
+def declare_base():
+    Base = automap_base()
+
+    class Station(Base):
+        __tablename__ = "station"
+
+        timestamp = Column("timestamp", DateTime, primary_key=True)
+        air_temperature = Column("air_temperature", Float)
+
+    return Base, Station
+
+
+class PrepareTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.directory, "metadata.pickle")
+        self.engine = get_engine(
+            "sqlite:///" + os.path.join(self.directory, "meteo.sqlite3")
+        )
+
+        Base, _ = declare_base()
+        Base.metadata.create_all(self.engine)
+        metadata = MetaData()
+        Table("extra", metadata, Column("id", Integer, primary_key=True))
+        metadata.create_all(self.engine)
+
+    def tearDown(self):
+        dispose_engines()
+        shutil.rmtree(self.directory)
+
+    def test_prepare_without_reflection(self):
+        Base, Station = declare_base()
+        prepare(Base, None)
+
+        self.assertEqual(Station.__mapper__.local_table.name, "station")
+        self.assertNotIn("extra", Base.metadata.tables)
+
+    def test_prepare_with_cache(self):
+        Base, _ = declare_base()
+        prepare(Base, self.engine, cache_path=self.cache_path)
+        self.assertTrue(os.path.exists(self.cache_path))
+        self.assertIn("extra", Base.classes)
+
+        # Cached metadata is used without touching the database.
+        Base, Station = declare_base()
+        prepare(Base, object(), cache_path=self.cache_path)
+        self.assertIn("extra", Base.classes)
+        self.assertEqual(Station.__mapper__.local_table.name, "station")
+
+
+if __name__ == "__main__":
+    unittest.main()
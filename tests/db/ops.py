@@ -0,0 +1,90 @@
+import datetime
+import unittest
+
+from sqlalchemy import create_engine, select
+
+from meteo.db.ops import bulk_upsert, chunked_insert
+from meteo.models import cr6
+
+
+class BulkUpsertTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.table = cr6.CR6.__table__
+        self.table.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def entries(self, minutes, temperature):
+        return [
+            {
+                "timestamp": datetime.datetime(2020, 1, 1, 0, minute),
+                "air_temperature": temperature,
+            }
+            for minute in minutes
+        ]
+
+    def fetch(self):
+        stmt = select(self.table.c.record_timestamp, self.table.c.air_temperature)
+        with self.engine.connect() as conn:
+            return [
+                tuple(row) for row in conn.execute(stmt.order_by("record_timestamp"))
+            ]
+
+    def test_upsert_overlapping_entries(self):
+        bulk_upsert(self.engine, cr6.CR6, self.entries(range(0, 5), 20.0))
+        count = bulk_upsert(
+            self.engine, cr6.CR6, self.entries(range(3, 8), 21.0), chunk_size=2
+        )
+
+        self.assertEqual(count, 5)
+        rows = self.fetch()
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[2][1], 20.0)
+        self.assertEqual(rows[3][1], 21.0)
+
+    def test_insert_ignore(self):
+        bulk_upsert(self.engine, cr6.CR6, self.entries(range(0, 2), 20.0))
+        bulk_upsert(self.engine, cr6.CR6, self.entries(range(0, 3), 21.0), update=False)
+
+        rows = self.fetch()
+        self.assertEqual([row[1] for row in rows], [20.0, 20.0, 21.0])
+
+    def test_upsert_sparse_entries(self):
+        entries = self.entries(range(0, 2), 20.0)
+        entries[1]["rainfall"] = 1.0
+        bulk_upsert(self.engine, cr6.CR6, entries)
+
+        self.assertEqual(len(self.fetch()), 2)
+
+    def test_upsert_partial_entries(self):
+        entries = self.entries(range(0, 2), 20.0)
+        for entry in entries:
+            entry["rainfall"] = 1.0
+        bulk_upsert(self.engine, cr6.CR6, entries)
+
+        partial = [
+            {"timestamp": datetime.datetime(2020, 1, 1, 0, 0), "rainfall": 2.0},
+            {"timestamp": datetime.datetime(2020, 1, 1, 0, 1), "air_temperature": 21.0},
+            {"timestamp": datetime.datetime(2020, 1, 1, 0, 0), "rainfall": 3.0},
+        ]
+        bulk_upsert(self.engine, cr6.CR6, partial)
+
+        stmt = select(self.table.c.air_temperature, self.table.c.rainfall).order_by(
+            self.table.c.record_timestamp
+        )
+        with self.engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(stmt)]
+        self.assertEqual(rows, [(20.0, 3.0), (21.0, 1.0)])
+
+    def test_chunked_insert(self):
+        entries = iter(self.entries(range(0, 5), 20.0))
+        count = chunked_insert(self.engine, cr6.CR6, entries, chunk_size=2)
+
+        self.assertEqual(count, 5)
+        self.assertEqual(len(self.fetch()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
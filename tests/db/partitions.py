@@ -0,0 +1,121 @@
+import contextlib
+import datetime
+import unittest
+
+from sqlalchemy import create_engine
+
+from meteo.db.partitions import (
+    YEAR,
+    _mysql_partition_definitions,
+    create_partitions,
+    iter_periods,
+    list_partitions,
+    rotate_partitions,
+)
+from meteo.models import cr6
+
+
+class PeriodTest(unittest.TestCase):
+    def test_iter_periods(self):
+        names = [
+            p.name
+            for p in iter_periods(
+                datetime.date(2025, 11, 15), datetime.date(2026, 1, 1)
+            )
+        ]
+        self.assertEqual(names, ["p202511", "p202512", "p202601"])
+
+        partitions = list(
+            iter_periods(datetime.date(2025, 5, 1), datetime.date(2026, 5, 1), YEAR)
+        )
+        self.assertEqual([p.name for p in partitions], ["p2025", "p2026"])
+        self.assertEqual(partitions[-1].end, datetime.date(2027, 1, 1))
+
+    def test_mysql_partition_definitions(self):
+        partitions = iter_periods(datetime.date(2026, 1, 1), datetime.date(2026, 1, 1))
+        self.assertEqual(
+            _mysql_partition_definitions(partitions),
+            "PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')), "
+            "PARTITION pmax VALUES LESS THAN MAXVALUE",
+        )
+
+
+class FakeMySQLEngine(object):
+    """
+    Engine that answers partition listing with given names and records other
+    statements.
+    """
+
+    class dialect(object):
+        name = "mysql"
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.statements = []
+
+    @contextlib.contextmanager
+    def connect(self):
+        yield self
+
+    begin = connect
+
+    def execute(self, statement, params=None):
+        if "information_schema" in str(statement):
+            return [(name,) for name in self.names + ["pmax"]]
+        self.statements.append(str(statement))
+
+
+class MySQLPartitionTest(unittest.TestCase):
+    def test_partition_table(self):
+        engine = FakeMySQLEngine([])
+        created = create_partitions(
+            engine, cr6.CR6, datetime.date(2026, 1, 1), datetime.date(2026, 2, 1)
+        )
+        self.assertEqual([p.name for p in created], ["p202601", "p202602"])
+        self.assertEqual(len(engine.statements), 1)
+        self.assertTrue(
+            engine.statements[0].startswith(
+                "ALTER TABLE cr6 PARTITION BY RANGE (TO_DAYS(record_timestamp))"
+            )
+        )
+
+    def test_rotate(self):
+        engine = FakeMySQLEngine(["p202601", "p202602", "p202603"])
+        created, dropped = rotate_partitions(
+            engine, cr6.CR6, ahead=1, keep=1, today=datetime.date(2026, 3, 15)
+        )
+        self.assertEqual([p.name for p in created], ["p202604"])
+        self.assertEqual([p.name for p in dropped], ["p202601"])
+        self.assertEqual(
+            engine.statements,
+            [
+                "ALTER TABLE cr6 REORGANIZE PARTITION pmax INTO ("
+                "PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')), "
+                "PARTITION pmax VALUES LESS THAN MAXVALUE)",
+                "ALTER TABLE cr6 DROP PARTITION p202601",
+            ],
+        )
+
+    def test_dry_run(self):
+        engine = FakeMySQLEngine(["p202601"])
+        created, dropped = rotate_partitions(
+            engine,
+            cr6.CR6,
+            ahead=1,
+            keep=1,
+            today=datetime.date(2026, 3, 15),
+            dry_run=True,
+        )
+        self.assertEqual([p.name for p in created], ["p202603", "p202604"])
+        self.assertEqual([p.name for p in dropped], ["p202601"])
+        self.assertEqual(engine.statements, [])
+
+    def test_unsupported_dialect(self):
+        engine = create_engine("sqlite://")
+        with self.assertRaises(NotImplementedError):
+            list_partitions(engine, cr6.CR6)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
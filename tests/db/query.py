@@ -0,0 +1,82 @@
+import datetime
+import unittest
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from meteo.db.ops import chunked_insert
+from meteo.db.query import QueryError, iter_range, read_range
+from meteo.db.rollup import rebuild_rollups
+from meteo.models import cr6
+
+
+class RangeQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        cr6.CR6.__table__.create(self.engine)
+        self.start = datetime.datetime(2026, 1, 1)
+        entries = [
+            {
+                "timestamp": self.start + datetime.timedelta(minutes=i),
+                "air_temperature": float(i) if i % 3 else None,
+            }
+            for i in range(100)
+        ]
+        chunked_insert(self.engine, cr6.CR6, entries)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_iter_range(self):
+        end = self.start + datetime.timedelta(minutes=9)
+        chunks = list(
+            iter_range(
+                self.engine,
+                cr6.CR6,
+                self.start,
+                end,
+                columns=["air_temperature"],
+                chunk_size=4,
+            )
+        )
+        self.assertEqual([len(chunk["timestamp"]) for chunk in chunks], [4, 4, 2])
+        self.assertEqual(list(chunks[0]), ["timestamp", "air_temperature"])
+        self.assertEqual(chunks[0]["timestamp"].dtype, np.dtype("datetime64[us]"))
+        self.assertEqual(chunks[0]["timestamp"][0], np.datetime64(self.start))
+        self.assertTrue(np.isnan(chunks[0]["air_temperature"][0]))
+        self.assertEqual(chunks[0]["air_temperature"][1], 1.0)
+
+    def test_read_range_frame(self):
+        end = self.start + datetime.timedelta(days=1)
+        df = read_range(self.engine, cr6.CR6, self.start, end, as_frame=True)
+        self.assertEqual(len(df), 100)
+        self.assertIn("timestamp", df.columns)
+        self.assertIn("battery_voltage", df.columns)
+
+    def test_read_empty_range(self):
+        start = self.start - datetime.timedelta(days=2)
+        data = read_range(
+            self.engine, cr6.CR6, start, self.start - datetime.timedelta(days=1)
+        )
+        self.assertEqual(len(data["timestamp"]), 0)
+
+    def test_read_rollup(self):
+        rebuild_rollups(self.engine, cr6.CR6)
+        data = read_range(
+            self.engine,
+            cr6.CR6,
+            self.start + datetime.timedelta(minutes=5),
+            self.start + datetime.timedelta(minutes=99),
+            columns=["count", "air_temperature_avg"],
+            resolution="1h",
+        )
+        self.assertEqual(data["count"].tolist(), [60, 40])
+        self.assertEqual(data["count"].dtype, np.int64)
+
+    def test_unknown_column(self):
+        with self.assertRaises(QueryError):
+            read_range(self.engine, cr6.CR6, self.start, self.start, columns=["foo"])
+
+
+if __name__ == "__main__":
+    unittest.main()
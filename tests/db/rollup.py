@@ -0,0 +1,148 @@
+import datetime
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, select
+
+from meteo.db import rollup
+from meteo.db.ops import to_table_rows
+from meteo.db.rollup import (
+    RollupUpdater,
+    choose_resolution,
+    create_rollup_tables,
+    floor_time,
+    get_rollup_table,
+    rebuild_rollups,
+    select_range,
+    update_rollups,
+)
+from meteo.db.writer import BufferedWriter
+from meteo.models import cr6
+
+
+class RollupFunctionTest(unittest.TestCase):
+    def test_floor_time(self):
+        t = datetime.datetime(2026, 1, 2, 13, 47, 30)
+        self.assertEqual(floor_time(t, "10min"), datetime.datetime(2026, 1, 2, 13, 40))
+        self.assertEqual(floor_time(t, "1h"), datetime.datetime(2026, 1, 2, 13))
+        self.assertEqual(floor_time(t, "1d"), datetime.datetime(2026, 1, 2))
+
+    def test_choose_resolution(self):
+        start = datetime.datetime(2026, 1, 1)
+        day = datetime.timedelta(days=1)
+        self.assertIsNone(choose_resolution(start, start + day))
+        self.assertEqual(choose_resolution(start, start + 10 * day), "10min")
+        self.assertEqual(choose_resolution(start, start + 60 * day), "1h")
+        self.assertEqual(choose_resolution(start, start + 3650 * day), "1d")
+        self.assertEqual(choose_resolution(start, start + 36500 * day), "1d")
+
+        stmt, resolution = select_range(cr6.CR6, start, start + 60 * day)
+        self.assertEqual(resolution, "1h")
+        self.assertIn("cr6_1h", str(stmt))
+
+
+class RollupTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        cr6.CR6.__table__.create(self.engine)
+        create_rollup_tables(self.engine, cr6.CR6)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def entries(self, start, minutes):
+        return [
+            {
+                "timestamp": start + datetime.timedelta(minutes=i),
+                "air_temperature": float(i),
+                "wind_direction": 350.0 if i % 2 else 10.0,
+                "rainfall": None if i == 0 else 1.0,
+            }
+            for i in range(minutes)
+        ]
+
+    def fetch(self, resolution):
+        table = get_rollup_table(cr6.CR6, resolution)
+        with self.engine.connect() as conn:
+            return [
+                row._mapping
+                for row in conn.execute(select(table).order_by(table.c.timestamp))
+            ]
+
+    def test_rebuild(self):
+        start = datetime.datetime(2026, 1, 1)
+        with self.engine.begin() as conn:
+            conn.execute(
+                cr6.CR6.__table__.insert(),
+                to_table_rows(cr6.CR6, self.entries(start, 120)),
+            )
+
+        self.assertEqual(rebuild_rollups(self.engine, cr6.CR6), 12 + 2 + 1)
+
+        rows = self.fetch("1h")
+        self.assertEqual([row["count"] for row in rows], [60, 60])
+        self.assertEqual(rows[0]["air_temperature_min"], 0.0)
+        self.assertEqual(rows[0]["air_temperature_avg"], 29.5)
+        self.assertEqual(rows[0]["air_temperature_max"], 59.0)
+        self.assertEqual(rows[0]["rainfall_avg"], 1.0)
+        self.assertAlmostEqual(rows[0]["wind_direction"] % 360.0, 0.0, places=6)
+
+        day = self.fetch("1d")
+        self.assertEqual(day[0]["count"], 120)
+
+    def test_update_reads_touched_buckets_only(self):
+        start = datetime.datetime(2026, 1, 1)
+        table = cr6.CR6.__table__
+        with self.engine.begin() as conn:
+            conn.execute(
+                table.insert(), to_table_rows(cr6.CR6, self.entries(start, 1440))
+            )
+        rebuild_rollups(self.engine, cr6.CR6)
+
+        timestamp = start + datetime.timedelta(hours=12, minutes=34)
+        with self.engine.begin() as conn:
+            conn.execute(
+                table.update()
+                .where(table.c.record_timestamp == timestamp)
+                .values(air_temperature=10000.0)
+            )
+
+        fetched = []
+        original = rollup._fetch_raw
+
+        def fetch_raw(*args):
+            rows = original(*args)
+            fetched.extend(rows)
+            return rows
+
+        with mock.patch("meteo.db.rollup._fetch_raw", side_effect=fetch_raw):
+            self.assertEqual(
+                update_rollups(self.engine, cr6.CR6, timestamp, timestamp), 3
+            )
+        self.assertEqual(len(fetched), 10)
+
+        expected = (sum(range(1440)) - 754 + 10000.0) / 1440
+        day = self.fetch("1d")[0]
+        self.assertEqual(day["count"], 1440)
+        self.assertEqual(day["air_temperature_max"], 10000.0)
+        self.assertAlmostEqual(day["air_temperature_avg"], expected)
+        self.assertAlmostEqual(day["wind_direction"] % 360.0, 0.0, places=6)
+        hour = self.fetch("1h")[12]
+        self.assertAlmostEqual(
+            hour["air_temperature_avg"], (sum(range(720, 780)) - 754 + 10000.0) / 60
+        )
+
+    def test_incremental_update(self):
+        start = datetime.datetime(2026, 1, 1, 23, 50)
+        updater = RollupUpdater(self.engine)
+        writer = BufferedWriter(self.engine, max_rows=5, on_insert=updater.update)
+        for entry in self.entries(start, 20):
+            writer.add(cr6.CR6, entry)
+        writer.close()
+
+        self.assertEqual([row["count"] for row in self.fetch("10min")], [10, 10])
+        self.assertEqual([row["count"] for row in self.fetch("1d")], [10, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from sqlalchemy import create_engine, inspect
+
+from meteo.db.schema import LEAN, SchemaError, apply_profile, create_tables
+from meteo.models import cr6
+
+
+def index_columns(engine, name):
+    return sorted(
+        tuple(index["column_names"]) for index in inspect(engine).get_indexes(name)
+    )
+
+
+class SchemaProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.declared = len(cr6.CR6.__table__.indexes)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_create_lean_table(self):
+        create_tables(self.engine, [cr6.CR6], profile=LEAN, indexed=["rainfall"])
+
+        self.assertEqual(index_columns(self.engine, "cr6"), [("rainfall",)])
+        # Declared model is left untouched.
+        self.assertEqual(len(cr6.CR6.__table__.indexes), self.declared)
+
+    def test_dry_run(self):
+        tables = create_tables(self.engine, [cr6.CR6], dry_run=True)
+        self.assertEqual([table.name for table in tables], ["cr6"])
+        self.assertEqual(inspect(self.engine).get_table_names(), [])
+
+        create_tables(self.engine, [cr6.CR6])
+        self.assertEqual(create_tables(self.engine, [cr6.CR6], dry_run=True), [])
+
+    def test_unknown_column(self):
+        with self.assertRaises(SchemaError):
+            create_tables(self.engine, [cr6.CR6], profile=LEAN, indexed=["foo"])
+
+    def test_migrate_between_profiles(self):
+        create_tables(self.engine, [cr6.CR6])
+        self.assertEqual(len(index_columns(self.engine, "cr6")), self.declared)
+
+        changes = apply_profile(self.engine, cr6.CR6, LEAN, dry_run=True)
+        self.assertEqual(len(changes.dropped), self.declared)
+        self.assertEqual(len(index_columns(self.engine, "cr6")), self.declared)
+
+        apply_profile(self.engine, cr6.CR6, LEAN, indexed=["amount"])
+        self.assertEqual(index_columns(self.engine, "cr6"), [("amount",)])
+
+        changes = apply_profile(self.engine, cr6.CR6)
+        self.assertEqual(changes.dropped, [])
+        self.assertEqual(len(index_columns(self.engine, "cr6")), self.declared)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import datetime
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from sqlalchemy import create_engine, func, select
+
+from meteo.db.writer import BufferedWriter
+from meteo.models import cr6
+
+
+def count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+class BufferedWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.table = cr6.CR6.__table__
+        self.table.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def entry(self, minute):
+        return {
+            "timestamp": datetime.datetime(2020, 1, 1, 0, minute),
+            "air_temperature": 20.0 + minute,
+        }
+
+    def test_flush_on_size(self):
+        writer = BufferedWriter(self.engine, max_rows=3, max_age=3600)
+        writer.add(cr6.CR6, self.entry(0))
+        writer.add(cr6.CR6, self.entry(1))
+        self.assertEqual(count(self.engine, self.table), 0)
+        self.assertEqual(len(writer), 2)
+
+        writer.add(cr6.CR6, self.entry(2))
+        self.assertEqual(count(self.engine, self.table), 3)
+        self.assertEqual(len(writer), 0)
+
+    def test_flush_on_age(self):
+        writer = BufferedWriter(self.engine, max_rows=100, max_age=0)
+        writer.add(cr6.CR6, self.entry(0))
+        self.assertEqual(count(self.engine, self.table), 1)
+
+    def test_drop_duplicate_rows(self):
+        writer = BufferedWriter(self.engine, max_rows=100, max_age=3600)
+        writer.add_many(cr6.CR6, [self.entry(0), self.entry(1), self.entry(0)])
+        writer.close()
+
+        self.assertEqual(count(self.engine, self.table), 2)
+        self.assertEqual(writer.dropped, 1)
+        self.assertEqual(writer.retry_size, 0)
+
+    def test_on_insert_skips_dropped_rows(self):
+        inserted = []
+        writer = BufferedWriter(
+            self.engine,
+            max_rows=100,
+            max_age=3600,
+            on_insert=lambda table, rows: inserted.extend(rows),
+        )
+        writer.add(cr6.CR6, self.entry(0))
+        writer.flush()
+
+        existing = self.entry(0)
+        existing["air_temperature"] = 0.0
+        writer.add_many(cr6.CR6, [existing, self.entry(1), self.entry(1)])
+        writer.flush()
+
+        self.assertEqual([row["record_timestamp"].minute for row in inserted], [0, 1])
+        self.assertEqual(inserted[1]["air_temperature"], 21.0)
+        self.assertEqual(writer.dropped, 2)
+
+    def test_flush_in_background(self):
+        # In-memory database is per thread, so use a file shared by threads.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.engine.dispose()
+        self.engine = create_engine("sqlite:///" + os.path.join(directory, "meteo.db"))
+        self.table.create(self.engine)
+
+        writer = BufferedWriter(self.engine, max_rows=100, max_age=0.1)
+        writer.add(cr6.CR6, self.entry(0))
+        writer.add_many(cr6.CR6, [{"timestamp": datetime.datetime(2020, 1, 1, 1)}])
+        self.assertEqual(count(self.engine, self.table), 0)
+
+        writer.start(interval=0.05)
+        deadline = time.monotonic() + 5
+        while count(self.engine, self.table) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        writer.close()
+        self.assertEqual(count(self.engine, self.table), 2)
+
+    def test_retry_failed_rows(self):
+        writer = BufferedWriter(
+            self.engine, max_rows=100, max_age=3600, max_retry_rows=2
+        )
+        self.table.drop(self.engine)
+        writer.add_many(cr6.CR6, [self.entry(0), self.entry(1), self.entry(2)])
+        writer.flush()
+
+        self.assertEqual(writer.retry_size, 2)
+        self.assertEqual(writer.dropped, 1)
+
+        self.table.create(self.engine)
+        writer.flush()
+        self.assertEqual(count(self.engine, self.table), 2)
+        self.assertEqual(writer.retry_size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from meteo.models.stations import STATIONS, get_model, get_models
+from meteo.parser.fields import FIELD_NAMES
+
+
+class StationModelTest(unittest.TestCase):
+    def test_get_model(self):
+        model = get_model("babadan")
+        self.assertIs(get_model("bbd"), model)
+        self.assertIs(get_model("Babadan"), model)
+        self.assertEqual(model.__name__, "Babadan")
+        self.assertEqual(model.__tablename__, "babadan")
+
+    def test_station_module(self):
+        from meteo.models.bbd import Babadan
+
+        self.assertIs(Babadan, get_model("babadan"))
+
+    def test_unknown_station(self):
+        with self.assertRaises(ValueError):
+            get_model("merapi")
+
+    def test_columns(self):
+        columns = ["timestamp"] + list(FIELD_NAMES)
+        table = get_model("babadan").__table__
+        self.assertEqual([column.key for column in table.columns], columns)
+        self.assertEqual([column.key for column in table.primary_key], ["timestamp"])
+        self.assertEqual(table.c.id.type.length, 64)
+
+        table = get_model("jurangjero").__table__
+        self.assertEqual([column.key for column in table.columns], columns + ["raw"])
+
+    def test_get_models(self):
+        self.assertEqual(
+            [model.__tablename__ for model in get_models()],
+            [info.name for info in STATIONS],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import datetime
+import unittest
+
+from meteo.parser.aggregate import VaisalaAggregator
+
+
+class VaisalaAggregatorTest(unittest.TestCase):
+    def test_latest_value_and_rain_acc(self):
+        timestamp = datetime.datetime(2020, 1, 1)
+        aggregator = VaisalaAggregator()
+        for line in [
+            b"1R3,Rc=0.01M,Rd=10s,Ri=0.0M,Hc=0.0M,Hd=0s,Hi=0.0M,Rp=185.1M,Hp=2.0M\r\n",
+            b"1R2,Ta=21.0C,Tp=21.0C,Ua=94.2P,Pa=872.1H\r\n",
+            b"c/address error\r\n",
+            b"1R2,Ta=21.5C,Tp=21.0C,Ua=94.2P,Pa=872.1H\r\n",
+            b"1R3,Rc=0.02M,Rd=10s,Ri=0.0M,Hc=0.0M,Hd=0s,Hi=0.0M,Rp=185.1M,Hp=2.0M\r\n",
+        ]:
+            aggregator.add(line)
+
+        self.assertEqual(aggregator.count, 5)
+        entry = aggregator.flush(timestamp)
+
+        self.assertEqual(entry["timestamp"], timestamp)
+        self.assertAlmostEqual(entry["rain_acc"], 0.03, places=4)
+        self.assertEqual(entry["air_temperature"], 21.5)
+        self.assertIsNone(entry["wind_speed_avg"])
+
+    def test_missing_value_replaces_previous_value(self):
+        aggregator = VaisalaAggregator()
+        aggregator.add(b"1R2,Ta=21.0C,Ua=94.2P\r\n")
+        aggregator.add(b"1R2,Ta=C\r\n")
+        entry = aggregator.flush()
+
+        self.assertIsNone(entry["air_temperature"])
+        self.assertEqual(entry["relative_humidity"], 94.2)
+
+    def test_empty_rain_acc_is_zero(self):
+        aggregator = VaisalaAggregator()
+        aggregator.add(b"1R3,Rc=M\r\n")
+        self.assertEqual(aggregator.flush()["rain_acc"], 0.0)
+
+        aggregator.add(b"1R3,Rc=M\r\n")
+        aggregator.add(b"1R3,Rc=0.01M\r\n")
+        self.assertAlmostEqual(aggregator.flush()["rain_acc"], 0.01, places=4)
+
+    def test_flush_starts_new_interval(self):
+        aggregator = VaisalaAggregator()
+        aggregator.add(b"1R3,Rc=0.01M\r\n")
+        aggregator.flush()
+
+        self.assertEqual(aggregator.count, 0)
+        entry = aggregator.flush()
+        self.assertIsNone(entry["rain_acc"])
+
+
+if __name__ == "__main__":
+    unittest.main()
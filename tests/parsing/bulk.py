@@ -0,0 +1,57 @@
+import math
+import os
+import unittest
+
+from meteo.parser.bulk import read_vaisala
+from meteo.parser.vaisala import VaisalaParser
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "fixtures",
+)
+
+
+class BulkParserTest(unittest.TestCase):
+    def test_read_buffer(self):
+        buf = (
+            b"1R2,Ta=23.4C,Ua=65.0P,Pa=872.5H\r\n"
+            b"c/address error\r\n"
+            b"1R5,Th=24.3C,Vh=0.0#,Vs=12.7V,Vr=3.618V,Id=BBD"
+        )
+        columns = read_vaisala(buf)
+
+        self.assertEqual(len(columns["air_temperature"]), 3)
+        self.assertEqual(columns["air_temperature"][0], 23.4)
+        self.assertTrue(math.isnan(columns["air_temperature"][1]))
+        self.assertEqual(columns["supply_voltage"][2], 12.7)
+        self.assertEqual(columns["id"][2], "BBD")
+        self.assertIsNone(columns["id"][0])
+
+    def test_read_file_same_as_parser(self):
+        path = os.path.join(FIXTURES_DIR, "vaisala-babadan-sample.txt")
+        columns = read_vaisala(path)
+
+        parser = VaisalaParser()
+        with open(path, "rb") as f:
+            for i, line in enumerate(f):
+                record = parser.parse_record(line)
+                for name in record._fields[1:]:
+                    expected = getattr(record, name)
+                    value = columns[name][i]
+                    if expected is None:
+                        self.assertTrue(
+                            value is None or math.isnan(value), (i, name, value)
+                        )
+                    else:
+                        self.assertEqual(value, expected)
+
+    def test_read_as_frame(self):
+        path = os.path.join(FIXTURES_DIR, "vaisala-jurangjero-sample.txt")
+        df = read_vaisala(path, as_frame=True)
+
+        self.assertEqual(len(df), 28)
+        self.assertEqual(df["relative_humidity"].dtype, "float64")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_PACKAGES = ("sqlalchemy", "pandas", "numpy")
+
+
+def imported_packages(module):
+    """
+    Import module in a fresh interpreter and return heavy packages imported as
+    a side effect.
+    """
+    script = "import sys, {}; print(' '.join(p for p in {!r} if p in sys.modules))"
+    output = subprocess.check_output(
+        [sys.executable, "-c", script.format(module, HEAVY_PACKAGES)]
+    )
+    return output.decode("utf-8").split()
+
+
+class LightweightImportTest(unittest.TestCase):
+    def test_parser_imports(self):
+        for module in (
+            "meteo.parser.vaisala",
+            "meteo.parser.stream",
+            "meteo.parser.aggregate",
+        ):
+            self.assertEqual(imported_packages(module), [], module)
+
+    def test_acquisition_imports(self):
+        for module in ("meteo.acquisition", "meteo.spool", "meteo.models"):
+            self.assertEqual(imported_packages(module), [], module)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import io
+import os
+import unittest
+
+from meteo.parser.stream import iter_chunks, iter_lines, iter_records
+from meteo.parser.vaisala import VaisalaParser
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "fixtures",
+)
+
+
+class StreamParserTest(unittest.TestCase):
+    def test_iter_lines_across_chunks(self):
+        chunks = [b"1R2,Ta=2", b"3.0C\r", b"\n\r\n1R1,Dn=1", b"68D\r\n1R5,Id=BBD"]
+        lines = list(iter_lines(chunks))
+
+        self.assertEqual(lines, [b"1R2,Ta=23.0C", b"1R1,Dn=168D", b"1R5,Id=BBD"])
+
+    def test_iter_lines_discard_long_line(self):
+        chunks = [b"1R2,Ta=1C\n", b"x" * 10, b"x" * 10, b"x\n1R2,Ta=2C\n"]
+        lines = list(iter_lines(chunks, max_line_length=16))
+
+        self.assertEqual(lines, [b"1R2,Ta=1C", b"1R2,Ta=2C"])
+
+        # A long line complete within one chunk is discarded too.
+        chunks = [b"1R2,Ta=1C\n" + b"x" * 17 + b"\r\n1R2,Ta=2C\n"]
+        lines = list(iter_lines(chunks, max_line_length=16))
+
+        self.assertEqual(lines, [b"1R2,Ta=1C", b"1R2,Ta=2C"])
+
+    def test_iter_records_same_as_parser(self):
+        path = os.path.join(FIXTURES_DIR, "vaisala-babadan-sample.txt")
+        parser = VaisalaParser(errors="ignore")
+        with open(path, "rb") as f:
+            expected = [parser.parse_record(line) for line in f if line.strip()]
+        with open(path, "rb") as f:
+            records = list(iter_records(iter_chunks(f, chunk_size=7)))
+
+        self.assertEqual(records, expected)
+
+    def test_iter_chunks(self):
+        chunks = list(iter_chunks(io.BytesIO(b"abcdefg"), chunk_size=3))
+        self.assertEqual(chunks, [b"abc", b"def", b"g"])
+
+
+if __name__ == "__main__":
+    unittest.main()
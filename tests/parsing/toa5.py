@@ -0,0 +1,103 @@
+import datetime
+import math
+import os
+import unittest
+
+import numpy as np
+
+from meteo.parser.toa5 import (
+    CR6_COLUMNS,
+    TOA5Error,
+    TOA5StreamParser,
+    concat_columns,
+    read_toa5,
+    to_entries,
+)
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "fixtures",
+)
+
+HEADER = (
+    b'"TOA5","2739","CR6","2739","CR6.Std.05.01","CPU:prog.CR6","16155","Table1"\r\n'
+    b'"TIMESTAMP","RECORD","suhuudara_Avg","Hujan"\r\n'
+    b'"TS","RN","Deg C","mm"\r\n'
+    b'"","","Avg","Smp"\r\n'
+)
+
+
+class TOA5ReaderTest(unittest.TestCase):
+    def test_read_buffer(self):
+        buf = HEADER + (
+            b'"2020-02-10 00:00:00",1,10.74,392.7\r\n'
+            b'"2020-02-10 00:01:00",2,"NAN",\r\n'
+        )
+        columns = read_toa5(buf)
+
+        self.assertEqual(
+            list(columns), ["TIMESTAMP", "RECORD", "suhuudara_Avg", "Hujan"]
+        )
+        self.assertEqual(columns["TIMESTAMP"].dtype, np.dtype("datetime64[us]"))
+        self.assertEqual(columns["TIMESTAMP"][1], np.datetime64("2020-02-10T00:01:00"))
+        self.assertEqual(columns["RECORD"].tolist(), [1, 2])
+        self.assertEqual(columns["suhuudara_Avg"][0], 10.74)
+        self.assertTrue(math.isnan(columns["suhuudara_Avg"][1]))
+        self.assertTrue(math.isnan(columns["Hujan"][1]))
+
+        entries = to_entries(columns)
+        self.assertEqual(entries[1]["TIMESTAMP"], datetime.datetime(2020, 2, 10, 0, 1))
+        self.assertIsNone(entries[1]["suhuudara_Avg"])
+        self.assertEqual(entries[0]["Hujan"], 392.7)
+
+    def test_read_file_same_as_records(self):
+        columns = read_toa5(os.path.join(FIXTURES_DIR, "Table1.csv"), names=CR6_COLUMNS)
+        with open(os.path.join(FIXTURES_DIR, "records.csv")) as f:
+            lines = f.read().splitlines()[1:]
+
+        self.assertEqual(len(columns["timestamp"]), len(lines))
+        for i, line in enumerate(lines):
+            values = line.split(",")
+            self.assertEqual(
+                columns["timestamp"][i].item().strftime("%Y-%m-%d %H:%M:%S"),
+                values[0].strip('"'),
+            )
+            for name, value in zip(CR6_COLUMNS[1:], values[1:]):
+                if value in ("", "NAN"):
+                    self.assertTrue(math.isnan(columns[name][i]))
+                else:
+                    self.assertEqual(columns[name][i], float(value))
+
+    def test_stream_parser(self):
+        path = os.path.join(FIXTURES_DIR, "Table1.csv")
+        with open(path, "rb") as f:
+            data = f.read()
+        expected = read_toa5(path, names=CR6_COLUMNS)
+
+        parser = TOA5StreamParser(names=CR6_COLUMNS)
+        chunks = []
+        for i in range(0, len(data), 37):
+            columns = parser.feed(data[i : i + 37])
+            if columns is not None:
+                chunks.append(columns)
+        chunks.append(parser.close())
+        columns = concat_columns(chunks)
+        for name in CR6_COLUMNS:
+            np.testing.assert_array_equal(columns[name], expected[name])
+
+    def test_empty_data(self):
+        columns = read_toa5(HEADER)
+        self.assertEqual(len(columns["TIMESTAMP"]), 0)
+        self.assertEqual(to_entries(columns), [])
+
+    def test_invalid_data(self):
+        with self.assertRaises(TOA5Error):
+            read_toa5(b"<html>Error</html>")
+        with self.assertRaises(TOA5Error):
+            read_toa5(HEADER + b'"2020-02-10 00:00:00",1,10.74\r\n')
+        with self.assertRaises(TOA5Error):
+            read_toa5(HEADER, names=["timestamp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
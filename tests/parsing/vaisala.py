@@ -1,6 +1,12 @@
+import os
 import unittest
 
-from meteo.parser.vaisala import VaisalaParser
+from meteo.parser.vaisala import VaisalaParser, VaisalaRecord
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "fixtures",
+)
 
 
 class VaisalaParserTest(unittest.TestCase):
@@ -59,5 +65,42 @@ class VaisalaParserTest(unittest.TestCase):
         self.assertEqual(Id["text"], "Id=BBD")
 
 
+class VaisalaParserRecordTest(unittest.TestCase):
+    def test_parse_record(self):
+        text = b"1R5,Th=29.2C,Vh=0.0#,Vs=13.4V,Vr=3.616V,Id=BBD\r\n"
+        parser = VaisalaParser()
+        r = parser.parse_record(text)
+
+        self.assertIsInstance(r, VaisalaRecord)
+        self.assertEqual(r.ident, "1R5")
+        self.assertEqual(r.heating_temperature, 29.2)
+        self.assertEqual(r.heating_voltage, 0.0)
+        self.assertEqual(r.ref_voltage, 3.616)
+        self.assertEqual(r.id, "BBD")
+        self.assertIsNone(r.air_temperature)
+
+    def test_parse_record_skip_invalid_component(self):
+        parser = VaisalaParser()
+        r = parser.parse_record("c/address error")
+
+        self.assertEqual(r.ident, "c/address error")
+        self.assertTrue(all(value is None for value in r[1:]))
+
+    def test_parse_record_same_as_parse(self):
+        parser = VaisalaParser()
+        for name in ["vaisala-babadan-sample.txt", "vaisala-jurangjero-sample.txt"]:
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                for line in f:
+                    s = parser.parse(line)
+                    r = parser.parse_record(line)
+
+                    self.assertEqual(r.ident, s["ident"])
+                    expected = dict((c["name"], c["value"]) for c in s["components"])
+                    for key, value in expected.items():
+                        self.assertEqual(getattr(r, key), value)
+                    for key in set(r._fields[1:]) - set(expected):
+                        self.assertIsNone(getattr(r, key))
+
+
 if __name__ == "__main__":
     unittest.main()
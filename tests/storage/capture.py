@@ -0,0 +1,91 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from meteo.capture import CaptureReader, CaptureWriter, RECORD
+
+LINE = b"1R2,Ta=21.0C,Tp=21.0C,Ua=94.2P,Pa=872.1H\r\n"
+
+
+class CaptureTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "babadan")
+        self.start = datetime.datetime(2026, 1, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, count):
+        with CaptureWriter(self.path) as writer:
+            for i in range(count):
+                timestamp = self.start + datetime.timedelta(seconds=i)
+                writer.append(timestamp, b"%d," % i + LINE)
+
+    def test_append_and_read(self):
+        self.write(100)
+        with CaptureWriter(self.path) as writer:
+            writer.append_many(
+                self.start + datetime.timedelta(seconds=100), [b"a", "b"]
+            )
+
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 102)
+            self.assertEqual(reader[0], (self.start, b"0," + LINE))
+            self.assertEqual(reader[-1][1], b"b")
+
+            lines = list(
+                reader.iter_range(
+                    self.start + datetime.timedelta(seconds=10),
+                    self.start + datetime.timedelta(seconds=12),
+                )
+            )
+            self.assertEqual(
+                [line for _, line in lines],
+                [b"10," + LINE, b"11," + LINE, b"12," + LINE],
+            )
+
+            blocks = list(
+                reader.iter_blocks(self.start + datetime.timedelta(seconds=99))
+            )
+            self.assertEqual([len(lines) for _, lines in blocks], [1, 2])
+
+    def test_aware_timestamp(self):
+        tz = datetime.timezone(datetime.timedelta(hours=7))
+        with CaptureWriter(self.path) as writer:
+            writer.append(datetime.datetime(2026, 1, 1, 7, tzinfo=tz), LINE)
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(reader.timestamp(0), self.start)
+
+    def test_clock_going_backwards(self):
+        with CaptureWriter(self.path) as writer:
+            writer.append(self.start, b"a")
+            writer.append(self.start - datetime.timedelta(seconds=1), b"b")
+        with CaptureReader(self.path) as reader:
+            self.assertEqual([ts for ts, _ in reader.iter_range()], [self.start] * 2)
+
+    def test_recover_torn_write(self):
+        self.write(3)
+        with open(self.path + ".idx", "ab") as f:
+            f.write(RECORD.pack(0, 10**6, 5)[:7])
+        with open(self.path + ".dat", "ab") as f:
+            f.write(b"partial")
+
+        with CaptureWriter(self.path) as writer:
+            writer.append(self.start + datetime.timedelta(seconds=3), b"3")
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+            self.assertEqual(reader[3][1], b"3")
+            self.assertEqual(reader[2][1], b"2," + LINE)
+
+    def test_empty(self):
+        CaptureWriter(self.path).close()
+        with CaptureReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader.iter_blocks()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine
+
+from meteo.checkpoint import CheckpointError, CheckpointStore, atomic_write
+from meteo.db.ops import bulk_upsert
+from meteo.models import cr6
+
+
+class CheckpointStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "data", "checkpoints.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_set_and_reload(self):
+        store = CheckpointStore(self.path, fsync=False)
+        self.assertIsNone(store.get("cr6"))
+        store.set("cr6", datetime.datetime(2020, 1, 1, 0, 1))
+        store.set("babadan", datetime.datetime(2020, 1, 1, 0, 0, 30, 500))
+
+        store = CheckpointStore(self.path)
+        self.assertEqual(store.keys(), ["babadan", "cr6"])
+        self.assertEqual(store.get("cr6"), datetime.datetime(2020, 1, 1, 0, 1))
+        self.assertEqual(
+            store.get("babadan"), datetime.datetime(2020, 1, 1, 0, 0, 30, 500)
+        )
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["checkpoints.json"])
+
+    def test_never_rewind(self):
+        store = CheckpointStore(self.path, fsync=False)
+        store.set("cr6", datetime.datetime(2020, 1, 1, 1))
+        self.assertFalse(store.set("cr6", datetime.datetime(2020, 1, 1)))
+        self.assertEqual(store.get("cr6"), datetime.datetime(2020, 1, 1, 1))
+
+        self.assertTrue(store.set("cr6", datetime.datetime(2020, 1, 1), force=True))
+        self.assertEqual(store.get("cr6"), datetime.datetime(2020, 1, 1))
+
+    def test_failed_write_keeps_old_content(self):
+        store = CheckpointStore(self.path, fsync=False)
+        store.set("cr6", datetime.datetime(2020, 1, 1))
+
+        with mock.patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                store.set("cr6", datetime.datetime(2020, 1, 2))
+
+        self.assertEqual(store.get("cr6"), datetime.datetime(2020, 1, 1))
+        self.assertEqual(
+            CheckpointStore(self.path).get("cr6"), datetime.datetime(2020, 1, 1)
+        )
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["checkpoints.json"])
+
+    def test_invalid_file(self):
+        os.makedirs(os.path.dirname(self.path))
+        atomic_write(self.path, b"")
+        with self.assertRaises(CheckpointError):
+            CheckpointStore(self.path)
+
+        atomic_write(self.path, json.dumps({"checkpoints": {"cr6": {}}}).encode())
+        with self.assertRaises(CheckpointError):
+            CheckpointStore(self.path)
+
+    def test_resume_from_database(self):
+        engine = create_engine("sqlite://")
+        cr6.CR6.__table__.create(engine)
+        step = datetime.timedelta(minutes=1)
+        store = CheckpointStore(self.path, fsync=False)
+
+        default = datetime.datetime(2019, 12, 31)
+        self.assertEqual(
+            store.resume("cr6", engine=engine, model=cr6.CR6, default=default),
+            default,
+        )
+
+        bulk_upsert(
+            engine,
+            cr6.CR6,
+            [{"timestamp": datetime.datetime(2020, 1, 1, 0, m)} for m in range(5)],
+        )
+        self.assertEqual(
+            store.resume("cr6", engine=engine, model=cr6.CR6, step=step),
+            datetime.datetime(2020, 1, 1, 0, 5),
+        )
+
+        # A checkpoint wins over the latest row, newer or older.
+        store.set("cr6", datetime.datetime(2020, 1, 1, 1))
+        self.assertEqual(
+            store.resume("cr6", engine=engine, model=cr6.CR6, step=step),
+            datetime.datetime(2020, 1, 1, 1),
+        )
+        store.set("cr6", datetime.datetime(2020, 1, 1, 0, 2), force=True)
+        self.assertEqual(
+            store.resume("cr6", engine=engine, model=cr6.CR6, step=step),
+            datetime.datetime(2020, 1, 1, 0, 2),
+        )
+        engine.dispose()
+
+    def test_on_insert(self):
+        step = datetime.timedelta(minutes=1)
+        store = CheckpointStore(self.path, fsync=False, step=step)
+        rows = [
+            {"record_timestamp": datetime.datetime(2020, 1, 1, 0, 2)},
+            {"record_timestamp": datetime.datetime(2020, 1, 1, 0, 1)},
+        ]
+        store.on_insert(cr6.CR6.__table__, rows)
+        self.assertEqual(store.get("cr6"), datetime.datetime(2020, 1, 1, 0, 3))
+
+    def test_aware_timestamps(self):
+        engine = create_engine("sqlite://")
+        cr6.CR6.__table__.create(engine)
+        bulk_upsert(engine, cr6.CR6, [{"timestamp": datetime.datetime(2020, 1, 1, 7)}])
+
+        tz = datetime.timezone(datetime.timedelta(hours=7))
+        store = CheckpointStore(
+            self.path, fsync=False, step=datetime.timedelta(minutes=1), tz=tz
+        )
+        rows = [
+            {
+                "record_timestamp": datetime.datetime(
+                    2020, 1, 1, 0, 30, tzinfo=datetime.timezone.utc
+                )
+            }
+        ]
+        store.on_insert(cr6.CR6.__table__, rows)
+        self.assertEqual(store.get("cr6"), datetime.datetime(2020, 1, 1, 7, 31))
+        self.assertEqual(
+            store.resume("cr6", engine=engine, model=cr6.CR6),
+            datetime.datetime(2020, 1, 1, 7, 31),
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, func, select
+
+from meteo.models import cr6
+from meteo.spool import Spool, SpoolDrainer, iter_segment
+
+
+def count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+class SpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine("sqlite://")
+        self.table = cr6.CR6.__table__
+        self.table.create(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def row(self, minute):
+        return {
+            "record_timestamp": datetime.datetime(2020, 1, 1, 0, minute),
+            "air_temperature": 20.5,
+        }
+
+    def test_append_and_read(self):
+        spool = Spool(self.directory, fsync=False)
+        spool.append("cr6", self.row(0))
+        spool.append_many("cr6", [self.row(1), self.row(2)])
+        spool.close()
+
+        records = list(iter_segment(spool.segments()[0]))
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[1], ("cr6", self.row(1)))
+
+    def test_truncated_segment(self):
+        spool = Spool(self.directory, fsync=False)
+        spool.append_many("cr6", [self.row(0), self.row(1)])
+        spool.close()
+
+        path = spool.segments()[0]
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 3)
+
+        self.assertEqual(len(list(iter_segment(path))), 1)
+
+    def test_rotate_segment(self):
+        spool = Spool(self.directory, max_segment_bytes=1, fsync=False)
+        spool.append("cr6", self.row(0))
+        spool.append("cr6", self.row(1))
+
+        self.assertEqual(len(spool.sealed_segments()), 2)
+
+    def test_drain_idempotent(self):
+        spool = Spool(self.directory, fsync=False)
+        drainer = SpoolDrainer(spool, self.engine, [cr6.CR6], batch_size=2)
+
+        spool.append_many("cr6", [self.row(0), self.row(1), self.row(2)])
+        stats = drainer.drain_once()
+        self.assertEqual(stats.rows, 3)
+        self.assertEqual(stats.batches, 2)
+        self.assertEqual(spool.segments(), [])
+
+        spool.append_many("cr6", [self.row(2), self.row(3)])
+        drainer.drain_once()
+        self.assertEqual(count(self.engine, self.table), 4)
+        self.assertEqual(drainer.rows, 5)
+
+    def test_keep_segment_on_failure(self):
+        spool = Spool(self.directory, fsync=False)
+        drainer = SpoolDrainer(spool, self.engine, [cr6.CR6])
+        spool.append("cr6", self.row(0))
+
+        self.table.drop(self.engine)
+        stats = drainer.drain_once()
+        self.assertEqual((stats.failed, stats.quarantined), (1, 0))
+        self.assertEqual(len(spool.sealed_segments()), 1)
+
+        self.table.create(self.engine)
+        drainer.drain_once()
+        self.assertEqual(count(self.engine, self.table), 1)
+
+    def test_skip_and_quarantine_failed_segment(self):
+        spool = Spool(self.directory, fsync=False)
+        drainer = SpoolDrainer(spool, self.engine, [cr6.CR6], max_attempts=2)
+        spool.append("unknown", self.row(0))
+        spool.rotate()
+        spool.append("cr6", self.row(1))
+        failed = spool.sealed_segments()[0]
+
+        stats = drainer.drain_once()
+        self.assertEqual((stats.segments, stats.failed, stats.quarantined), (1, 1, 0))
+        self.assertEqual(count(self.engine, self.table), 1)
+        self.assertEqual(spool.sealed_segments(), [failed])
+
+        stats = drainer.drain_once()
+        self.assertEqual((stats.segments, stats.failed, stats.quarantined), (0, 1, 1))
+        self.assertEqual(spool.segments(), [])
+        self.assertTrue(os.path.exists(failed + ".failed"))
+
+    def test_failed_append_is_truncated(self):
+        spool = Spool(self.directory)
+        spool.append("cr6", self.row(0))
+        path = spool.segments()[0]
+        size = os.path.getsize(path)
+
+        with mock.patch("os.fsync", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                spool.append_many("cr6", [self.row(1), self.row(2)])
+        self.assertEqual(os.path.getsize(path), size)
+
+        spool.append("cr6", self.row(3))
+        spool.close()
+        errors = []
+        rows = [row for _, row in iter_segment(path, errors=errors)]
+        self.assertEqual([row["record_timestamp"].minute for row in rows], [0, 3])
+        self.assertEqual(errors, [])
+
+    def test_restart_after_torn_write(self):
+        spool = Spool(self.directory, fsync=False)
+        spool.append_many("cr6", [self.row(0), self.row(1)])
+        spool.close()
+        path = spool.segments()[0]
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 3)
+
+        # Rows after restart go to a new segment, not after the torn record.
+        spool = Spool(self.directory, fsync=False)
+        spool.append("cr6", self.row(2))
+        self.assertEqual(spool.sealed_segments(), [path])
+
+        drainer = SpoolDrainer(spool, self.engine, [cr6.CR6])
+        stats = drainer.drain_once()
+        self.assertEqual(stats.rows, 2)
+        self.assertEqual(count(self.engine, self.table), 2)
+        self.assertEqual(spool.segments(), [])
+        self.assertTrue(os.path.exists(path + ".corrupt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import io
+import json
+import os
+import unittest
+
+from meteo.utils.jsonstream import JSONStreamError, iter_json, iter_json_array
+
+FIXTURES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "fixtures",
+)
+
+
+class JSONStreamTest(unittest.TestCase):
+    def test_iter_json_array(self):
+        data = [{"a": 1, "b": 12345.678}, {"a": [1, 2], "b": "x,]"}, None, 10]
+        text = json.dumps(data)
+        for read_size in (1, 2, 3, 7, 1024):
+            items = list(iter_json_array(io.StringIO(text), read_size=read_size))
+            self.assertEqual(items, data)
+
+    def test_iter_json_array_empty(self):
+        self.assertEqual(list(iter_json_array(io.StringIO(" [ ] "))), [])
+
+    def test_iter_json_array_invalid(self):
+        with self.assertRaises(JSONStreamError):
+            list(iter_json_array(io.StringIO('{"a": 1}')))
+        with self.assertRaises(JSONStreamError):
+            list(iter_json_array(io.StringIO("[1 2]")))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO("[1, {")))
+
+    def test_iter_json_lines(self):
+        text = '{"a": 1}\n\n{"a": 2}\r\n{"a": 3}'
+        for read_size in (1, 4, 1024):
+            items = list(iter_json(io.StringIO(text), read_size=read_size))
+            self.assertEqual(items, [{"a": 1}, {"a": 2}, {"a": 3}])
+
+    def test_iter_json_file(self):
+        path = os.path.join(FIXTURES_DIR, "Table1.json")
+        with open(path) as f:
+            expected = json.load(f)
+        with open(path) as f:
+            self.assertEqual(list(iter_json(f, read_size=100)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()